@@ -29,6 +29,24 @@ def create_app(config_name=None):
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     
+    # 初始化人脸识别相关的全局组件（特征格式、特征库缓存、全校识别索引、提取进程池、特征缓存、签到队列、图片存储、考勤汇总、每日考勤快照、首页统计缓存等）
+    from app.utils import face_recognizer, face_gallery, campus_index, face_extraction_pool, encoding_cache, checkin_jobs, bulk_jobs, encoding_codec, video_sessions, image_writer, image_store, attendance_rollups, course_snapshots, dashboard_stats
+    face_recognizer.tolerance = app.config.get('FACE_RECOGNITION_TOLERANCE', face_recognizer.tolerance)
+    face_recognizer.seed = app.config.get('FACE_RECOGNITION_SEED', face_recognizer.seed)
+    encoding_codec.init_app(app)
+    face_gallery.init_app(app)
+    campus_index.init_app(app)
+    face_extraction_pool.init_app(app)
+    encoding_cache.init_app(app)
+    checkin_jobs.init_app(app)
+    bulk_jobs.init_app(app)
+    video_sessions.init_app(app)
+    image_writer.init_app(app)
+    image_store.init_app(app)
+    attendance_rollups.init_app(app)
+    course_snapshots.init_app(app)
+    dashboard_stats.init_app(app)
+    
     # 注册蓝图
     from app.routes.auth import auth_bp
     from app.routes.student import student_bp
@@ -36,6 +54,7 @@ def create_app(config_name=None):
     from app.routes.course import course_bp
     from app.routes.attendance import attendance_bp
     from app.routes.admin import admin_bp
+    from app.routes.images import images_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(student_bp, url_prefix='/student')
@@ -43,9 +62,19 @@ def create_app(config_name=None):
     app.register_blueprint(course_bp, url_prefix='/course')
     app.register_blueprint(attendance_bp, url_prefix='/attendance')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(images_bp, url_prefix='/images')
     
     # 创建数据库表（仅在开发环境）
     with app.app_context():
         db.create_all()
+        
+        # 检查模型中声明的索引是否都已建立（create_all 不会为已存在的表补建索引，需执行 flask db upgrade）
+        if app.config.get('SCHEMA_INDEX_CHECK', True):
+            from app.utils.index_check import check_indexes
+            check_indexes(app)
+        
+        # 已有考勤记录的数据库首次启用考勤汇总表时，从考勤记录回填汇总数据
+        if app.config.get('ATTENDANCE_ROLLUP_BACKFILL', True):
+            attendance_rollups.backfill(app)
     
     return app
\ No newline at end of file
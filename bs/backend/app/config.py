@@ -19,6 +19,83 @@ class Config:
     
     # 允许的图片扩展名
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    
+    # 人脸识别配置
+    FACE_RECOGNITION_TOLERANCE = 0.6
+    # 确定性模式的随机种子（未设置时模拟特征为随机向量）
+    FACE_RECOGNITION_SEED = int(os.environ['FACE_RECOGNITION_SEED']) if os.environ.get('FACE_RECOGNITION_SEED') else None
+    # 人脸特征存储格式：float32 或 float16，以及当前特征提取模型的版本号
+    FACE_ENCODING_DTYPE = os.environ.get('FACE_ENCODING_DTYPE', 'float32')
+    # 人脸图片解码时缩小到的最大边长（像素），与特征提取所需的分辨率一致
+    FACE_IMAGE_MAX_SIDE = int(os.environ.get('FACE_IMAGE_MAX_SIDE', 640))
+    # 课堂合照中人脸较小，解码时保留更高的分辨率
+    FACE_PHOTO_MAX_SIDE = int(os.environ.get('FACE_PHOTO_MAX_SIDE', 2048))
+    # 以原始请求体上传图片时，超过该大小（字节）的内容写入磁盘临时文件
+    FACE_UPLOAD_SPOOL_SIZE = int(os.environ.get('FACE_UPLOAD_SPOOL_SIZE', 1024 * 1024))
+    FACE_MODEL_VERSION = int(os.environ.get('FACE_MODEL_VERSION', 1))
+    # 课程人脸特征库缓存有效期（秒），用于限制多个工作进程之间缓存不一致的时间
+    FACE_GALLERY_CACHE_TTL = int(os.environ.get('FACE_GALLERY_CACHE_TTL', 300))
+    # 跨工作进程共享的人脸特征库文件路径（为空时每个进程各自缓存），以及失效后延迟重建的时间（秒）
+    FACE_GALLERY_SHARED_PATH = os.environ.get('FACE_GALLERY_SHARED_PATH')
+    FACE_GALLERY_REBUILD_DELAY = float(os.environ.get('FACE_GALLERY_REBUILD_DELAY', 1.0))
+    # 全校人脸识别索引：查询时探测的聚类数，以及整体重建间隔（秒）
+    FACE_CAMPUS_INDEX_NPROBE = int(os.environ.get('FACE_CAMPUS_INDEX_NPROBE', 8))
+    FACE_CAMPUS_INDEX_TTL = int(os.environ.get('FACE_CAMPUS_INDEX_TTL', 3600))
+    # 人脸特征提取进程池：进程数（0表示在请求线程内执行）、最大排队任务数、单任务超时（秒）、进程启动方式
+    # 每个 WSGI 工作进程各自创建进程池，总进程数为 WSGI 工作进程数 × FACE_EXTRACTION_WORKERS，部署时按CPU核数调整
+    FACE_EXTRACTION_WORKERS = int(os.environ.get('FACE_EXTRACTION_WORKERS', 2))
+    FACE_EXTRACTION_QUEUE_SIZE = int(os.environ.get('FACE_EXTRACTION_QUEUE_SIZE', 64))
+    FACE_EXTRACTION_TIMEOUT = float(os.environ.get('FACE_EXTRACTION_TIMEOUT', 10))
+    FACE_EXTRACTION_START_METHOD = os.environ.get('FACE_EXTRACTION_START_METHOD', 'spawn')
+    
+    # 特征提取结果缓存（按图片内容哈希）：最大条目数（0为关闭）、存活时间（秒）
+    FACE_ENCODING_CACHE_SIZE = int(os.environ.get('FACE_ENCODING_CACHE_SIZE', 10000))
+    FACE_ENCODING_CACHE_TTL = int(os.environ.get('FACE_ENCODING_CACHE_TTL', 3600))
+    
+    # 异步签到任务：后台工作线程数、最大排队任务数、结果保留时间（秒）
+    CHECKIN_JOB_WORKERS = int(os.environ.get('CHECKIN_JOB_WORKERS', 4))
+    CHECKIN_JOB_QUEUE_SIZE = int(os.environ.get('CHECKIN_JOB_QUEUE_SIZE', 256))
+    CHECKIN_JOB_RESULT_TTL = int(os.environ.get('CHECKIN_JOB_RESULT_TTL', 600))
+    
+    # 批量导入任务（人脸照片、考勤表格）：独立的工作线程数、最大排队任务数、结果保留时间（秒），不与签到任务共用线程
+    BULK_JOB_WORKERS = int(os.environ.get('BULK_JOB_WORKERS', 1))
+    BULK_JOB_QUEUE_SIZE = int(os.environ.get('BULK_JOB_QUEUE_SIZE', 8))
+    BULK_JOB_RESULT_TTL = int(os.environ.get('BULK_JOB_RESULT_TTL', 3600))
+    
+    # 视频签到：每隔多少帧处理一帧、确认学生所需的最少票数、会话保留时间（秒）、单次请求最多读取的帧数
+    VIDEO_CHECKIN_SAMPLE_EVERY = int(os.environ.get('VIDEO_CHECKIN_SAMPLE_EVERY', 3))
+    VIDEO_CHECKIN_MIN_VOTES = int(os.environ.get('VIDEO_CHECKIN_MIN_VOTES', 3))
+    VIDEO_CHECKIN_SESSION_TTL = int(os.environ.get('VIDEO_CHECKIN_SESSION_TTL', 3600))
+    VIDEO_CHECKIN_MAX_FRAMES = int(os.environ.get('VIDEO_CHECKIN_MAX_FRAMES', 600))
+    
+    # 图片异步写入：是否启用、队列中图片的最大总字节数、每批写入的图片数、写入失败时的最多尝试次数
+    IMAGE_WRITE_BEHIND = os.environ.get('IMAGE_WRITE_BEHIND', 'true').lower() == 'true'
+    IMAGE_WRITE_QUEUE_BYTES = int(os.environ.get('IMAGE_WRITE_QUEUE_BYTES', 64 * 1024 * 1024))
+    IMAGE_WRITE_BATCH_SIZE = int(os.environ.get('IMAGE_WRITE_BATCH_SIZE', 32))
+    IMAGE_WRITE_ATTEMPTS = int(os.environ.get('IMAGE_WRITE_ATTEMPTS', 3))
+    
+    # 内容寻址图片存储：存储目录（默认为上传目录下的 store）、缩略图最大边长
+    IMAGE_STORE_FOLDER = os.environ.get('IMAGE_STORE_FOLDER')
+    IMAGE_THUMBNAIL_SIZE = int(os.environ.get('IMAGE_THUMBNAIL_SIZE', 160))
+    
+    # 批量导入人脸照片：允许导入的服务器目录（为空时只能上传压缩包）、每块处理的照片数、单张照片的最大字节数
+    FACE_BULK_ENROLL_ROOT = os.environ.get('FACE_BULK_ENROLL_ROOT')
+    FACE_BULK_ENROLL_CHUNK_SIZE = int(os.environ.get('FACE_BULK_ENROLL_CHUNK_SIZE', 50))
+    FACE_BULK_ENROLL_MAX_FILE_SIZE = int(os.environ.get('FACE_BULK_ENROLL_MAX_FILE_SIZE', 10 * 1024 * 1024))
+    
+    # 考勤批量导入：每块校验并写入（提交一次）的记录数
+    ATTENDANCE_IMPORT_CHUNK_SIZE = int(os.environ.get('ATTENDANCE_IMPORT_CHUNK_SIZE', 500))
+    # 考勤导出：从数据库游标每批读取的记录数
+    ATTENDANCE_EXPORT_BATCH_SIZE = int(os.environ.get('ATTENDANCE_EXPORT_BATCH_SIZE', 1000))
+    
+    # 管理后台首页统计缓存：结果直接返回的时间、过期后仍可返回旧结果并在后台刷新的时间（秒）
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 30))
+    DASHBOARD_CACHE_STALE_TTL = int(os.environ.get('DASHBOARD_CACHE_STALE_TTL', 300))
+    
+    # 启动时检查数据库是否缺少模型中声明的索引（缺少时记录警告）
+    SCHEMA_INDEX_CHECK = os.environ.get('SCHEMA_INDEX_CHECK', 'true').lower() == 'true'
+    # 启动时考勤汇总表为空而已有考勤记录时，从考勤记录回填汇总表
+    ATTENDANCE_ROLLUP_BACKFILL = os.environ.get('ATTENDANCE_ROLLUP_BACKFILL', 'true').lower() == 'true'
 
 
 class DevelopmentConfig(Config):
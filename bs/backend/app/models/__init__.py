@@ -4,5 +4,8 @@ from app.models.teacher import Teacher
 from app.models.admin import Admin
 from app.models.course import Course, CourseCategory, Enrollment
 from app.models.attendance import Attendance
+from app.models.stored_image import StoredImage
+from app.models.attendance_rollup import AttendanceRollup
+from app.models.course_daily_snapshot import CourseDailySnapshot
 
-__all__ = ['User', 'Student', 'Teacher', 'Admin', 'Course', 'CourseCategory', 'Enrollment', 'Attendance']
\ No newline at end of file
+__all__ = ['User', 'Student', 'Teacher', 'Admin', 'Course', 'CourseCategory', 'Enrollment', 'Attendance', 'StoredImage', 'AttendanceRollup', 'CourseDailySnapshot']
\ No newline at end of file
@@ -10,7 +10,7 @@ class Attendance(db.Model):
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     
     # 考勤相关字段
-    attendance_date = db.Column(db.Date, default=datetime.utcnow().date, nullable=False)
+    attendance_date = db.Column(db.Date, default=datetime.utcnow().date, nullable=False, index=True)  # 按日期统计（首页、快照）
     check_in_time = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.String(20), nullable=False, default='absent')  # present, late, absent
     
@@ -23,9 +23,12 @@ class Attendance(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # 确保每个学生每天在每门课程中只有一条考勤记录
+    # 确保每个学生每天在每门课程中只有一条考勤记录；
+    # 按课程、按学生查询考勤记录时都会限定或排序日期，分别建立（课程, 日期）和（学生, 日期）索引
     __table_args__ = (
         db.UniqueConstraint('student_id', 'course_id', 'attendance_date', name='_student_course_date_uc'),
+        db.Index('ix_attendances_course_date', 'course_id', 'attendance_date'),
+        db.Index('ix_attendances_student_date', 'student_id', 'attendance_date'),
     )
     
     def __repr__(self):
@@ -0,0 +1,27 @@
+from app import db
+from datetime import datetime
+
+class AttendanceRollup(db.Model):
+    __tablename__ = 'attendance_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # 外键关联（每门课程属于一个学期，学期和学年从课程复制，便于按学期汇总）
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    semester = db.Column(db.String(20), nullable=True)
+    year = db.Column(db.Integer, nullable=True)
+    
+    # 考勤记录数及各状态的记录数，随考勤记录的写入在同一事务中增量更新
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 每个学生在每门课程中只有一条汇总记录
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='_rollup_student_course_uc'),
+    )
+    
+    def __repr__(self):
+        return f'<AttendanceRollup Student {self.student_id} in Course {self.course_id}: {self.present}/{self.total}>'
\ No newline at end of file
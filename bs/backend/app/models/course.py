@@ -33,7 +33,7 @@ class Course(db.Model):
     location = db.Column(db.String(100), nullable=True)
     
     # 外键关联
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), nullable=False, index=True)
     category_id = db.Column(db.Integer, db.ForeignKey('course_categories.id'), nullable=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -57,9 +57,10 @@ class Enrollment(db.Model):
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     enrollment_date = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # 确保每个学生在每门课程中只有一条记录
+    # 确保每个学生在每门课程中只有一条记录；唯一约束以学生ID开头，按课程查询选课名单另建索引
     __table_args__ = (
         db.UniqueConstraint('student_id', 'course_id', name='_student_course_uc'),
+        db.Index('ix_enrollments_course_student', 'course_id', 'student_id'),
     )
     
     def __repr__(self):
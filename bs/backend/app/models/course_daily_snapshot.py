@@ -0,0 +1,26 @@
+from app import db
+from datetime import datetime
+
+class CourseDailySnapshot(db.Model):
+    __tablename__ = 'course_daily_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # 外键关联
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    snapshot_date = db.Column(db.Date, nullable=False, index=True)  # 全部课程按日期汇总
+    
+    # 当天的选课人数及各状态的考勤记录数；no_record 为选课但当天没有考勤记录的人数
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    no_record = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 每门课程每天只有一条快照
+    __table_args__ = (
+        db.UniqueConstraint('course_id', 'snapshot_date', name='_snapshot_course_date_uc'),
+    )
+    
+    def __repr__(self):
+        return f'<CourseDailySnapshot Course {self.course_id} on {self.snapshot_date}: {self.present}/{self.enrolled_count}>'
\ No newline at end of file
@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+class StoredImage(db.Model):
+    __tablename__ = 'stored_images'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # 图片内容的SHA-256摘要，相同内容的图片只保存一份
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    extension = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # 字节数
+    
+    # 引用该图片的记录数（学生人脸图片、考勤图片），降为0时删除文件
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def key(self):
+        """记录中保存的图片标识：摘要.扩展名"""
+        return f'{self.content_hash}.{self.extension}'
+    
+    def __repr__(self):
+        return f'<StoredImage {self.key} refs={self.ref_count}>'
\ No newline at end of file
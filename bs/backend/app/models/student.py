@@ -7,7 +7,7 @@ class Student(User):
     
     # 学生特有字段
     student_id = db.Column(db.String(20), unique=True, nullable=False)
-    name = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(50), nullable=False, index=True)  # 支持以姓名登录
     gender = db.Column(db.String(10), nullable=True)
     age = db.Column(db.Integer, nullable=True)
     major = db.Column(db.String(100), nullable=True)
@@ -4,5 +4,6 @@ from app.routes.teacher import teacher_bp
 from app.routes.course import course_bp
 from app.routes.attendance import attendance_bp
 from app.routes.admin import admin_bp
+from app.routes.images import images_bp
 
-__all__ = ['auth_bp', 'student_bp', 'teacher_bp', 'course_bp', 'attendance_bp', 'admin_bp']
\ No newline at end of file
+__all__ = ['auth_bp', 'student_bp', 'teacher_bp', 'course_bp', 'attendance_bp', 'admin_bp', 'images_bp']
\ No newline at end of file
@@ -1,11 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, url_for
 from flask_login import login_required, current_user
 from app import db
-from app.models import Admin, Student, Teacher, Course, CourseCategory, Enrollment, Attendance
-from datetime import datetime
+from app.models import Admin, Student, Teacher, CourseCategory, Enrollment, Attendance
 import os
 import base64
-from app.utils import face_recognizer
+import zipfile
+from app.utils import face_recognizer, face_gallery, campus_index, image_store, encoding_cache, face_extraction_pool, bulk_jobs, attendance_rollups, course_snapshots, dashboard_stats
+from app.utils.attendance_snapshot import parse_trend_range
+from app.utils.bulk_enroll import FaceBulkEnroller, iter_zip_photos, iter_directory_photos
+from app.utils.uploads import spool_upload_from_request, request_options
 
 # 创建蓝图
 admin_bp = Blueprint('admin', __name__)
@@ -206,16 +209,93 @@ def delete_student(student_id):
         if not student:
             return jsonify({'message': '学生不存在'}), 404
         
-        # 删除学生（会级联删除相关的考勤记录和选课记录）
+        # 记录学生所选课程，用于删除后使特征库缓存失效
+        course_ids = [enrollment.course_id for enrollment in student.enrollments]
+        
+        # 记录学生及其考勤记录引用的图片，删除后释放
+        image_keys = [student.face_image_path] + [
+            image_path for (image_path,) in db.session.query(Attendance.image_path).filter(
+                Attendance.student_id == student_id,
+                Attendance.image_path.isnot(None)
+            ).all()
+        ]
+        
+        # 删除学生（会级联删除相关的考勤记录和选课记录），同时删除其考勤汇总
+        attendance_rollups.delete(student_id=student_id)
         db.session.delete(student)
         db.session.commit()
         
+        face_gallery.invalidate_student(student_id, course_ids)
+        campus_index.remove(student_id)
+        image_store.release(image_keys)
+        
         return jsonify({'message': '学生删除成功'}), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'删除失败: {str(e)}'}), 500
 
+# 执行人脸照片批量导入，返回 (结果字典, HTTP状态码)；archive 为压缩包文件对象，directory 为服务器目录
+def process_face_import(archive=None, directory=None):
+    enroller = FaceBulkEnroller.from_config(current_app.config)
+    try:
+        if archive is not None:
+            with zipfile.ZipFile(archive) as zf:
+                report = enroller.run(iter_zip_photos(zf))
+        else:
+            report = enroller.run(iter_directory_photos(directory))
+        return dict(report, message=f"导入完成，成功{report['enrolled']}人，失败{report['failed_count']}个文件"), 200
+    except zipfile.BadZipFile:
+        db.session.rollback()
+        return {'message': '压缩包格式错误'}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {'message': f'导入人脸照片失败: {str(e)}'}, 500
+    finally:
+        if archive is not None:
+            archive.close()
+
+# 批量导入学生人脸照片（ZIP压缩包或服务器目录，照片以学号命名，如 2023001.jpg）
+@admin_bp.route('/students/faces/import', methods=['POST'])
+@admin_required
+def import_student_faces():
+    try:
+        options = request_options()
+        archive = None
+        directory = None
+        
+        if options.get('directory'):
+            root = current_app.config.get('FACE_BULK_ENROLL_ROOT')
+            if not root:
+                return jsonify({'message': '未配置允许导入的服务器目录'}), 403
+            root = os.path.realpath(root)
+            directory = os.path.realpath(os.path.join(root, options['directory']))
+            if os.path.commonpath([root, directory]) != root or not os.path.isdir(directory):
+                return jsonify({'message': '目录不存在或不在允许导入的范围内'}), 400
+        else:
+            archive, message = spool_upload_from_request('archive')
+            if archive is None:
+                return jsonify({'message': message}), 400
+        
+        # 照片较多时可异步导入，通过返回的 status_url 查询结果
+        if str(options.get('async', '')).lower() in ('1', 'true'):
+            job_id = bulk_jobs.submit(current_user.id, process_face_import, archive, directory)
+            if job_id is None:
+                if archive is not None:
+                    archive.close()
+                return jsonify({'message': '任务过多，请稍后重试'}), 503
+            return jsonify({
+                'message': '导入任务已提交',
+                'job_id': job_id,
+                'status_url': url_for('attendance.get_import_job', job_id=job_id)
+            }), 202
+        
+        result, status_code = process_face_import(archive, directory)
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        return jsonify({'message': f'导入人脸照片失败: {str(e)}'}), 500
+
 # 教师管理 - 获取所有教师
 @admin_bp.route('/teachers', methods=['GET'])
 @admin_required
@@ -389,34 +469,43 @@ def delete_teacher(teacher_id):
 @admin_required
 def get_dashboard_stats():
     try:
-        # 获取统计数据
-        total_students = Student.query.count()
-        total_teachers = Teacher.query.count()
-        total_courses = Course.query.count()
-        total_attendances = Attendance.query.count()
-        
-        # 计算今日考勤
-        today = datetime.now().date()
-        today_attendances = Attendance.query.filter_by(attendance_date=today).count()
-        
-        # 计算本月考勤
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        month_attendances = Attendance.query.filter(
-            db.extract('month', Attendance.attendance_date) == current_month,
-            db.extract('year', Attendance.attendance_date) == current_year
-        ).count()
-        
-        stats = {
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_courses': total_courses,
-            'total_attendances': total_attendances,
-            'today_attendances': today_attendances,
-            'month_attendances': month_attendances
-        }
+        # 一条语句统计全部数据，结果在进程内缓存（见 DashboardStatsCache）
+        stats = dashboard_stats.get()
         
         return jsonify(stats), 200
         
+    except Exception as e:
+        return jsonify({'message': f'获取统计失败: {str(e)}'}), 500
+
+# 全校考勤趋势（按日期合计全部课程或指定课程，读取每日考勤快照）
+@admin_bp.route('/attendance_trend', methods=['GET'])
+@admin_required
+def get_attendance_trend():
+    try:
+        date_range, msg = parse_trend_range(request.args.get('start_date'), request.args.get('end_date'))
+        if not date_range:
+            return jsonify({'message': msg}), 400
+        
+        course_id = request.args.get('course_id', type=int)
+        return jsonify({
+            'course_id': course_id,
+            'start_date': date_range[0].isoformat(),
+            'end_date': date_range[1].isoformat(),
+            'trend': course_snapshots.trend(*date_range, course_id=course_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'获取考勤趋势失败: {str(e)}'}), 500
+
+# 人脸特征缓存命中统计
+@admin_bp.route('/face_cache_stats', methods=['GET'])
+@admin_required
+def get_face_cache_stats():
+    try:
+        return jsonify({
+            'encoding_cache': encoding_cache.stats(),
+            'extraction_workers': face_extraction_pool.max_workers
+        }), 200
+        
     except Exception as e:
         return jsonify({'message': f'获取统计失败: {str(e)}'}), 500
\ No newline at end of file
@@ -1,11 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, url_for, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
-from app.models import Attendance, Course, Student, Enrollment
+from app.models import Attendance, Course, Student, Enrollment, AttendanceRollup
 from datetime import datetime, date
+from sqlalchemy import func
 import pandas as pd
 import io
 import base64
+import os
+from app.utils import bulk_jobs
+from app.utils.attendance_import import AttendanceImporter, detect_file_format, iter_table_chunks
+from app.utils.attendance_export import EXPORT_HEADERS, export_row, iter_csv, write_xlsx, iter_file, content_disposition
+from app.utils.attendance_stats import status_count_columns, attendance_rate
+from app.utils.attendance_rollup import COUNT_COLUMNS as ROLLUP_COUNT_COLUMNS
+from app.utils.uploads import spool_upload_from_request, request_options
 
 # 创建蓝图
 attendance_bp = Blueprint('attendance', __name__)
@@ -22,12 +30,37 @@ def teacher_or_admin_required(f):
     decorated_function.__module__ = f.__module__
     return decorated_function
 
+# 导入考勤表格文件（CSV/XLSX），返回 (结果字典, HTTP状态码)；可在后台任务中执行
+def process_attendance_file(course_id, file, file_format, default_date=None, on_progress=None):
+    importer = AttendanceImporter(
+        course_id,
+        current_app.config.get('ATTENDANCE_IMPORT_CHUNK_SIZE', 500),
+        on_progress=on_progress
+    )
+    try:
+        importer.import_table(
+            iter_table_chunks(file, file_format, current_app.config.get('ATTENDANCE_IMPORT_CHUNK_SIZE', 500)),
+            default_date
+        )
+        return dict(importer.summary(), message='考勤导入完成'), 200
+    except ValueError as e:
+        db.session.rollback()
+        # 出错前已提交的块仍然有效，一并返回已完成的统计
+        return dict(importer.summary(), message=f'导入失败: {str(e)}'), 400
+    except Exception as e:
+        db.session.rollback()
+        return dict(importer.summary(), message=f'导入失败: {str(e)}'), 500
+    finally:
+        file.close()
+
 # 批量导入考勤记录
+# 支持 JSON（attendances 数组），以及上传 CSV/XLSX 表格文件（multipart 的 file 字段或请求体）：
+# 表格列为 学号、状态、备注、考勤日期（可选，缺省时使用 date 参数）
 @attendance_bp.route('/import', methods=['POST'])
 @teacher_or_admin_required
 def import_attendances():
     try:
-        data = request.get_json()
+        data = request_options()
         course_id = data.get('course_id')
         attendance_date = data.get('date')
         attendances = data.get('attendances')  # 格式: [{student_id: int, status: str, remarks: str}]
@@ -41,77 +74,106 @@ def import_attendances():
         if current_user.role == 'teacher' and course.teacher_id != current_user.id:
             return jsonify({'message': '无权限导入此课程的考勤记录'}), 403
         
-        # 转换日期格式
-        try:
-            attendance_date_obj = datetime.strptime(attendance_date, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'message': '日期格式错误'}), 400
+        # 转换日期格式（上传表格且表格中有考勤日期列时可不提供）
+        attendance_date_obj = None
+        if attendance_date or request.is_json:
+            try:
+                attendance_date_obj = datetime.strptime(attendance_date or '', '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({'message': '日期格式错误'}), 400
+        
+        if not request.is_json:
+            # 格式由 format 参数指定，或根据文件名、MIME 类型判断
+            upload = request.files.get('file')
+            if data.get('format'):
+                file_format = detect_file_format('.' + data['format'])
+            elif upload:
+                file_format = detect_file_format(upload.filename, upload.mimetype)
+            else:
+                file_format = detect_file_format(mimetype=request.mimetype)
+            if not file_format:
+                return jsonify({'message': '仅支持 CSV 或 XLSX 文件'}), 400
+            
+            file, message = spool_upload_from_request('file')
+            if file is None:
+                return jsonify({'message': message}), 400
+            
+            # 数万行的表格可异步导入，通过返回的 status_url 查询进度和结果
+            if str(data.get('async', '')).lower() in ('1', 'true'):
+                job_id = bulk_jobs.submit(
+                    current_user.id, process_attendance_file, course.id, file, file_format,
+                    attendance_date_obj, bulk_jobs.report_progress
+                )
+                if job_id is None:
+                    file.close()
+                    return jsonify({'message': '任务过多，请稍后重试'}), 503
+                return jsonify({
+                    'message': '导入任务已提交',
+                    'job_id': job_id,
+                    'status_url': url_for('attendance.get_import_job', job_id=job_id)
+                }), 202
+            
+            result, status_code = process_attendance_file(course.id, file, file_format, attendance_date_obj)
+            return jsonify(result), status_code
         
-        # 批量创建或更新考勤记录
-        success_count = 0
-        error_count = 0
-        errors = []
+        # 预取选课名单后分块校验，并用 upsert 批量写入
+        importer = AttendanceImporter(course.id, current_app.config.get('ATTENDANCE_IMPORT_CHUNK_SIZE', 500))
+        importer.total_rows = len(attendances or [])
         
-        for item in attendances:
-            try:
+        def records():
+            for item in attendances or []:
                 student_id = item.get('student_id')
-                status = item.get('status')
-                remarks = item.get('remarks', '')
-                
-                # 验证学生是否选修了该课程
-                enrollment = Enrollment.query.filter_by(
-                    student_id=student_id,
-                    course_id=course_id
-                ).first()
-                
-                if not enrollment:
-                    error_count += 1
-                    errors.append(f'学生ID {student_id} 未选修该课程')
+                try:
+                    student_id = int(student_id)
+                except (TypeError, ValueError):
+                    importer.add_error(f'学生ID {student_id} 无效')
                     continue
-                
-                # 检查是否已存在考勤记录
-                attendance = Attendance.query.filter_by(
-                    student_id=student_id,
-                    course_id=course_id,
-                    attendance_date=attendance_date_obj
-                ).first()
-                
-                if attendance:
-                    # 更新现有记录
-                    attendance.status = status
-                    attendance.remarks = remarks
-                else:
-                    # 创建新记录
-                    attendance = Attendance(
-                        student_id=student_id,
-                        course_id=course_id,
-                        attendance_date=attendance_date_obj,
-                        status=status,
-                        remarks=remarks
-                    )
-                    db.session.add(attendance)
-                
-                success_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f'处理学生ID {item.get("student_id")} 时出错: {str(e)}')
-        
-        # 提交事务
-        if success_count > 0:
-            db.session.commit()
+                yield student_id, attendance_date_obj, item.get('status'), item.get('remarks', ''), f'学生ID {student_id}'
         
-        return jsonify({
-            'message': '考勤导入完成',
-            'success_count': success_count,
-            'error_count': error_count,
-            'errors': errors
-        }), 200
+        importer.import_records(records())
+        
+        return jsonify(dict(importer.summary(), message='考勤导入完成')), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'导入失败: {str(e)}'}), 500
 
+# 构建导出考勤记录的查询：单次联表查询，只取导出需要的列（不加载学生的人脸特征等数据）
+def build_export_query(course_id, start_date=None, end_date=None):
+    query = db.session.query(
+        Student.student_id, Student.name, Attendance.attendance_date,
+        Attendance.check_in_time, Attendance.status, Attendance.remarks
+    ).join(Student, Student.id == Attendance.student_id).filter(Attendance.course_id == course_id)
+    
+    if start_date:
+        query = query.filter(Attendance.attendance_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
+    
+    if end_date:
+        query = query.filter(Attendance.attendance_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+    
+    return query.order_by(Attendance.attendance_date, Student.student_id)
+
+# 查询异步导入任务（考勤表格、人脸照片）的进度和结果（支持 wait 参数进行长轮询）
+@attendance_bp.route('/import_jobs/<job_id>', methods=['GET'])
+@teacher_or_admin_required
+def get_import_job(job_id):
+    try:
+        wait = min(request.args.get('wait', 0, type=float), 30)
+        job = bulk_jobs.get(job_id, current_user.id, wait=wait)
+        if not job:
+            return jsonify({'message': '任务不存在或已过期'}), 404
+        
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_code': job['status_code'],
+            'progress': job['progress'],
+            'result': job['result']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'查询任务失败: {str(e)}'}), 500
+
 # 导出考勤记录
 @attendance_bp.route('/export', methods=['GET'])
 @teacher_or_admin_required
@@ -130,37 +192,11 @@ def export_attendances():
         if current_user.role == 'teacher' and course.teacher_id != current_user.id:
             return jsonify({'message': '无权限导出此课程的考勤记录'}), 403
         
-        # 构建查询
-        query = Attendance.query.filter_by(course_id=course_id)
-        
-        if start_date:
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.attendance_date >= start)
-        
-        if end_date:
-            end = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.attendance_date <= end)
-        
-        # 执行查询
-        attendances = query.all()
-        
-        # 准备导出数据
-        export_data = []
-        
-        for attendance in attendances:
-            student = Student.query.get(attendance.student_id)
-            
-            export_data.append({
-                '学号': student.student_id,
-                '姓名': student.name,
-                '考勤日期': attendance.attendance_date.strftime('%Y-%m-%d'),
-                '签到时间': attendance.check_in_time.strftime('%Y-%m-%d %H:%M:%S') if attendance.check_in_time else '',
-                '状态': attendance.status,
-                '备注': attendance.remarks
-            })
+        # 执行查询并准备导出数据
+        export_data = [export_row(*row) for row in build_export_query(course.id, start_date, end_date)]
         
         # 创建DataFrame并导出为Excel
-        df = pd.DataFrame(export_data)
+        df = pd.DataFrame(export_data, columns=EXPORT_HEADERS)
         
         # 使用BytesIO作为文件对象
         output = io.BytesIO()
@@ -183,6 +219,57 @@ def export_attendances():
     except Exception as e:
         return jsonify({'message': f'导出失败: {str(e)}'}), 500
 
+# 下载考勤记录（CSV/XLSX 文件），从数据库游标分批读取并流式返回，内存占用与记录数无关
+@attendance_bp.route('/export/download', methods=['GET'])
+@teacher_or_admin_required
+def download_attendances():
+    try:
+        course_id = request.args.get('course_id')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        file_format = request.args.get('format', 'xlsx').lower()
+        
+        if file_format not in ('csv', 'xlsx'):
+            return jsonify({'message': '仅支持 csv 或 xlsx 格式'}), 400
+        
+        # 检查课程是否存在
+        course = Course.query.get(course_id)
+        if not course:
+            return jsonify({'message': '课程不存在'}), 404
+        
+        # 验证权限
+        if current_user.role == 'teacher' and course.teacher_id != current_user.id:
+            return jsonify({'message': '无权限导出此课程的考勤记录'}), 403
+        
+        # 构建查询
+        try:
+            query = build_export_query(course.id, start_date, end_date)
+        except ValueError:
+            return jsonify({'message': '日期格式错误'}), 400
+        
+        # 使用服务器端游标每次读取 yield_per 行
+        query = query.yield_per(current_app.config.get('ATTENDANCE_EXPORT_BATCH_SIZE', 1000))
+        rows = (export_row(*row) for row in query)
+        filename = f'考勤记录_{course.name}_{datetime.now().strftime("%Y%m%d")}.{file_format}'
+        
+        if file_format == 'csv':
+            response = Response(stream_with_context(iter_csv(rows)), mimetype='text/csv')
+            response.charset = 'utf-8'
+        else:
+            file = write_xlsx(rows, sheet_name='考勤记录')
+            response = Response(
+                iter_file(file),
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response.content_length = os.fstat(file.fileno()).st_size
+        response.headers['Content-Disposition'] = content_disposition(filename)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'导出失败: {str(e)}'}), 500
+
 # 获取考勤统计
 @attendance_bp.route('/stats', methods=['GET'])
 @teacher_or_admin_required
@@ -201,75 +288,73 @@ def get_attendance_stats():
         if current_user.role == 'teacher' and course.teacher_id != current_user.id:
             return jsonify({'message': '无权限查看此课程的考勤统计'}), 403
         
-        # 构建查询
-        query = Attendance.query.filter_by(course_id=course_id)
-        
-        if start_date:
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.attendance_date >= start)
-        
-        if end_date:
-            end = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.attendance_date <= end)
-        
-        # 获取所有考勤记录
-        attendances = query.all()
-        
-        # 按学生分组统计
-        student_stats = {}
-        for attendance in attendances:
-            student_id = attendance.student_id
-            if student_id not in student_stats:
-                student_stats[student_id] = {
-                    'student_id': student_id,
-                    'student_no': '',
-                    'name': '',
-                    'total': 0,
-                    'present': 0,
-                    'late': 0,
-                    'absent': 0
-                }
+        # 以标量子查询取选课人数，与统计数据在同一次查询中返回
+        enrolled_count = db.session.query(func.count(Enrollment.id)).filter(
+            Enrollment.course_id == course_id
+        ).scalar_subquery()
+        
+        if not start_date and not end_date:
+            # 不限日期时直接读取考勤汇总表（每个学生一行）
+            rows = db.session.query(
+                AttendanceRollup.student_id, Student.student_id, Student.name,
+                *(getattr(AttendanceRollup, column) for column in ROLLUP_COUNT_COLUMNS),
+                enrolled_count.label('total_students')
+            ).join(Student, Student.id == AttendanceRollup.student_id).filter(
+                AttendanceRollup.course_id == course_id,
+                AttendanceRollup.total > 0
+            ).all()
+        else:
+            # 指定日期范围时在数据库中按学生分组、按状态条件求和
+            query = db.session.query(
+                Attendance.student_id, Student.student_id, Student.name,
+                *status_count_columns(Attendance.status), enrolled_count.label('total_students')
+            ).join(Student, Student.id == Attendance.student_id).filter(Attendance.course_id == course_id)
+            
+            if start_date:
+                start = datetime.strptime(start_date, '%Y-%m-%d').date()
+                query = query.filter(Attendance.attendance_date >= start)
             
-            stats = student_stats[student_id]
-            stats['total'] += 1
+            if end_date:
+                end = datetime.strptime(end_date, '%Y-%m-%d').date()
+                query = query.filter(Attendance.attendance_date <= end)
             
-            if attendance.status == 'present':
-                stats['present'] += 1
-            elif attendance.status == 'late':
-                stats['late'] += 1
-            elif attendance.status == 'absent':
-                stats['absent'] += 1
-        
-        # 获取学生详细信息
+            rows = query.group_by(Attendance.student_id, Student.student_id, Student.name).all()
+        
+        # 按学生的统计
         result = []
-        for student_id, stats in student_stats.items():
-            student = Student.query.get(student_id)
-            if student:
-                stats['student_no'] = student.student_id
-                stats['name'] = student.name
-                # 计算出勤率
-                stats['attendance_rate'] = (stats['present'] / stats['total'] * 100) if stats['total'] > 0 else 0
-                result.append(stats)
+        for student_id, student_no, name, total, present, late, absent, _ in rows:
+            total, present, late, absent = int(total), int(present), int(late), int(absent)
+            result.append({
+                'student_id': student_id,
+                'student_no': student_no,
+                'name': name,
+                'total': total,
+                'present': present,
+                'late': late,
+                'absent': absent,
+                'attendance_rate': attendance_rate(present, total)
+            })
         
         # 按出勤率排序
         result.sort(key=lambda x: x['attendance_rate'], reverse=True)
         
         # 计算整体统计
-        overall_total = len(attendances)
-        overall_present = sum(1 for a in attendances if a.status == 'present')
-        overall_late = sum(1 for a in attendances if a.status == 'late')
-        overall_absent = sum(1 for a in attendances if a.status == 'absent')
+        overall_total = sum(stats['total'] for stats in result)
+        overall_present = sum(stats['present'] for stats in result)
         
-        # 获取学生总数（选修该课程的学生数）
-        student_count = Enrollment.query.filter_by(course_id=course_id).count()
+        # 获取学生总数（选修该课程的学生数）；没有考勤记录时单独查询
+        if rows:
+            student_count = rows[0].total_students
+        else:
+            student_count = Enrollment.query.filter_by(course_id=course_id).count()
         
         overall_stats = {
             'total_records': overall_total,
             'total_students': student_count,
             'present': overall_present,
-            'late': overall_late,
-            'absent': overall_absent,
-            'average_attendance_rate': (overall_present / overall_total * 100) if overall_total > 0 else 0
+            'late': sum(stats['late'] for stats in result),
+            'absent': sum(stats['absent'] for stats in result),
+            'average_attendance_rate': attendance_rate(overall_present, overall_total)
         }
         
         return jsonify({
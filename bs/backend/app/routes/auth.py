@@ -1,11 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db, login_manager
 from app.models import Student, Teacher, Admin
+from app.utils import face_extraction_pool, campus_index, encoding_codec, image_store, FaceImage
 import json
-from werkzeug.utils import secure_filename
-import os
-import time
 
 # 创建蓝图
 auth_bp = Blueprint('auth', __name__)
@@ -111,24 +109,30 @@ def register():
             student.set_password(data.get('password'))
             
             # 处理人脸图片
+            image = None
             if face_image and face_image.filename != '':
-                # 确保上传目录存在
-                upload_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'uploads')
-                os.makedirs(upload_dir, exist_ok=True)
+                image = FaceImage.from_bytes(face_image.read(), current_app.config.get('FACE_IMAGE_MAX_SIDE', 640))
                 
-                # 保存文件
-                filename = secure_filename(face_image.filename)
-                timestamp = str(int(time.time()))
-                unique_filename = f"{student.student_id}_{timestamp}_{filename}"
-                filepath = os.path.join(upload_dir, unique_filename)
-                face_image.save(filepath)
-                
-                # 更新学生信息
-                student.face_image_path = filepath
+                # 提取人脸特征（失败不影响注册，学生可稍后重新上传人脸）；无法解析的图片不提取也不保存
+                valid, message = image.validate(current_app.config.get('ALLOWED_EXTENSIONS'))
+                if valid:
+                    encoding, message = face_extraction_pool.extract_from_image(image)
+                    if encoding is not None:
+                        student.face_encoding = encoding_codec.pack(encoding)
+                else:
+                    image = None
+                print(f"Face encoding extraction: {message}")
             
             db.session.add(student)
             db.session.commit()
             
+            # 人脸图片与上传接口共用图片存储
+            if image is not None:
+                image_store.put(image, Student, [student.id], 'face_image_path')
+            
+            if student.face_encoding:
+                campus_index.add(student.id, student.face_encoding)
+            
             return jsonify({'success': True, 'message': '注册成功'}), 201
         
         elif user_type == 'teacher':
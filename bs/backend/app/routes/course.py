@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Course, CourseCategory, Teacher, Enrollment
+from app.models import Course, CourseCategory, Teacher, Enrollment, Attendance
+from app.utils import face_gallery, image_store, attendance_rollups, course_snapshots
 from datetime import datetime, time
 
 # 创建蓝图
@@ -125,6 +126,10 @@ def update_course(course_id):
         if 'category_id' in data:
             course.category_id = data['category_id']
         
+        # 学期或学年变化时同步到考勤汇总
+        if 'semester' in data or 'year' in data:
+            attendance_rollups.sync_semester(course)
+        
         db.session.commit()
         return jsonify({'message': '课程更新成功'}), 200
         
@@ -146,10 +151,23 @@ def delete_course(course_id):
         if current_user.role != 'admin' and course.teacher_id != current_user.id:
             return jsonify({'message': '无权限删除此课程'}), 403
         
-        # 删除课程（会级联删除相关的考勤记录和选课记录）
+        # 记录课程考勤记录引用的图片，删除后释放
+        image_keys = [
+            image_path for (image_path,) in db.session.query(Attendance.image_path).filter(
+                Attendance.course_id == course_id,
+                Attendance.image_path.isnot(None)
+            ).all()
+        ]
+        
+        # 删除课程（会级联删除相关的考勤记录和选课记录），同时删除其考勤汇总和每日快照
+        attendance_rollups.delete(course_id=course_id)
+        course_snapshots.delete(course_id)
         db.session.delete(course)
         db.session.commit()
         
+        face_gallery.invalidate(course_id)
+        image_store.release(image_keys)
+        
         return jsonify({'message': '课程删除成功'}), 200
         
     except Exception as e:
@@ -271,6 +289,9 @@ def enroll_course(course_id):
         db.session.add(enrollment)
         db.session.commit()
         
+        # 课程名单变化，使该课程的特征库缓存失效
+        face_gallery.invalidate(course_id)
+        
         return jsonify({'message': '选课成功'}), 200
         
     except Exception as e:
@@ -299,6 +320,9 @@ def drop_course(course_id):
         db.session.delete(enrollment)
         db.session.commit()
         
+        # 课程名单变化，使该课程的特征库缓存失效
+        face_gallery.invalidate(course_id)
+        
         return jsonify({'message': '退课成功'}), 200
         
     except Exception as e:
@@ -0,0 +1,42 @@
+from flask import Blueprint, Response, jsonify, send_file
+from flask_login import login_required
+from app.utils import image_store, image_writer
+import mimetypes
+import os
+
+# 创建蓝图
+images_bp = Blueprint('images', __name__)
+
+# 图片内容由标识（内容摘要）唯一确定，永不改变，浏览器可长期缓存且无需重新验证
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# 发送图片文件并设置长期缓存；文件还在写入队列中时直接返回队列中的原图（不缓存）
+def send_stored_image(path, etag, original_path=None):
+    if not os.path.exists(path):
+        data = image_writer.pending_data(original_path or path)
+        if data is None:
+            return jsonify({'message': '图片不存在'}), 404
+        response = Response(data, mimetype=mimetypes.guess_type(original_path or path)[0] or 'application/octet-stream')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    response = send_file(path, conditional=True, etag=etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+# 获取原图
+@images_bp.route('/<key>', methods=['GET'])
+@login_required
+def get_image(key):
+    parsed = image_store.parse_key(key)
+    if not parsed:
+        return jsonify({'message': '图片不存在'}), 404
+    return send_stored_image(image_store.path_for(key), parsed[0])
+
+# 获取缩略图
+@images_bp.route('/<key>/thumbnail', methods=['GET'])
+@login_required
+def get_thumbnail(key):
+    parsed = image_store.parse_key(key)
+    if not parsed:
+        return jsonify({'message': '图片不存在'}), 404
+    return send_stored_image(image_store.thumbnail_path_for(key), parsed[0] + '-thumbnail', image_store.path_for(key))
\ No newline at end of file
@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Student, Course, Enrollment, Attendance
-from app.utils import face_recognizer
-import os
-import base64
+from app.models import Student, Course, Enrollment, Attendance, AttendanceRollup
+from app.utils import face_gallery, campus_index, face_extraction_pool, encoding_codec, image_store
+from app.utils.uploads import load_face_image_from_request
+from app.utils.attendance_stats import attendance_rate
+from app.utils.attendance_rollup import COUNT_COLUMNS as ROLLUP_COUNT_COLUMNS
+from sqlalchemy import func
 from datetime import datetime
 
 # 创建蓝图
@@ -65,37 +67,28 @@ def update_profile():
 @student_required
 def upload_face():
     try:
-        data = request.get_json()
-        base64_image = data.get('image')
-        
-        if not base64_image:
-            return jsonify({'message': '请上传人脸图片'}), 400
+        # 读取并校验图片（支持JSON base64、原始图片请求体和multipart文件，特征提取和保存共用同一份解码结果）
+        face_image, message = load_face_image_from_request()
+        if face_image is None:
+            return jsonify({'message': message}), 400
         
         # 提取人脸特征
-        encoding, message = face_recognizer.extract_face_encoding_from_base64(base64_image)
+        encoding, message = face_extraction_pool.extract_from_image(face_image)
         
         if encoding is None:
             return jsonify({'message': message}), 400
         
-        # 保存人脸特征和图片
+        # 保存人脸特征
         student = Student.query.get(current_user.id)
-        student.face_encoding = encoding.tobytes()  # 转换为二进制存储
-        
-        # 保存图片到服务器
-        if 'base64,' in base64_image:
-            base64_image = base64_image.split('base64,')[1]
+        student.face_encoding = encoding_codec.pack(encoding)  # 转换为带版本头部的二进制存储
+        db.session.commit()
         
-        image_bytes = base64.b64decode(base64_image)
-        image_filename = f'student_{student.id}_{datetime.now().strftime("%Y%m%d%H%M%S")}.jpg'
-        image_path = os.path.join('app/static/uploads/face_images', image_filename)
-        full_image_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), image_path)
+        # 图片存入图片存储（重复上传同一张照片不会再保存一份），并释放对旧图片的引用
+        image_store.put(face_image, Student, [student.id], 'face_image_path')
         
-        success, save_message = face_recognizer.save_face_image(image_bytes, full_image_path)
-        if not success:
-            return jsonify({'message': save_message}), 500
-        
-        student.face_image_path = image_filename
-        db.session.commit()
+        # 学生人脸数据变化，使其所选课程的特征库缓存失效
+        face_gallery.invalidate_student(student.id)
+        campus_index.add(student.id, encoding)
         
         return jsonify({'message': '人脸信息上传成功'}), 200
         
@@ -173,7 +166,8 @@ def get_student_attendances():
                 'attendance_date': attendance.attendance_date.strftime('%Y-%m-%d'),
                 'check_in_time': attendance.check_in_time.strftime('%Y-%m-%d %H:%M:%S') if attendance.check_in_time else None,
                 'status': attendance.status,
-                'remarks': attendance.remarks
+                'remarks': attendance.remarks,
+                **image_store.urls(attendance.image_path)
             })
         
         return jsonify(result), 200
@@ -188,30 +182,25 @@ def get_attendance_stats():
     try:
         course_id = request.args.get('course_id')
         
-        # 构建查询
-        query = Attendance.query.filter_by(student_id=current_user.id)
+        # 读取考勤汇总表（每门课程一行）并求和，只返回一行统计结果
+        query = db.session.query(*(
+            func.coalesce(func.sum(getattr(AttendanceRollup, column)), 0) for column in ROLLUP_COUNT_COLUMNS
+        )).filter(AttendanceRollup.student_id == current_user.id)
         
         if course_id:
-            query = query.filter_by(course_id=course_id)
-        
-        # 获取所有考勤记录
-        attendances = query.all()
+            query = query.filter(AttendanceRollup.course_id == course_id)
         
-        # 统计
-        total = len(attendances)
-        present = sum(1 for a in attendances if a.status == 'present')
-        late = sum(1 for a in attendances if a.status == 'late')
-        absent = sum(1 for a in attendances if a.status == 'absent')
+        total, present, late, absent = (int(value) for value in query.one())
         
         # 计算出勤率
-        attendance_rate = (present / total * 100) if total > 0 else 0
+        rate = attendance_rate(present, total)
         
         stats = {
             'total_classes': total,
             'present': present,
             'late': late,
             'absent': absent,
-            'attendance_rate': round(attendance_rate, 2)
+            'attendance_rate': round(rate, 2)
         }
         
         return jsonify(stats), 200
@@ -1,11 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import Teacher, Course, Student, Attendance, Enrollment
-from app.utils import face_recognizer
+from app.utils import face_recognizer, face_gallery, campus_index, face_extraction_pool, checkin_jobs, video_sessions, image_store, course_snapshots, FaceImage
+from app.utils.attendance_snapshot import parse_trend_range
+from app.utils.uploads import load_face_image_from_request, request_options, int_option, iter_frames_from_request
 from datetime import datetime, time
-import os
-import base64
+import uuid
 
 # 创建蓝图
 teacher_bp = Blueprint('teacher', __name__)
@@ -22,6 +23,20 @@ def teacher_required(f):
     decorated_function.__module__ = f.__module__
     return decorated_function
 
+# 根据课程开始时间确定考勤状态（迟到/准时）
+def determine_attendance_status(course, now):
+    status = 'present'
+    if course.start_time:
+        # 计算迟到时间
+        current_time = now.time()
+        if current_time > course.start_time:
+            # 计算迟到的分钟数
+            course_start = datetime.combine(now.date(), course.start_time)
+            minutes_late = (now - course_start).total_seconds() / 60
+            if minutes_late > 15:  # 超过15分钟算迟到
+                status = 'late'
+    return status
+
 # 更新教师个人信息
 @teacher_bp.route('/profile', methods=['PUT'])
 @teacher_required
@@ -101,21 +116,25 @@ def get_course_students(course_id):
         if not course:
             return jsonify({'message': '课程不存在或无权限'}), 404
         
-        # 获取课程的所有学生
-        enrollments = Enrollment.query.filter_by(course_id=course_id).all()
+        # 获取课程的所有学生（单次联表查询，只取需要的列，不加载人脸特征数据）
+        rows = db.session.query(
+            Student.id, Student.student_id, Student.name, Student.gender, Student.age,
+            Student.major, Student.class_name, Student.face_encoding.isnot(None)
+        ).join(Enrollment, Enrollment.student_id == Student.id).filter(
+            Enrollment.course_id == course_id
+        ).order_by(Enrollment.id).all()
         
         students = []
-        for enrollment in enrollments:
-            student = enrollment.student
+        for student_id, student_no, name, gender, age, major, class_name, has_face_data in rows:
             students.append({
-                'student_id': student.id,
-                'student_no': student.student_id,
-                'name': student.name,
-                'gender': student.gender,
-                'age': student.age,
-                'major': student.major,
-                'class_name': student.class_name,
-                'has_face_data': True if student.face_encoding else False
+                'student_id': student_id,
+                'student_no': student_no,
+                'name': name,
+                'gender': gender,
+                'age': age,
+                'major': major,
+                'class_name': class_name,
+                'has_face_data': bool(has_face_data)
             })
         
         return jsonify(students), 200
@@ -136,30 +155,35 @@ def get_course_attendances(course_id):
         # 获取查询参数
         attendance_date = request.args.get('date')
         
-        # 构建查询
-        query = Attendance.query.filter_by(course_id=course_id)
+        # 构建查询（与学生表联表，只取需要的列）
+        query = db.session.query(
+            Attendance.id, Attendance.student_id, Student.student_id, Student.name,
+            Attendance.attendance_date, Attendance.check_in_time, Attendance.status,
+            Attendance.face_match_score, Attendance.remarks, Attendance.image_path
+        ).join(Student, Student.id == Attendance.student_id).filter(Attendance.course_id == course_id)
         
         if attendance_date:
             date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
-            query = query.filter_by(attendance_date=date)
+            query = query.filter(Attendance.attendance_date == date)
         
         # 执行查询并获取结果
-        attendances = query.order_by(Attendance.attendance_date.desc(), Attendance.student_id).all()
+        rows = query.order_by(Attendance.attendance_date.desc(), Attendance.student_id).all()
         
         # 格式化结果
         result = []
-        for attendance in attendances:
-            student = attendance.student
+        for (attendance_id, student_id, student_no, student_name, attendance_date, check_in_time,
+             status, face_match_score, remarks, image_path) in rows:
             result.append({
-                'id': attendance.id,
-                'student_id': student.id,
-                'student_no': student.student_id,
-                'student_name': student.name,
-                'attendance_date': attendance.attendance_date.strftime('%Y-%m-%d'),
-                'check_in_time': attendance.check_in_time.strftime('%Y-%m-%d %H:%M:%S') if attendance.check_in_time else None,
-                'status': attendance.status,
-                'face_match_score': attendance.face_match_score,
-                'remarks': attendance.remarks
+                'id': attendance_id,
+                'student_id': student_id,
+                'student_no': student_no,
+                'student_name': student_name,
+                'attendance_date': attendance_date.strftime('%Y-%m-%d'),
+                'check_in_time': check_in_time.strftime('%Y-%m-%d %H:%M:%S') if check_in_time else None,
+                'status': status,
+                'face_match_score': face_match_score,
+                'remarks': remarks,
+                **image_store.urls(image_path)
             })
         
         return jsonify(result), 200
@@ -167,6 +191,132 @@ def get_course_attendances(course_id):
     except Exception as e:
         return jsonify({'message': f'获取考勤记录失败: {str(e)}'}), 500
 
+# 获取课程的考勤趋势（按日期，读取每日考勤快照）
+@teacher_bp.route('/courses/<int:course_id>/attendance_trend', methods=['GET'])
+@teacher_required
+def get_course_attendance_trend(course_id):
+    try:
+        # 验证课程是否属于当前教师
+        course = Course.query.filter_by(id=course_id, teacher_id=current_user.id).first()
+        if not course:
+            return jsonify({'message': '课程不存在或无权限'}), 404
+        
+        date_range, msg = parse_trend_range(request.args.get('start_date'), request.args.get('end_date'))
+        if not date_range:
+            return jsonify({'message': msg}), 400
+        
+        return jsonify({
+            'course_id': course_id,
+            'start_date': date_range[0].isoformat(),
+            'end_date': date_range[1].isoformat(),
+            'trend': course_snapshots.trend(*date_range, course_id=course_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'获取考勤趋势失败: {str(e)}'}), 500
+
+# 获取教师全部课程合计的考勤趋势
+@teacher_bp.route('/attendance_trend', methods=['GET'])
+@teacher_required
+def get_attendance_trend():
+    try:
+        date_range, msg = parse_trend_range(request.args.get('start_date'), request.args.get('end_date'))
+        if not date_range:
+            return jsonify({'message': msg}), 400
+        
+        course_ids = db.session.query(Course.id).filter(Course.teacher_id == current_user.id)
+        return jsonify({
+            'start_date': date_range[0].isoformat(),
+            'end_date': date_range[1].isoformat(),
+            'trend': course_snapshots.trend(*date_range, course_ids=course_ids)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'获取考勤趋势失败: {str(e)}'}), 500
+
+# 人脸识别签到流程：提取特征、匹配、保存图片并写入考勤记录
+def process_face_checkin(course_id, face_image):
+    """
+    同步接口和异步签到任务共用的签到流程，不依赖请求上下文中的当前用户
+    
+    Args:
+        course_id: 课程ID
+        face_image: 已解码并校验过的 FaceImage
+    
+    Returns:
+        (结果字典, HTTP状态码)
+    """
+    course = Course.query.get(course_id)
+    if not course:
+        return {'message': '课程不存在'}, 404
+    
+    # 提取人脸特征
+    encoding, message = face_extraction_pool.extract_from_image(face_image)
+    
+    if encoding is None:
+        return {'message': message}, 400
+    
+    # 获取课程的人脸特征库（进程内缓存，名单变化时失效）
+    matcher = face_gallery.get(course_id)
+    
+    if len(matcher) == 0:
+        return {'message': '该课程的学生尚未上传人脸数据'}, 400
+    
+    # 识别人脸
+    is_match, student_id, score = face_recognizer.recognize_faces(encoding, matcher)
+    
+    if not is_match:
+        return {'message': '未识别到匹配的学生', 'score': score}, 400
+    
+    # 获取当前日期
+    today = datetime.now().date()
+    now = datetime.now()
+    
+    # 检查是否已经考勤
+    attendance = Attendance.query.filter_by(
+        student_id=student_id,
+        course_id=course_id,
+        attendance_date=today
+    ).first()
+    
+    if attendance:
+        return {'message': '该学生今天已经考勤'}, 400
+    
+    # 确定考勤状态（迟到/准时）
+    status = determine_attendance_status(course, now)
+    
+    # 创建考勤记录
+    attendance = Attendance(
+        student_id=student_id,
+        course_id=course_id,
+        attendance_date=today,
+        check_in_time=now,
+        status=status,
+        face_match_score=score
+    )
+    
+    db.session.add(attendance)
+    db.session.commit()
+    
+    # 考勤图片存入图片存储（内容相同的图片只保存一份），新图片在后台写盘，不占用签到请求的时间
+    image_store.put(face_image, Attendance, [attendance.id])
+    
+    # 获取学生信息
+    student = Student.query.get(student_id)
+    
+    return {
+        'message': '考勤成功',
+        'student': {
+            'student_id': student.student_id,
+            'name': student.name
+        },
+        'attendance': {
+            'status': status,
+            'check_in_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'score': score
+        }
+    }, 200
+
 # 人脸识别考勤
 @teacher_bp.route('/courses/<int:course_id>/face_attendance', methods=['POST'])
 @teacher_required
@@ -177,107 +327,353 @@ def face_attendance(course_id):
         if not course:
             return jsonify({'message': '课程不存在或无权限'}), 404
         
-        data = request.get_json()
-        base64_image = data.get('image')
+        # 读取并校验图片（支持JSON base64、原始图片请求体和multipart文件），后续流程共用同一份解码结果
+        face_image, message = load_face_image_from_request()
+        if face_image is None:
+            return jsonify({'message': message}), 400
         
-        if not base64_image:
-            return jsonify({'message': '请上传人脸图片'}), 400
+        options = request_options()
         
-        # 提取人脸特征
-        encoding, message = face_recognizer.extract_face_encoding_from_base64(base64_image)
+        # 异步模式：立即返回任务ID，由后台线程执行签到，客户端轮询结果
+        if str(options.get('async', '')).lower() in ('1', 'true'):
+            # 请求结束后上传的临时文件会被关闭，先读入内存
+            job_id = checkin_jobs.submit(current_user.id, process_face_checkin, course_id, face_image.detach())
+            if job_id is None:
+                return jsonify({'message': '签到请求过多，请稍后重试'}), 503
+            return jsonify({
+                'message': '签到任务已提交',
+                'job_id': job_id,
+                'status_url': url_for('teacher.get_checkin_job', job_id=job_id)
+            }), 202
         
-        if encoding is None:
+        result, status_code = process_face_checkin(course_id, face_image)
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'考勤失败: {str(e)}'}), 500
+
+# 查询异步签到任务的结果（支持 wait 参数进行长轮询）
+@teacher_bp.route('/checkin_jobs/<job_id>', methods=['GET'])
+@teacher_required
+def get_checkin_job(job_id):
+    try:
+        wait = min(request.args.get('wait', 0, type=float), 30)
+        job = checkin_jobs.get(job_id, current_user.id, wait=wait)
+        if not job:
+            return jsonify({'message': '任务不存在或已过期'}), 404
+        
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_code': job['status_code'],
+            'progress': job['progress'],
+            'result': job['result']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'查询任务失败: {str(e)}'}), 500
+
+# 课堂合照考勤：一张照片中检测全部人脸并批量签到
+@teacher_bp.route('/courses/<int:course_id>/photo_attendance', methods=['POST'])
+@teacher_required
+def photo_attendance(course_id):
+    try:
+        # 验证课程是否属于当前教师
+        course = Course.query.filter_by(id=course_id, teacher_id=current_user.id).first()
+        if not course:
+            return jsonify({'message': '课程不存在或无权限'}), 404
+        
+        # 合照中人脸较小，按更高的分辨率解码
+        face_image, message = load_face_image_from_request(
+            max_side=current_app.config.get('FACE_PHOTO_MAX_SIDE', 2048),
+            missing_message='请上传课堂照片'
+        )
+        if face_image is None:
             return jsonify({'message': message}), 400
         
-        # 获取课程的所有学生（带有面部数据）
-        enrollments = Enrollment.query.filter_by(course_id=course_id).all()
-        known_encodings_with_ids = []
+        # 检测照片中的全部人脸并批量提取特征
+        boxes, encodings, message = face_extraction_pool.extract_all_from_image(face_image)
+        
+        if encodings is None:
+            return jsonify({'message': message}), 400
         
-        for enrollment in enrollments:
-            student = enrollment.student
-            if student.face_encoding:
-                known_encodings_with_ids.append((student.face_encoding, student.id))
+        matcher = face_gallery.get(course_id)
         
-        if not known_encodings_with_ids:
+        if len(matcher) == 0:
             return jsonify({'message': '该课程的学生尚未上传人脸数据'}), 400
         
-        # 识别人脸
-        is_match, student_id, score = face_recognizer.recognize_faces(encoding, known_encodings_with_ids)
-        
-        if not is_match:
-            return jsonify({'message': '未识别到匹配的学生', 'score': score}), 400
+        # 一次矩阵乘法完成所有人脸的匹配；同一学生被多张人脸匹配时保留最高分
+        best_matches = {}
+        unmatched_faces = []
+        for box, result in zip(boxes, matcher.match_many(encodings)):
+            if not result.is_match:
+                unmatched_faces.append({'box': box, 'score': result.score})
+                continue
+            if result.best_id not in best_matches or result.score > best_matches[result.best_id][1]:
+                best_matches[result.best_id] = (box, result.score)
         
-        # 获取当前日期
         today = datetime.now().date()
         now = datetime.now()
         
-        # 检查是否已经考勤
-        attendance = Attendance.query.filter_by(
-            student_id=student_id,
-            course_id=course_id,
-            attendance_date=today
-        ).first()
-        
-        if attendance:
-            return jsonify({'message': '该学生今天已经考勤'}), 400
-        
-        # 确定考勤状态（迟到/准时）
-        status = 'present'
-        if course.start_time:
-            # 计算迟到时间
-            current_time = now.time()
-            if current_time > course.start_time:
-                # 计算迟到的分钟数
-                course_start = datetime.combine(today, course.start_time)
-                minutes_late = (now - course_start).total_seconds() / 60
-                if minutes_late > 15:  # 超过15分钟算迟到
-                    status = 'late'
-        
-        # 创建考勤记录
-        attendance = Attendance(
-            student_id=student_id,
-            course_id=course_id,
-            attendance_date=today,
-            check_in_time=now,
-            status=status,
-            face_match_score=score
+        # 一次查询获取今天已考勤的学生
+        already_checked_in = set()
+        if best_matches:
+            already_checked_in = {
+                student_id for (student_id,) in db.session.query(Attendance.student_id).filter(
+                    Attendance.course_id == course_id,
+                    Attendance.attendance_date == today,
+                    Attendance.student_id.in_(list(best_matches.keys()))
+                ).all()
+            }
+        
+        new_student_ids = [student_id for student_id in best_matches if student_id not in already_checked_in]
+        
+        # 在一个事务中批量写入考勤记录
+        status = determine_attendance_status(course, now)
+        attendances = [
+            Attendance(
+                student_id=student_id,
+                course_id=course_id,
+                attendance_date=today,
+                check_in_time=now,
+                status=status,
+                face_match_score=best_matches[student_id][1]
+            )
+            for student_id in new_student_ids
+        ]
+        db.session.add_all(attendances)
+        db.session.commit()
+        
+        # 课堂照片只保存一份，所有本次签到的记录共用
+        if attendances:
+            image_store.put(face_image, Attendance, [attendance.id for attendance in attendances])
+        
+        # 一次查询获取所有识别到的学生信息
+        students = {}
+        if best_matches:
+            students = {
+                student_id: (student_no, name) for student_id, student_no, name in db.session.query(
+                    Student.id, Student.student_id, Student.name
+                ).filter(Student.id.in_(list(best_matches.keys()))).all()
+            }
+        
+        recognized = []
+        for student_id, (box, score) in best_matches.items():
+            student_no, name = students.get(student_id, (None, None))
+            recognized.append({
+                'student_id': student_no,
+                'name': name,
+                'box': box,
+                'score': score,
+                'status': 'already_checked_in' if student_id in already_checked_in else status
+            })
+        
+        return jsonify({
+            'message': '考勤完成',
+            'faces_detected': len(boxes),
+            'checked_in': len(attendances),
+            'check_in_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'recognized': recognized,
+            'unmatched_faces': unmatched_faces
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'考勤失败: {str(e)}'}), 500
+
+# 视频流签到：连续上传多帧，跨帧跟踪人脸并投票，每个学生在一个会话中只签到一次
+@teacher_bp.route('/courses/<int:course_id>/stream_attendance', methods=['POST'])
+@teacher_required
+def stream_attendance(course_id):
+    try:
+        # 验证课程是否属于当前教师
+        course = Course.query.filter_by(id=course_id, teacher_id=current_user.id).first()
+        if not course:
+            return jsonify({'message': '课程不存在或无权限'}), 404
+        
+        options = request_options()
+        # 未指定会话ID时新建会话，终端在后续请求中带上返回的 session_id 继续上传
+        session_id = options.get('session_id') or uuid.uuid4().hex
+        sample_every, message = int_option(
+            options, 'sample_every', current_app.config.get('VIDEO_CHECKIN_SAMPLE_EVERY', 3), minimum=1
         )
+        if sample_every is None:
+            return jsonify({'message': message}), 400
+        max_frames = current_app.config.get('VIDEO_CHECKIN_MAX_FRAMES', 600)
+        max_side = current_app.config.get('FACE_IMAGE_MAX_SIDE', 640)
         
-        # 保存考勤图片
-        if 'base64,' in base64_image:
-            base64_image = base64_image.split('base64,')[1]
+        matcher = face_gallery.get(course_id)
         
-        image_bytes = base64.b64decode(base64_image)
-        image_filename = f'attendance_{course_id}_{student_id}_{now.strftime("%Y%m%d%H%M%S")}.jpg'
-        image_path = os.path.join('app/static/uploads/attendance_images', image_filename)
-        full_image_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), image_path)
+        if len(matcher) == 0:
+            return jsonify({'message': '该课程的学生尚未上传人脸数据'}), 400
         
-        success, save_message = face_recognizer.save_face_image(image_bytes, full_image_path)
-        if success:
-            attendance.image_path = image_filename
+        session = video_sessions.get(course_id, session_id)
+        with session.lock:
+            frames_received = 0
+            frames_processed = 0
+            faces_detected = 0
+            confirmed = {}  # 本次请求新确认的学生 student_id -> (平均相似度, 最佳帧)
+            
+            for frame_bytes in iter_frames_from_request():
+                if frames_received >= max_frames:
+                    break
+                frames_received += 1
+                session.frame_count += 1
+                # 按间隔抽帧，相邻帧内容几乎相同，无需逐帧识别
+                if (session.frame_count - 1) % sample_every:
+                    continue
+                
+                frame = FaceImage.from_bytes(frame_bytes, max_side)
+                try:
+                    boxes, encodings, message = face_extraction_pool.extract_all_from_image(frame)
+                except (OSError, ValueError):
+                    # 损坏的帧直接跳过
+                    continue
+                frames_processed += 1
+                
+                if encodings is None:
+                    session.tracker.update(session.frame_count, [], [])
+                    continue
+                
+                faces_detected += len(boxes)
+                session.tracker.update(session.frame_count, boxes, matcher.match_many(encodings), frame)
+                
+                # 轨迹过期前取走已确认的学生；会话内已签到的学生不再处理
+                for student_id, (score, best_frame) in session.tracker.confirmed().items():
+                    if student_id in session.checked_in:
+                        continue
+                    if student_id not in confirmed or score > confirmed[student_id][0]:
+                        confirmed[student_id] = (score, best_frame)
+            
+            today = datetime.now().date()
+            now = datetime.now()
+            
+            # 一次查询获取今天已考勤的学生（如通过其它方式签到）
+            already_checked_in = set()
+            if confirmed:
+                already_checked_in = {
+                    student_id for (student_id,) in db.session.query(Attendance.student_id).filter(
+                        Attendance.course_id == course_id,
+                        Attendance.attendance_date == today,
+                        Attendance.student_id.in_(list(confirmed.keys()))
+                    ).all()
+                }
+            
+            # 在一个事务中批量写入考勤记录，每个学生保存相似度最高的一帧
+            status = determine_attendance_status(course, now)
+            attendances = [
+                Attendance(
+                    student_id=student_id,
+                    course_id=course_id,
+                    attendance_date=today,
+                    check_in_time=now,
+                    status=status,
+                    face_match_score=score
+                )
+                for student_id, (score, _) in confirmed.items() if student_id not in already_checked_in
+            ]
+            db.session.add_all(attendances)
+            db.session.commit()
+            
+            # 保存各学生相似度最高的一帧
+            for attendance in attendances:
+                image_store.put(confirmed[attendance.student_id][1], Attendance, [attendance.id])
+            
+            session.checked_in.update(confirmed.keys())
+            pending = session.tracker.pending()
+            session_checked_in = len(session.checked_in)
+        
+        # 一次查询获取本次确认的学生信息
+        students = {}
+        if confirmed:
+            students = {
+                student_id: (student_no, name) for student_id, student_no, name in db.session.query(
+                    Student.id, Student.student_id, Student.name
+                ).filter(Student.id.in_(list(confirmed.keys()))).all()
+            }
         
-        db.session.add(attendance)
-        db.session.commit()
+        recognized = []
+        for student_id, (score, _) in confirmed.items():
+            student_no, name = students.get(student_id, (None, None))
+            recognized.append({
+                'student_id': student_no,
+                'name': name,
+                'score': score,
+                'status': 'already_checked_in' if student_id in already_checked_in else status
+            })
         
-        # 获取学生信息
-        student = Student.query.get(student_id)
+        return jsonify({
+            'message': '视频签到完成',
+            'session_id': session_id,
+            'frames_received': frames_received,
+            'frames_processed': frames_processed,
+            'faces_detected': faces_detected,
+            'checked_in': len(attendances),
+            'session_checked_in': session_checked_in,
+            'pending_tracks': pending,
+            'recognized': recognized
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'视频签到失败: {str(e)}'}), 500
+
+# 全校范围人脸识别（不限定课程，用于公共教学楼的考勤终端）
+@teacher_bp.route('/face_identify', methods=['POST'])
+@teacher_required
+def face_identify():
+    try:
+        face_image, message = load_face_image_from_request()
+        if face_image is None:
+            return jsonify({'message': message}), 400
+        
+        top_k, message = int_option(request_options(), 'top_k', 5, minimum=1, maximum=20)
+        if top_k is None:
+            return jsonify({'message': message}), 400
+        
+        # 提取人脸特征
+        encoding, message = face_extraction_pool.extract_from_image(face_image)
+        
+        if encoding is None:
+            return jsonify({'message': message}), 400
+        
+        # 在全校人脸索引中检索
+        result = campus_index.identify(encoding, top_k=top_k)
+        
+        if not result.candidates:
+            return jsonify({'message': '尚无学生上传人脸数据'}), 400
+        
+        candidates = [{'student_id': student_id, 'score': score} for student_id, score in result.candidates]
+        
+        if not result.is_match:
+            return jsonify({'message': '未识别到匹配的学生', 'score': result.score, 'candidates': candidates}), 400
+        
+        student = Student.query.get(result.best_id)
+        if not student:
+            # 索引中的学生已被删除
+            campus_index.remove(result.best_id)
+            return jsonify({'message': '未识别到匹配的学生', 'score': result.score}), 400
+        
+        # 学生所选课程，便于终端选择本次考勤的课程
+        courses = db.session.query(Course.id, Course.name).join(
+            Enrollment, Enrollment.course_id == Course.id
+        ).filter(Enrollment.student_id == student.id).all()
         
         return jsonify({
-            'message': '考勤成功',
+            'message': '识别成功',
             'student': {
+                'id': student.id,
                 'student_id': student.student_id,
                 'name': student.name
             },
-            'attendance': {
-                'status': status,
-                'check_in_time': now.strftime('%Y-%m-%d %H:%M:%S'),
-                'score': score
-            }
+            'score': result.score,
+            'candidates': candidates,
+            'courses': [{'course_id': course_id, 'name': name} for course_id, name in courses]
         }), 200
         
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': f'考勤失败: {str(e)}'}), 500
+        return jsonify({'message': f'识别失败: {str(e)}'}), 500
 
 # 手动修改考勤记录
 @teacher_bp.route('/attendances/<int:attendance_id>', methods=['PUT'])
@@ -1,3 +1,16 @@
+from app.utils.encoding_format import encoding_codec
 from app.utils.face_recognition import face_recognizer
+from app.utils.face_image import FaceImage, load_face_image
+from app.utils.face_matcher import FaceMatcher, MatchResult
+from app.utils.face_gallery import face_gallery, campus_index
+from app.utils.encoding_cache import encoding_cache
+from app.utils.extraction_pool import face_extraction_pool
+from app.utils.checkin_jobs import checkin_jobs, bulk_jobs
+from app.utils.video_checkin import video_sessions
+from app.utils.image_writer import image_writer
+from app.utils.image_store import image_store
+from app.utils.attendance_rollup import attendance_rollups
+from app.utils.attendance_snapshot import course_snapshots
+from app.utils.dashboard_stats import dashboard_stats
 
-__all__ = ['face_recognizer']
\ No newline at end of file
+__all__ = ['encoding_codec', 'face_recognizer', 'FaceImage', 'load_face_image', 'FaceMatcher', 'MatchResult', 'face_gallery', 'campus_index', 'encoding_cache', 'face_extraction_pool', 'checkin_jobs', 'bulk_jobs', 'video_sessions', 'image_writer', 'image_store', 'attendance_rollups', 'course_snapshots', 'dashboard_stats']
\ No newline at end of file
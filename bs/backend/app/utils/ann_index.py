@@ -0,0 +1,173 @@
+import threading
+import numpy as np
+from app.utils.face_matcher import l2_normalize
+
+
+class _InvertedList:
+    """倒排列表：一个聚类中心下的全部向量及其ID，使用容量翻倍的连续数组存储"""
+
+    def __init__(self, dim, capacity=16):
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.size = 0
+
+    def append(self, item_id, vector):
+        if self.size == len(self.ids):
+            capacity = len(self.ids) * 2
+            self.ids = np.resize(self.ids, capacity)
+            vectors = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            vectors[:self.size] = self.vectors[:self.size]
+            self.vectors = vectors
+        self.ids[self.size] = item_id
+        self.vectors[self.size] = vector
+        self.size += 1
+        return self.size - 1
+
+    # 用最后一个元素覆盖被删除的位置，返回被移动元素的ID（没有移动时返回None）
+    def pop(self, position):
+        last = self.size - 1
+        moved_id = None
+        if position != last:
+            self.ids[position] = self.ids[last]
+            self.vectors[position] = self.vectors[last]
+            moved_id = int(self.ids[position])
+        self.size -= 1
+        return moved_id
+
+
+class IVFIndex:
+    """
+    基于倒排文件（IVF）的近似最近邻索引，纯CPU实现
+
+    训练时用k-means把全部人脸特征划分为 nlist 个聚类，查询时只在与查询向量最近的
+    nprobe 个聚类中做精确的内积打分，从而避免与全校所有学生逐一比较。
+    所有向量均做L2归一化，打分为余弦相似度，与 FaceMatcher 一致。
+    """
+
+    def __init__(self, dim=128, nlist=None, nprobe=8, kmeans_iterations=10, seed=0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.centroids = None
+        self._lists = []
+        self._positions = {}  # id -> (倒排列表编号, 位置)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, item_id):
+        return item_id in self._positions
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    # 训练粗量化器（k-means聚类中心）
+    def train(self, vectors):
+        vectors = l2_normalize(np.asarray(vectors, dtype=np.float32))
+        n = len(vectors)
+        # 默认聚类数约为 sqrt(n)，保证每个聚类有足够的样本
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(self.seed)
+        # 样本过多时只用部分样本训练
+        sample = vectors[rng.choice(n, min(n, nlist * 256), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+                else:
+                    # 空聚类重新随机选取一个样本作为中心
+                    centroids[c] = sample[rng.integers(len(sample))]
+            centroids = l2_normalize(centroids)
+
+        with self._lock:
+            self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+            self._lists = [_InvertedList(self.dim) for _ in range(nlist)]
+            self._positions = {}
+
+    def build(self, ids, vectors):
+        """用全部数据训练并建立索引"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            with self._lock:
+                self.centroids = None
+                self._lists = []
+                self._positions = {}
+            return
+        self.train(vectors)
+        self.add_many(ids, vectors)
+
+    def add_many(self, ids, vectors):
+        vectors = l2_normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        with self._lock:
+            assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+            for item_id, vector, list_no in zip(ids, vectors, assignments):
+                self._add(int(item_id), vector, int(list_no))
+
+    def add(self, item_id, vector):
+        """增量添加（或替换）一个向量；索引尚未训练时以该向量作为唯一聚类中心"""
+        vector = l2_normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            if not self.is_trained:
+                self.centroids = vector.reshape(1, -1).copy()
+                self._lists = [_InvertedList(self.dim)]
+            list_no = int(np.argmax(self.centroids @ vector))
+            self._add(int(item_id), vector, list_no)
+
+    def _add(self, item_id, vector, list_no):
+        if item_id in self._positions:
+            self._remove(item_id)
+        position = self._lists[list_no].append(item_id, vector)
+        self._positions[item_id] = (list_no, position)
+
+    def remove(self, item_id):
+        with self._lock:
+            if item_id in self._positions:
+                self._remove(item_id)
+
+    def _remove(self, item_id):
+        list_no, position = self._positions.pop(item_id)
+        moved_id = self._lists[list_no].pop(position)
+        if moved_id is not None:
+            self._positions[moved_id] = (list_no, position)
+
+    def search(self, query, k=1, nprobe=None):
+        """
+        查询与 query 最相似的 k 个向量
+
+        Returns:
+            [(id, score), ...]，按相似度从高到低排列
+        """
+        query = l2_normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        nprobe = nprobe or self.nprobe
+        with self._lock:
+            if not self.is_trained or not self._positions:
+                return []
+            nprobe = min(nprobe, len(self.centroids))
+            probe_lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+            ids_parts = []
+            score_parts = []
+            for list_no in probe_lists:
+                inverted = self._lists[list_no]
+                if inverted.size:
+                    ids_parts.append(inverted.ids[:inverted.size].copy())
+                    score_parts.append(inverted.vectors[:inverted.size] @ query)
+
+        if not ids_parts:
+            return []
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
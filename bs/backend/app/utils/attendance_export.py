@@ -0,0 +1,90 @@
+import csv
+import io
+import os
+import tempfile
+from urllib.parse import quote
+import xlsxwriter
+
+# 导出文件的表头
+EXPORT_HEADERS = ['学号', '姓名', '考勤日期', '签到时间', '状态', '备注']
+
+# 每次写出的行数 / 流式返回文件时每次读取的字节数
+CSV_FLUSH_ROWS = 1000
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def export_row(student_no, name, attendance_date, check_in_time, status, remarks):
+    """将一条查询结果格式化为导出文件中的一行"""
+    return [
+        student_no,
+        name,
+        attendance_date.strftime('%Y-%m-%d'),
+        check_in_time.strftime('%Y-%m-%d %H:%M:%S') if check_in_time else '',
+        status,
+        remarks or ''
+    ]
+
+
+def iter_csv(rows, headers=EXPORT_HEADERS):
+    """
+    逐批生成CSV内容（UTF-8，带BOM以便Excel正确识别中文），每 CSV_FLUSH_ROWS 行输出一次
+
+    Args:
+        rows: 可迭代的行（列表），通常直接来自数据库游标
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def write_xlsx(rows, headers=EXPORT_HEADERS, sheet_name='Sheet1'):
+    """
+    以 xlsxwriter 的 constant_memory 模式将行写入临时文件：每行写完即刷到磁盘，内存占用与行数无关。
+    XLSX 是压缩包格式，只能在全部写完后生成，因此先写临时文件再流式返回。
+
+    Returns:
+        已打开的临时文件（读取位置在开头，关闭后自动删除）
+    """
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'tmpdir': os.path.dirname(path)})
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.set_column(0, len(headers) - 1, 20)
+        worksheet.write_row(0, 0, headers, workbook.add_format({'bold': True}))
+        for row_number, row in enumerate(rows, 1):
+            worksheet.write_row(row_number, 0, row)
+        workbook.close()
+        file = open(path, 'rb')
+    finally:
+        # 文件已打开，删除目录项后仍可读取，关闭时由系统回收
+        os.remove(path)
+    return file
+
+
+def iter_file(file, chunk_size=STREAM_CHUNK_SIZE):
+    """分块读取文件用作响应体，读完后关闭文件"""
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+
+def content_disposition(filename):
+    """生成附件下载的 Content-Disposition，中文文件名使用 RFC 5987 编码，并提供ASCII文件名作为兼容"""
+    fallback = filename.encode('ascii', 'ignore').decode('ascii').strip('_') or 'export'
+    if not os.path.splitext(fallback)[0]:
+        fallback = 'export' + os.path.splitext(filename)[1]
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
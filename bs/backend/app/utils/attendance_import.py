@@ -0,0 +1,313 @@
+import os
+from datetime import datetime
+import openpyxl
+import pandas as pd
+from app.utils.db_upsert import upsert_statement
+from app.utils.attendance_rollup import AttendanceChange, attendance_rollups
+from app.utils.attendance_snapshot import course_snapshots
+from app.utils.dashboard_stats import dashboard_stats
+
+# 允许导入的考勤状态
+ATTENDANCE_STATUSES = ('present', 'late', 'absent')
+
+# 表格文件的表头别名 -> 标准列名（英文表头不区分大小写）
+COLUMN_ALIASES = {
+    '学号': 'student_no', 'student_no': 'student_no', 'student_id': 'student_no',
+    '状态': 'status', '考勤状态': 'status', 'status': 'status',
+    '备注': 'remarks', 'remarks': 'remarks',
+    '考勤日期': 'date', '日期': 'date', 'date': 'date', 'attendance_date': 'date'
+}
+
+# 表格中的考勤状态写法 -> 考勤状态
+STATUS_ALIASES = {
+    'present': 'present', '出勤': 'present', '正常': 'present', '已签到': 'present',
+    'late': 'late', '迟到': 'late',
+    'absent': 'absent', '缺勤': 'absent', '缺席': 'absent', '旷课': 'absent'
+}
+
+# 支持的表格文件格式：扩展名与 MIME 类型
+FILE_FORMATS = {
+    '.csv': 'csv', 'text/csv': 'csv',
+    '.xlsx': 'xlsx', '.xlsm': 'xlsx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx'
+}
+
+
+def detect_file_format(filename=None, mimetype=None):
+    """根据文件名或 MIME 类型判断表格格式，返回 'csv'、'xlsx' 或 None"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    return FILE_FORMATS.get(extension) or FILE_FORMATS.get((mimetype or '').lower())
+
+
+def iter_table_chunks(file, file_format, chunk_size=500):
+    """
+    分块读取考勤表格，每块为一个 DataFrame，不把整个文件读入内存：
+    CSV 使用 pandas 的分块读取，XLSX 使用 openpyxl 的只读（流式）模式。
+    DataFrame 的索引为数据行序号（从0开始，表头之后的第一行为0），用于在错误信息中指出行号。
+    """
+    if file_format == 'csv':
+        yield from pd.read_csv(
+            file, chunksize=chunk_size, dtype=str, keep_default_na=False,
+            encoding='utf-8-sig', skipinitialspace=True
+        )
+        return
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(value).strip() if value is not None else '' for value in header]
+        width = len(columns)
+        batch = []
+        index = []
+        for number, row in enumerate(rows):
+            # 跳过空行
+            if all(value is None or value == '' for value in row):
+                continue
+            batch.append((tuple(row) + (None,) * width)[:width])
+            index.append(number)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=columns, index=index)
+                batch = []
+                index = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=index)
+    finally:
+        workbook.close()
+
+
+def attendance_upsert_statement(records):
+    """
+    构建按 _student_course_date_uc 唯一约束插入或更新考勤记录的单条语句（见 upsert_statement）。
+    只更新状态和备注，保留已有记录的签到时间、匹配分数和截图。
+
+    Returns:
+        SQL语句；数据库不支持时返回None
+    """
+    from app import db
+    from app.models import Attendance
+
+    now = datetime.utcnow()
+    return upsert_statement(
+        db.engine.dialect.name, Attendance, records, ['student_id', 'course_id', 'attendance_date'],
+        lambda new: {'status': new.status, 'remarks': new.remarks, 'updated_at': now}
+    )
+
+
+class AttendanceImporter:
+    """
+    批量导入一门课程的考勤记录
+
+    创建时用一次查询预取课程的选课名单；每块记录先在内存中校验（是否选课、状态是否有效），
+    再用一次查询找出已存在的记录（仅用于统计新增/更新数），最后用一条 upsert 语句写入并提交。
+    逐条查询选课和考勤记录的旧实现，500条记录需要上千次数据库往返。
+    """
+
+    def __init__(self, course_id, chunk_size=500, max_errors=1000, on_progress=None):
+        from app import db
+        from app.models import Enrollment
+
+        self.course_id = course_id
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.on_progress = on_progress
+        self.enrolled = {
+            student_id for (student_id,) in db.session.query(Enrollment.student_id).filter(
+                Enrollment.course_id == course_id
+            ).all()
+        }
+        self.student_numbers = None  # 学号 -> 学生ID，导入表格时加载
+        self.total_rows = 0
+        self.success_count = 0
+        self.created_count = 0
+        self.updated_count = 0
+        self.error_count = 0
+        self.errors = []
+
+    def import_records(self, records):
+        """
+        导入考勤记录
+
+        Args:
+            records: 可迭代的 (学生ID, 考勤日期, 状态, 备注, 出错时显示的位置说明) 元组
+        """
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk)
+
+    # 记录一条错误；错误很多时只保留前 max_errors 条信息，但全部计数
+    def add_error(self, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(message)
+
+    def import_table(self, chunks, default_date=None):
+        """
+        导入表格中的考勤记录
+
+        Args:
+            chunks: iter_table_chunks 产生的 DataFrame 块
+            default_date: 表格中没有考勤日期列（或该行日期为空）时使用的日期
+        """
+        for frame in chunks:
+            self.import_frame(frame, default_date)
+
+    def import_frame(self, frame, default_date=None):
+        """对一块表格数据做向量化的清洗和校验（学号、状态、日期），有效的行写入数据库"""
+        from app import db
+        from app.models import Student, Enrollment
+
+        frame = frame.rename(columns=lambda column: COLUMN_ALIASES.get(
+            str(column).strip(), COLUMN_ALIASES.get(str(column).strip().lower(), column)
+        ))
+        missing = [name for name, column in (('学号', 'student_no'), ('状态', 'status')) if column not in frame]
+        if missing:
+            raise ValueError(f'缺少必需的列: {"、".join(missing)}')
+
+        if self.student_numbers is None:
+            # 一次查询加载课程全部学生的学号
+            self.student_numbers = dict(db.session.query(Student.student_id, Student.id).join(
+                Enrollment, Enrollment.student_id == Student.id
+            ).filter(Enrollment.course_id == self.course_id).all())
+
+        self.total_rows += len(frame)
+        # 行号：表头为第1行
+        lines = frame.index + 2
+        student_no = frame['student_no'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+        student_ids = student_no.map(self.student_numbers)
+        status = frame['status'].astype(str).str.strip().str.lower().map(STATUS_ALIASES)
+        if 'remarks' in frame:
+            remarks = frame['remarks'].where(frame['remarks'].notna(), '').astype(str).str.strip()
+        else:
+            remarks = pd.Series('', index=frame.index)
+
+        raw_dates = frame['date'] if 'date' in frame else pd.Series(None, index=frame.index, dtype=object)
+        blank_dates = raw_dates.isna() | (raw_dates.astype(str).str.strip() == '')
+        parsed_dates = pd.to_datetime(raw_dates.where(~blank_dates), errors='coerce', format='mixed')
+        dates = parsed_dates.dt.date.where(~blank_dates, default_date)
+
+        invalid_student = student_ids.isna()
+        invalid_status = status.isna()
+        invalid_date = dates.isna()
+        for line, no, raw_status, bad_student, bad_status, bad_date, blank in zip(
+            lines, student_no, frame['status'], invalid_student, invalid_status, invalid_date, blank_dates
+        ):
+            if bad_student:
+                self.add_error(f'第{line}行：学号 {no} 不存在或未选修该课程')
+            elif bad_status:
+                self.add_error(f'第{line}行：学号 {no} 考勤状态无效: {raw_status}')
+            elif bad_date:
+                self.add_error(f'第{line}行：学号 {no} ' + ('缺少考勤日期' if blank else '考勤日期格式错误'))
+
+        valid = ~(invalid_student | invalid_status | invalid_date)
+        if valid.any():
+            self.import_records(zip(
+                student_ids[valid].astype('int64').tolist(),
+                dates[valid].tolist(),
+                status[valid].tolist(),
+                remarks[valid].tolist(),
+                [f'第{line}行：学号 {no}' for line, no in zip(lines[valid.to_numpy()], student_no[valid])]
+            ))
+
+    # 校验一块记录，同一学生同一天出现多次时以最后一条为准
+    def _validate(self, chunk):
+        rows = {}
+        for student_id, attendance_date, status, remarks, label in chunk:
+            if student_id not in self.enrolled:
+                self.add_error(f'{label} 未选修该课程')
+            elif status not in ATTENDANCE_STATUSES:
+                self.add_error(f'{label} 考勤状态无效: {status}')
+            else:
+                rows[(student_id, attendance_date)] = {
+                    'student_id': student_id,
+                    'course_id': self.course_id,
+                    'attendance_date': attendance_date,
+                    'status': status,
+                    'remarks': remarks or ''
+                }
+        return rows
+
+    def _write_chunk(self, chunk):
+        from app import db
+        from app.models import Attendance
+
+        rows = self._validate(chunk)
+        if not rows:
+            return
+
+        # 一次查询找出本块中已存在的记录及其原状态
+        existing = {
+            (student_id, attendance_date): status
+            for student_id, attendance_date, status in db.session.query(
+                Attendance.student_id, Attendance.attendance_date, Attendance.status
+            ).filter(
+                Attendance.course_id == self.course_id,
+                Attendance.student_id.in_({student_id for student_id, _ in rows}),
+                Attendance.attendance_date.in_({attendance_date for _, attendance_date in rows})
+            ).all()
+        }
+
+        stmt = attendance_upsert_statement(list(rows.values()))
+        if stmt is not None:
+            db.session.execute(stmt)
+            # upsert 绕过了 ORM，在同一事务中更新考勤汇总表和每日快照
+            changes = [
+                AttendanceChange(
+                    row['student_id'], self.course_id, row['attendance_date'], existing.get(key), row['status']
+                )
+                for key, row in rows.items()
+            ]
+            connection = db.session.connection()
+            attendance_rollups.apply_changes(connection, changes)
+            course_snapshots.apply_changes(connection, changes)
+        else:
+            self._merge(rows)
+        db.session.commit()
+        dashboard_stats.invalidate()
+
+        updated = sum(1 for key in rows if key in existing)
+        self.updated_count += updated
+        self.created_count += len(rows) - updated
+        self.success_count += len(rows)
+        if self.on_progress:
+            self.on_progress(self.summary(include_errors=False))
+
+    # 不支持 upsert 的数据库：批量查询已有记录后在会话中更新或新增
+    def _merge(self, rows):
+        from app import db
+        from app.models import Attendance
+
+        current = {
+            (attendance.student_id, attendance.attendance_date): attendance
+            for attendance in Attendance.query.filter(
+                Attendance.course_id == self.course_id,
+                Attendance.student_id.in_({student_id for student_id, _ in rows}),
+                Attendance.attendance_date.in_({attendance_date for _, attendance_date in rows})
+            ).all()
+        }
+        for key, row in rows.items():
+            attendance = current.get(key)
+            if attendance:
+                attendance.status = row['status']
+                attendance.remarks = row['remarks']
+            else:
+                db.session.add(Attendance(**row))
+
+    def summary(self, include_errors=True):
+        summary = {
+            'total_rows': self.total_rows,
+            'success_count': self.success_count,
+            'created_count': self.created_count,
+            'updated_count': self.updated_count,
+            'error_count': self.error_count
+        }
+        if include_errors:
+            summary['errors'] = self.errors
+        return summary
@@ -0,0 +1,229 @@
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import attributes
+from app.utils.attendance_stats import ATTENDANCE_STATUSES
+from app.utils.dashboard_stats import dashboard_stats
+from app.utils.db_upsert import upsert_statement
+
+# 汇总表中的计数列
+COUNT_COLUMNS = ('total',) + ATTENDANCE_STATUSES
+
+# 一条考勤记录的变化：新增时 old_status 为None，删除时 new_status 为None
+AttendanceChange = namedtuple(
+    'AttendanceChange', ['student_id', 'course_id', 'attendance_date', 'old_status', 'new_status']
+)
+
+
+def collect_changes(session):
+    """从即将提交的 flush 中收集考勤记录的新增、状态修改和删除（在 after_flush 事件中调用）"""
+    from app.models import Attendance
+
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Attendance):
+            changes.append(AttendanceChange(
+                obj.student_id, obj.course_id, obj.attendance_date, None, obj.status or 'absent'
+            ))
+    for obj in session.deleted:
+        if isinstance(obj, Attendance):
+            history = attributes.get_history(obj, 'status')
+            changes.append(AttendanceChange(
+                obj.student_id, obj.course_id, obj.attendance_date, (history.deleted or [obj.status])[0], None
+            ))
+    for obj in session.dirty:
+        if isinstance(obj, Attendance):
+            history = attributes.get_history(obj, 'status')
+            if history.added and history.deleted:
+                changes.append(AttendanceChange(
+                    obj.student_id, obj.course_id, obj.attendance_date, history.deleted[0], history.added[0]
+                ))
+    return changes
+
+
+def count_deltas(changes, key):
+    """
+    将考勤记录的变化按 key 分组，汇总为各计数列的增量
+
+    Returns:
+        {key(change): Counter({'total': n, 'present': n, ...})}
+    """
+    deltas = defaultdict(Counter)
+    for change in changes:
+        if change.old_status == change.new_status:
+            continue
+        counts = deltas[key(change)]
+        for status, sign in ((change.old_status, -1), (change.new_status, 1)):
+            if status is None:
+                continue
+            counts['total'] += sign
+            if status in ATTENDANCE_STATUSES:
+                counts[status] += sign
+    return {group: counts for group, counts in deltas.items() if any(counts.values())}
+
+
+class AttendanceRollups:
+    """
+    考勤汇总表（AttendanceRollup）的维护
+
+    每个学生在每门课程中的考勤记录数和各状态记录数，在写入考勤记录的同一事务中增量更新：
+        - 通过 ORM 新增、修改状态、删除考勤记录时，由会话的 after_flush 事件自动计算增量并写入
+        - 绕过 ORM 的批量写入（如导入时的 upsert）由调用方收集变化后调用 apply_changes
+    统计接口因此只需读取汇总表中的少量行，而不必扫描全部考勤记录。
+    汇总数据出现偏差时（如直接修改数据库）可用 rebuild 从考勤记录重新计算；
+    已有考勤记录的数据库首次启用汇总表时，应用启动时由 backfill 自动从考勤记录生成汇总数据。
+    """
+
+    def init_app(self, app):
+        from app import db
+
+        if not event.contains(db.session, 'after_flush', self._after_flush):
+            event.listen(db.session, 'after_flush', self._after_flush)
+
+    def _after_flush(self, session, flush_context):
+        changes = collect_changes(session)
+        if changes:
+            self.apply_changes(session.connection(), changes)
+
+    def apply_changes(self, connection, changes):
+        """在当前事务中按考勤记录的变化更新汇总表"""
+        self.apply(connection, count_deltas(changes, lambda change: (change.student_id, change.course_id)))
+
+    def apply(self, connection, deltas):
+        """
+        在当前事务中把增量写入汇总表（一条 upsert 语句），汇总记录不存在时创建
+
+        Args:
+            connection: 当前事务的连接（db.session.connection()）
+            deltas: {(学生ID, 课程ID): Counter({'total': n, 'present': n, ...})}
+        """
+        from app.models import AttendanceRollup, Course
+
+        if not deltas:
+            return
+
+        # 汇总记录中的学期和学年取自课程
+        semesters = {
+            course_id: (semester, year) for course_id, semester, year in connection.execute(
+                select(Course.id, Course.semester, Course.year).where(
+                    Course.id.in_({course_id for _, course_id in deltas})
+                )
+            )
+        }
+        now = datetime.utcnow()
+        records = [
+            dict(
+                {column: counts[column] for column in COUNT_COLUMNS},
+                student_id=student_id,
+                course_id=course_id,
+                semester=semesters.get(course_id, (None, None))[0],
+                year=semesters.get(course_id, (None, None))[1],
+                updated_at=now
+            )
+            for (student_id, course_id), counts in deltas.items()
+        ]
+
+        table = AttendanceRollup.__table__
+        stmt = upsert_statement(
+            connection.dialect.name, table, records, ['student_id', 'course_id'],
+            lambda new: dict(
+                {column: table.c[column] + getattr(new, column) for column in COUNT_COLUMNS},
+                updated_at=now
+            )
+        )
+        if stmt is not None:
+            connection.execute(stmt)
+            return
+
+        # 不支持 upsert 的数据库：逐条更新，不存在时插入
+        for record in records:
+            result = connection.execute(update(table).where(
+                table.c.student_id == record['student_id'],
+                table.c.course_id == record['course_id']
+            ).values({column: table.c[column] + record[column] for column in COUNT_COLUMNS}, updated_at=now))
+            if not result.rowcount:
+                connection.execute(insert(table).values(record))
+
+    def delete(self, student_id=None, course_id=None):
+        """删除学生或课程的汇总记录（在删除学生、课程之前调用，随调用方的事务提交）"""
+        from app.models import AttendanceRollup
+
+        query = AttendanceRollup.query
+        if student_id is not None:
+            query = query.filter(AttendanceRollup.student_id == student_id)
+        if course_id is not None:
+            query = query.filter(AttendanceRollup.course_id == course_id)
+        query.delete(synchronize_session=False)
+
+    def sync_semester(self, course):
+        """课程的学期或学年修改后，同步到该课程的汇总记录"""
+        from app.models import AttendanceRollup
+
+        AttendanceRollup.query.filter(AttendanceRollup.course_id == course.id).update(
+            {AttendanceRollup.semester: course.semester, AttendanceRollup.year: course.year},
+            synchronize_session=False
+        )
+
+    def rebuild(self, course_id=None):
+        """
+        从考勤记录重新计算汇总表（全部课程或指定课程），在一个事务中完成
+
+        Returns:
+            重建后的汇总记录数
+        """
+        from app import db
+        from app.models import Attendance, AttendanceRollup, Course
+        from app.utils.attendance_stats import status_count_columns
+
+        table = AttendanceRollup.__table__
+        source = select(
+            Attendance.student_id, Attendance.course_id, Course.semester, Course.year,
+            *status_count_columns(Attendance.status), func.now()
+        ).join(Course, Course.id == Attendance.course_id).group_by(
+            Attendance.student_id, Attendance.course_id, Course.semester, Course.year
+        )
+        delete_query = AttendanceRollup.query
+        if course_id is not None:
+            source = source.where(Attendance.course_id == course_id)
+            delete_query = delete_query.filter(AttendanceRollup.course_id == course_id)
+
+        try:
+            delete_query.delete(synchronize_session=False)
+            result = db.session.execute(insert(table).from_select(
+                ['student_id', 'course_id', 'semester', 'year', *COUNT_COLUMNS, 'updated_at'], source
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        dashboard_stats.invalidate()
+        return result.rowcount
+
+    def backfill(self, app):
+        """
+        汇总表为空而已有考勤记录时（如升级到使用汇总表的版本后首次启动），从考勤记录重建汇总表，
+        否则不带日期的统计接口只读取空的汇总表，所有课程的统计都为0。在应用上下文中调用。
+
+        Returns:
+            写入的汇总记录数；无需回填或回填失败时为0
+        """
+        from app import db
+        from app.models import Attendance, AttendanceRollup
+
+        try:
+            if db.session.query(AttendanceRollup.query.exists()).scalar():
+                return 0
+            if not db.session.query(Attendance.query.exists()).scalar():
+                return 0
+            count = self.rebuild()
+        except Exception as e:
+            # 多个工作进程同时启动时可能同时回填，失败的进程只记录警告，可稍后运行 rebuild_attendance_rollups.py
+            db.session.rollback()
+            app.logger.warning(f'回填考勤汇总表失败: {str(e)}')
+            return 0
+        app.logger.info(f'考勤汇总表为空，已从考勤记录回填 {count} 条汇总记录')
+        return count
+
+
+# 创建一个全局实例
+attendance_rollups = AttendanceRollups()
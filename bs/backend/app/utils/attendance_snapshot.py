@@ -0,0 +1,231 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, delete, event, func, insert, select, tuple_, update
+from app.utils.attendance_rollup import collect_changes, count_deltas
+from app.utils.attendance_stats import ATTENDANCE_STATUSES, attendance_rate, status_count_columns
+from app.utils.dashboard_stats import dashboard_stats
+from app.utils.db_upsert import upsert_statement
+
+# 重建快照时每条 INSERT 语句写入的行数
+REBUILD_BATCH_SIZE = 1000
+
+# 趋势接口未指定开始日期时的天数
+DEFAULT_TREND_DAYS = 30
+
+
+def no_record_count(enrolled_count, recorded):
+    """
+    无记录人数：选课人数减去当天的考勤记录数（各状态记录数之和），不小于0（已退课学生的历史记录不计入选课人数）。
+    增量更新和重新计算都使用此函数，参数为整数时返回整数，为 SQL 表达式时（upsert 中按更新后的列计算）返回 SQL 表达式。
+    """
+    if isinstance(enrolled_count, int) and isinstance(recorded, int):
+        return max(enrolled_count - recorded, 0)
+    difference = enrolled_count - recorded
+    return case((difference > 0, difference), else_=0)
+
+
+def parse_trend_range(start_date=None, end_date=None):
+    """
+    解析趋势接口的日期范围（YYYY-MM-DD），默认为截止今天的最近 DEFAULT_TREND_DAYS 天
+
+    Returns:
+        ((开始日期, 结束日期), 错误信息)
+    """
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end - timedelta(days=DEFAULT_TREND_DAYS - 1)
+    except ValueError:
+        return None, '日期格式错误，应为 YYYY-MM-DD'
+    if start > end:
+        return None, '开始日期不能晚于结束日期'
+    return (start, end), '解析成功'
+
+
+class CourseSnapshots:
+    """
+    课程每日考勤快照（CourseDailySnapshot）的维护
+
+    每门课程每个有考勤记录的日期一行：当天的选课人数、各状态的记录数和无记录人数。
+        - 每晚由 snapshot_course_attendance.py 从考勤记录重新计算前一天（或指定日期范围）的快照
+        - 当天的签到、补签、修改状态等写入，在同一事务中增量更新对应日期的快照
+          （ORM 写入由 after_flush 事件自动处理，导入等批量 upsert 由调用方调用 apply_changes）
+    考勤趋势接口只读取快照表，一学期全部课程的趋势只需读取几千行，而不必扫描全部考勤记录。
+    """
+
+    def init_app(self, app):
+        from app import db
+
+        if not event.contains(db.session, 'after_flush', self._after_flush):
+            event.listen(db.session, 'after_flush', self._after_flush)
+
+    def _after_flush(self, session, flush_context):
+        changes = collect_changes(session)
+        if changes:
+            self.apply_changes(session.connection(), changes)
+
+    def apply_changes(self, connection, changes):
+        """在当前事务中按考勤记录的变化更新快照表"""
+        self.apply(connection, count_deltas(changes, lambda change: (change.course_id, change.attendance_date)))
+
+    def apply(self, connection, deltas):
+        """
+        在当前事务中把增量写入快照表（一条 upsert 语句）。
+        快照不存在时创建，选课人数取当前的选课人数；已存在时保留原选课人数，按更新后的记录数重新计算无记录人数。
+
+        Args:
+            connection: 当前事务的连接（db.session.connection()）
+            deltas: {(课程ID, 日期): Counter({'total': n, 'present': n, ...})}
+        """
+        from app.models import CourseDailySnapshot, Enrollment
+
+        if not deltas:
+            return
+
+        enrolled = dict(connection.execute(
+            select(Enrollment.course_id, func.count()).where(
+                Enrollment.course_id.in_({course_id for course_id, _ in deltas})
+            ).group_by(Enrollment.course_id)
+        ).all())
+        now = datetime.utcnow()
+        records = [
+            dict(
+                {status: counts[status] for status in ATTENDANCE_STATUSES},
+                course_id=course_id,
+                snapshot_date=snapshot_date,
+                enrolled_count=enrolled.get(course_id, 0),
+                no_record=no_record_count(enrolled.get(course_id, 0), sum(counts[status] for status in ATTENDANCE_STATUSES)),
+                updated_at=now
+            )
+            for (course_id, snapshot_date), counts in deltas.items()
+        ]
+
+        table = CourseDailySnapshot.__table__
+
+        # 更新后的各状态记录数和无记录人数；无记录人数排在最前，MySQL 按顺序赋值时引用的仍是各状态更新前的列值
+        def updated_values(added):
+            counts = {status: table.c[status] + added(status) for status in ATTENDANCE_STATUSES}
+            return dict(
+                no_record=no_record_count(table.c.enrolled_count, sum(counts.values())), **counts, updated_at=now
+            )
+
+        stmt = upsert_statement(
+            connection.dialect.name, table, records, ['course_id', 'snapshot_date'],
+            lambda new: updated_values(lambda status: getattr(new, status))
+        )
+        if stmt is not None:
+            connection.execute(stmt)
+        else:
+            # 不支持 upsert 的数据库：逐条更新，不存在时插入
+            for record in records:
+                result = connection.execute(update(table).where(
+                    table.c.course_id == record['course_id'],
+                    table.c.snapshot_date == record['snapshot_date']
+                ).values(updated_values(lambda status: record[status])))
+                if not result.rowcount:
+                    connection.execute(insert(table).values(record))
+
+        # 删除了考勤记录时，当天已没有记录的快照一并删除（与重新计算的结果一致）
+        emptied = [key for key, counts in deltas.items() if counts['total'] < 0]
+        if emptied:
+            connection.execute(delete(table).where(
+                tuple_(table.c.course_id, table.c.snapshot_date).in_(emptied),
+                sum(table.c[status] for status in ATTENDANCE_STATUSES) <= 0
+            ))
+
+    def delete(self, course_id):
+        """删除课程的快照（在删除课程之前调用，随调用方的事务提交）"""
+        from app.models import CourseDailySnapshot
+
+        CourseDailySnapshot.query.filter(CourseDailySnapshot.course_id == course_id).delete(synchronize_session=False)
+
+    def rebuild(self, start_date, end_date, course_id=None):
+        """
+        从考勤记录重新计算日期范围内（含首尾）的快照，在一个事务中完成。
+        选课人数取当前的选课人数；没有任何考勤记录的日期不生成快照。
+
+        Returns:
+            写入的快照数
+        """
+        from app import db
+        from app.models import Attendance, CourseDailySnapshot, Enrollment
+
+        source = select(
+            Attendance.course_id, Attendance.attendance_date, *status_count_columns(Attendance.status)
+        ).where(
+            Attendance.attendance_date >= start_date, Attendance.attendance_date <= end_date
+        ).group_by(Attendance.course_id, Attendance.attendance_date)
+        enrollment_query = select(Enrollment.course_id, func.count()).group_by(Enrollment.course_id)
+        delete_query = CourseDailySnapshot.query.filter(
+            CourseDailySnapshot.snapshot_date >= start_date, CourseDailySnapshot.snapshot_date <= end_date
+        )
+        if course_id is not None:
+            source = source.where(Attendance.course_id == course_id)
+            enrollment_query = enrollment_query.where(Enrollment.course_id == course_id)
+            delete_query = delete_query.filter(CourseDailySnapshot.course_id == course_id)
+
+        try:
+            enrolled = dict(db.session.execute(enrollment_query).all())
+            now = datetime.utcnow()
+            records = []
+            for row in db.session.execute(source):
+                enrolled_count = enrolled.get(row.course_id, 0)
+                counts = {status: int(getattr(row, status)) for status in ATTENDANCE_STATUSES}
+                records.append(dict(
+                    counts,
+                    course_id=row.course_id,
+                    snapshot_date=row.attendance_date,
+                    enrolled_count=enrolled_count,
+                    no_record=no_record_count(enrolled_count, sum(counts.values())),
+                    updated_at=now
+                ))
+
+            delete_query.delete(synchronize_session=False)
+            table = CourseDailySnapshot.__table__
+            for start in range(0, len(records), REBUILD_BATCH_SIZE):
+                db.session.execute(insert(table), records[start:start + REBUILD_BATCH_SIZE])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        dashboard_stats.invalidate()
+        return len(records)
+
+    def trend(self, start_date, end_date, course_id=None, course_ids=None):
+        """
+        从快照表读取考勤趋势：每个日期一项，多门课程时按日期合计
+
+        Args:
+            course_id: 只统计一门课程
+            course_ids: 只统计这些课程（如教师的全部课程）；都不指定时统计全部课程
+
+        Returns:
+            按日期升序的列表，每项包含 date、course_count、enrolled_count、各状态记录数、no_record、attendance_rate
+        """
+        from app import db
+        from app.models import CourseDailySnapshot
+
+        columns = ('enrolled_count',) + ATTENDANCE_STATUSES + ('no_record',)
+        query = db.session.query(
+            CourseDailySnapshot.snapshot_date,
+            func.count().label('course_count'),
+            *[func.sum(getattr(CourseDailySnapshot, column)).label(column) for column in columns]
+        ).filter(
+            CourseDailySnapshot.snapshot_date >= start_date, CourseDailySnapshot.snapshot_date <= end_date
+        )
+        if course_id is not None:
+            query = query.filter(CourseDailySnapshot.course_id == course_id)
+        if course_ids is not None:
+            query = query.filter(CourseDailySnapshot.course_id.in_(course_ids))
+
+        trend = []
+        for row in query.group_by(CourseDailySnapshot.snapshot_date).order_by(CourseDailySnapshot.snapshot_date):
+            item = {column: int(getattr(row, column) or 0) for column in columns}
+            item['date'] = row.snapshot_date.isoformat()
+            item['course_count'] = row.course_count
+            # 出勤率以选课人数为分母（无记录视为未出勤）
+            item['attendance_rate'] = attendance_rate(item['present'], item['enrolled_count'])
+            trend.append(item)
+        return trend
+
+
+# 创建一个全局实例
+course_snapshots = CourseSnapshots()
@@ -0,0 +1,23 @@
+from sqlalchemy import case, func
+
+# 参与统计的考勤状态
+ATTENDANCE_STATUSES = ('present', 'late', 'absent')
+
+
+def status_count_columns(status_column):
+    """
+    在数据库中按考勤状态计数的聚合列（条件求和），配合 GROUP BY 使用。
+    MySQL 中 SUM 的结果为 Decimal，取出后需转换为 int 再返回给前端。
+
+    Returns:
+        [total, present, late, absent] 四个带标签的聚合列
+    """
+    return [func.count().label('total')] + [
+        func.coalesce(func.sum(case((status_column == status, 1), else_=0)), 0).label(status)
+        for status in ATTENDANCE_STATUSES
+    ]
+
+
+def attendance_rate(present, total):
+    """出勤率（百分比）"""
+    return (present / total * 100) if total > 0 else 0
@@ -0,0 +1,188 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.face_image import FaceImage
+
+# 可作为人脸照片导入的文件扩展名
+PHOTO_EXTENSIONS = {'jpg', 'jpeg', 'png', 'bmp', 'webp'}
+
+# 一个待导入的照片文件：文件名、字节数、读取函数
+PhotoSource = namedtuple('PhotoSource', ['name', 'size', 'read'])
+
+
+def iter_zip_photos(zf):
+    """
+    逐个列出ZIP压缩包中的文件（读取推迟到真正处理时，不解压整个压缩包）
+
+    Args:
+        zf: 已打开的 zipfile.ZipFile，需在导入完成后再关闭
+    """
+    for info in zf.infolist():
+        name = info.filename
+        # 跳过目录以及 macOS 生成的元数据文件
+        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+            continue
+        yield PhotoSource(name, info.file_size, lambda info=info: zf.read(info))
+
+
+def iter_directory_photos(directory):
+    """递归列出服务器目录中的文件"""
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(root, filename)
+
+            def read(path=path):
+                with open(path, 'rb') as f:
+                    return f.read()
+
+            yield PhotoSource(os.path.relpath(path, directory), os.path.getsize(path), read)
+
+
+class FaceBulkEnroller:
+    """
+    批量导入学生人脸照片
+
+    照片以学号命名（如 2023001.jpg）。按块处理：每块先用一次查询找出对应的学生，再并发解码并通过
+    提取进程池提取特征（多个进程并行），然后用批量 UPDATE 写入特征、批量保存图片，
+    最后一次性使相关课程的特征库缓存失效并更新全校识别索引。每块结束后释放照片数据，内存占用与块大小成正比。
+    """
+
+    def __init__(self, chunk_size=50, max_side=640, max_file_size=10 * 1024 * 1024, allowed_formats=None):
+        self.chunk_size = chunk_size
+        self.max_side = max_side
+        self.max_file_size = max_file_size
+        self.allowed_formats = allowed_formats
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            chunk_size=config.get('FACE_BULK_ENROLL_CHUNK_SIZE', 50),
+            max_side=config.get('FACE_IMAGE_MAX_SIDE', 640),
+            max_file_size=config.get('FACE_BULK_ENROLL_MAX_FILE_SIZE', 10 * 1024 * 1024),
+            allowed_formats=config.get('ALLOWED_EXTENSIONS')
+        )
+
+    def run(self, sources):
+        """
+        导入一组照片（需在应用上下文中调用）
+
+        Args:
+            sources: PhotoSource 的可迭代对象
+
+        Returns:
+            导入报告：文件总数、成功数、跳过的非图片文件，以及每个失败文件的原因
+        """
+        from app.utils.extraction_pool import face_extraction_pool
+
+        started = time.monotonic()
+        report = {'total_files': 0, 'enrolled': 0, 'skipped': [], 'failed': []}
+        # 并发提交数不超过进程池排队上限的一半，给同时进行的签到请求留出余量
+        concurrency = max(1, min(max(face_extraction_pool.max_workers, 1) * 2, face_extraction_pool.max_queue // 2))
+        seen = set()
+        chunk = []
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            for source in sources:
+                report['total_files'] += 1
+                stem, extension = os.path.splitext(os.path.basename(source.name))
+                student_no = stem.strip()
+                if extension.lower().lstrip('.') not in PHOTO_EXTENSIONS:
+                    report['skipped'].append(source.name)
+                    continue
+                if student_no in seen:
+                    self._fail(report, source.name, student_no, '学号重复，已使用同一学号的其它照片')
+                    continue
+                seen.add(student_no)
+                if source.size > self.max_file_size:
+                    self._fail(report, source.name, student_no, '照片文件过大')
+                    continue
+
+                chunk.append((source, student_no))
+                if len(chunk) >= self.chunk_size:
+                    self._enroll_chunk(chunk, report, executor)
+                    chunk = []
+
+            if chunk:
+                self._enroll_chunk(chunk, report, executor)
+
+        report['failed_count'] = len(report['failed'])
+        report['elapsed_seconds'] = round(time.monotonic() - started, 2)
+        return report
+
+    @staticmethod
+    def _fail(report, filename, student_no, reason):
+        report['failed'].append({'file': filename, 'student_id': student_no, 'reason': reason})
+
+    # 解码、校验并提取一张照片的人脸特征，返回 (FaceImage, 特征, 提示信息)
+    def _extract(self, data):
+        from app.utils.extraction_pool import face_extraction_pool
+
+        image = FaceImage.from_bytes(data, self.max_side)
+        valid, message = image.validate(self.allowed_formats)
+        if not valid:
+            return image, None, message
+        try:
+            encoding, message = face_extraction_pool.extract_from_image(image)
+        except Exception as e:
+            return image, None, f"提取人脸特征失败: {str(e)}"
+        return image, encoding, message
+
+    def _enroll_chunk(self, chunk, report, executor):
+        from app import db
+        from app.models import Student
+        from app.utils.encoding_format import encoding_codec
+        from app.utils.image_store import image_store
+        from app.utils.face_gallery import face_gallery, campus_index
+        from app.utils.dashboard_stats import dashboard_stats
+
+        # 一次查询找出本块照片对应的学生
+        students = {
+            student_no: student_id for student_id, student_no in db.session.query(
+                Student.id, Student.student_id
+            ).filter(Student.student_id.in_([student_no for _, student_no in chunk])).all()
+        }
+
+        tasks = []
+        for source, student_no in chunk:
+            if student_no not in students:
+                self._fail(report, source.name, student_no, '学号不存在')
+                continue
+            try:
+                # 压缩包只能顺序读取，在当前线程中读出照片数据
+                tasks.append((source, student_no, source.read()))
+            except Exception as e:
+                self._fail(report, source.name, student_no, f'读取文件失败: {str(e)}')
+
+        enrolled = []
+        for (source, student_no, _), (image, encoding, message) in zip(
+            tasks, executor.map(lambda task: self._extract(task[2]), tasks)
+        ):
+            if encoding is None:
+                self._fail(report, source.name, student_no, message)
+            else:
+                enrolled.append((students[student_no], image, encoding))
+
+        if not enrolled:
+            return
+
+        # 批量写入人脸特征
+        db.session.bulk_update_mappings(Student, [
+            {'id': student_id, 'face_encoding': encoding_codec.pack(encoding)}
+            for student_id, _, encoding in enrolled
+        ])
+        db.session.commit()
+
+        # 批量保存照片（写入队列已满时等待，不丢弃），并释放学生原来的照片
+        image_store.put_many(
+            [(image, [student_id]) for student_id, image, _ in enrolled],
+            Student, 'face_image_path', block=True
+        )
+
+        student_ids = [student_id for student_id, _, _ in enrolled]
+        face_gallery.invalidate_students(student_ids)
+        campus_index.add_many(student_ids, [encoding for _, _, encoding in enrolled])
+        dashboard_stats.invalidate()
+        report['enrolled'] += len(enrolled)
@@ -0,0 +1,161 @@
+import threading
+import time
+import uuid
+import queue
+
+
+class CheckinJobQueue:
+    """
+    异步签到任务队列
+
+    请求只负责入队并立即返回任务ID，签到流程（特征提取、匹配、保存图片、写入数据库）
+    由后台工作线程在应用上下文中执行，客户端通过任务ID轮询（或长轮询）结果。
+    队列有上限，突发请求超过上限时直接拒绝；已完成的任务结果保留 result_ttl 秒。
+    任务只保存在当前进程内，多进程部署时需要让轮询请求落到同一工作进程（会话粘滞）。
+    config_prefix 指定读取的配置项前缀（如 CHECKIN_JOB_WORKERS），不同用途的任务使用各自的队列实例和线程；
+    任务抛出未处理的异常时，结果中的提示信息以 failure_message 开头（如“考勤失败”“导入失败”）。
+    """
+
+    def __init__(self, workers=4, max_pending=256, result_ttl=600, config_prefix='CHECKIN_JOB', thread_name='checkin-job',
+                 failure_message='考勤失败'):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.config_prefix = config_prefix
+        self.thread_name = thread_name
+        self.failure_message = failure_message
+        self._app = None
+        self._queue = None
+        self._jobs = {}
+        self._threads = []
+        self._condition = threading.Condition()
+        self._local = threading.local()  # 当前工作线程正在执行的任务ID
+
+    def init_app(self, app):
+        self._app = app
+        self.workers = app.config.get(f'{self.config_prefix}_WORKERS', self.workers)
+        self.max_pending = app.config.get(f'{self.config_prefix}_QUEUE_SIZE', self.max_pending)
+        self.result_ttl = app.config.get(f'{self.config_prefix}_RESULT_TTL', self.result_ttl)
+
+    # 首次提交任务时启动工作线程
+    def _ensure_started(self):
+        if self._threads:
+            return
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'{self.thread_name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job_id, func, args = self._queue.get()
+            with self._condition:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+
+            self._local.job_id = job_id
+            try:
+                with self._app.app_context():
+                    result, status_code = func(*args)
+                status = 'done'
+            except Exception as e:
+                result, status_code = {'message': f'{self.failure_message}: {str(e)}'}, 500
+                status = 'failed'
+            finally:
+                self._local.job_id = None
+
+            with self._condition:
+                job.update({
+                    'status': status,
+                    'result': result,
+                    'status_code': status_code,
+                    'finished_at': time.time()
+                })
+                self._condition.notify_all()
+
+    # 清理过期的已完成任务
+    def _expire(self):
+        deadline = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished_at'] and job['finished_at'] < deadline
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, owner_id, func, *args):
+        """
+        提交一个签到任务
+
+        Args:
+            owner_id: 提交任务的用户ID，只有该用户可以查询结果
+            func: 任务函数，返回 (结果字典, HTTP状态码)
+
+        Returns:
+            任务ID；队列已满时返回None
+        """
+        job_id = uuid.uuid4().hex
+        with self._condition:
+            self._ensure_started()
+            self._expire()
+            self._jobs[job_id] = {
+                'id': job_id,
+                'owner_id': owner_id,
+                'status': 'pending',
+                'result': None,
+                'status_code': None,
+                'progress': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+            try:
+                self._queue.put_nowait((job_id, func, args))
+            except queue.Full:
+                del self._jobs[job_id]
+                return None
+        return job_id
+
+    def report_progress(self, progress):
+        """由任务函数调用，更新当前任务的进度信息（不在任务中调用时忽略）"""
+        job_id = getattr(self._local, 'job_id', None)
+        if job_id is None:
+            return
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['progress'] = progress
+
+    def get(self, job_id, owner_id, wait=0):
+        """
+        查询任务状态；wait 大于0时最多等待 wait 秒直到任务完成（长轮询）
+
+        Returns:
+            任务信息的副本；任务不存在或不属于该用户时返回None
+        """
+        deadline = time.time() + wait
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job['owner_id'] != owner_id:
+                return None
+            while job['finished_at'] is None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return dict(job)
+
+    def pending_count(self):
+        return self._queue.qsize() if self._queue else 0
+
+
+# 创建全局实例：签到任务队列
+checkin_jobs = CheckinJobQueue()
+# 批量导入（人脸照片、考勤表格）任务队列：单个任务耗时长，使用独立的少量线程，不占用签到任务的线程
+bulk_jobs = CheckinJobQueue(
+    workers=1, max_pending=8, result_ttl=3600, config_prefix='BULK_JOB', thread_name='bulk-job', failure_message='导入失败'
+)
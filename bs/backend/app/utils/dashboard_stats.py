@@ -0,0 +1,117 @@
+import threading
+import time
+from datetime import date, datetime
+from sqlalchemy import func, select
+
+
+def month_range(day):
+    """day 所在月份的日期范围 [本月1日, 下月1日)，用于可走索引的范围查询"""
+    start = day.replace(day=1)
+    end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+    return start, end
+
+
+def query_dashboard_stats(today=None):
+    """
+    用一条语句（多个标量子查询）统计管理后台首页的数据，只需一次数据库往返。
+    今日和本月考勤按 attendance_date 的范围条件计数，可以使用该列上的索引
+    （按 month/year 函数过滤无法使用索引，需要扫描全表）。
+    """
+    from app import db
+    from app.models import Student, Teacher, Course, Attendance
+
+    today = today or datetime.now().date()
+    month_start, next_month_start = month_range(today)
+
+    def count(model, *conditions):
+        return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+    row = db.session.execute(select(
+        count(Student).label('total_students'),
+        count(Teacher).label('total_teachers'),
+        count(Course).label('total_courses'),
+        count(Attendance).label('total_attendances'),
+        count(Attendance, Attendance.attendance_date == today).label('today_attendances'),
+        count(
+            Attendance,
+            Attendance.attendance_date >= month_start,
+            Attendance.attendance_date < next_month_start
+        ).label('month_attendances')
+    )).one()
+    return {key: int(value) for key, value in row._mapping.items()}
+
+
+class DashboardStatsCache:
+    """
+    管理后台首页统计的进程内缓存
+
+    统计结果在 ttl 秒内直接返回；超过 ttl 但未超过 stale_ttl 时先返回旧结果，
+    同时在后台线程中重新统计（同一时间只有一个刷新线程），页面自动刷新不会每次都触发大表计数；
+    超过 stale_ttl 或日期已变化时同步重新统计。
+    导入考勤、批量录入人脸、重建汇总等批量写入后调用 invalidate，下次请求时同步重新统计。
+    """
+
+    def __init__(self, ttl=30, stale_ttl=300):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._app = None
+        self._entry = None  # (统计结果, 统计日期, 统计时间)
+        self._generation = 0  # 每次失效加1，失效前开始的统计结果不再写入缓存
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.ttl = app.config.get('DASHBOARD_CACHE_TTL', self.ttl)
+        self.stale_ttl = app.config.get('DASHBOARD_CACHE_STALE_TTL', self.stale_ttl)
+
+    def get(self):
+        """获取统计结果，缓存过期时按上述规则刷新"""
+        today = datetime.now().date()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry
+            generation = self._generation
+            if entry and entry[1] == today:
+                age = now - entry[2]
+                if age < self.ttl:
+                    return entry[0]
+                if age < self.stale_ttl:
+                    if not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(
+                            target=self._refresh, args=(generation,), name='dashboard-stats-refresh', daemon=True
+                        ).start()
+                    return entry[0]
+
+        stats = query_dashboard_stats(today)
+        self._store(stats, today, now, generation)
+        return stats
+
+    # 后台重新统计
+    def _refresh(self, generation):
+        try:
+            with self._app.app_context():
+                today = datetime.now().date()
+                now = time.monotonic()
+                self._store(query_dashboard_stats(today), today, now, generation)
+        except Exception as e:
+            self._app.logger.warning(f'刷新首页统计失败: {str(e)}')
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _store(self, stats, today, now, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._entry = (stats, today, now)
+
+    def invalidate(self):
+        """使缓存失效（批量写入后调用）"""
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+
+# 创建一个全局实例
+dashboard_stats = DashboardStatsCache()
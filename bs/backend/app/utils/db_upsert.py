@@ -0,0 +1,28 @@
+def upsert_statement(dialect, table, records, index_elements, update):
+    """
+    构建按唯一约束插入或更新的单条语句：MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，
+    SQLite/PostgreSQL 使用 INSERT ... ON CONFLICT DO UPDATE
+
+    Args:
+        dialect: 数据库方言名（engine.dialect.name）
+        table: 表或模型类
+        records: 要插入的记录（字典列表）
+        index_elements: 唯一约束包含的列名
+        update: 冲突时的更新内容，函数接收“待插入的行”（inserted/excluded）并返回 {列名: 表达式}；
+            MySQL 按字典中的顺序赋值，后面的表达式引用的是前面已更新的列值
+
+    Returns:
+        SQL语句；数据库不支持时返回None
+    """
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(records)
+        return stmt.on_duplicate_key_update(list(update(stmt.inserted).items()))
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(records)
+        return stmt.on_conflict_do_update(index_elements=index_elements, set_=update(stmt.excluded))
+    return None
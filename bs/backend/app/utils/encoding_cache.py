@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class EncodingCache:
+    """
+    人脸特征提取结果缓存（LRU，按条目数和存活时间淘汰）
+
+    以图片内容的哈希为键缓存特征提取结果：学生重复上传同一张照片、签到终端网络不稳定时重发同一帧，
+    都只需计算一次哈希，而不必重新提取特征。只缓存提取成功的结果。
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # 键 -> (结果, 写入时间)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('FACE_ENCODING_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('FACE_ENCODING_CACHE_TTL', self.ttl)
+
+    def get(self, key):
+        """获取缓存的结果，不存在或已过期时返回None"""
+        if not self.max_entries:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+# 创建一个全局实例
+encoding_cache = EncodingCache()
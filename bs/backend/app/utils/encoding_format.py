@@ -0,0 +1,68 @@
+import struct
+import numpy as np
+
+# 人脸特征二进制格式（版本1）：
+#   8字节头部：魔数 b'FE' | 格式版本(uint8) | 数据类型(uint8) | 维度(uint16) | 模型版本(uint16)，小端序
+#   负载：L2归一化后的特征向量，float32 或 float16
+# 旧格式为 float64 数组的 tobytes() 结果，没有任何头部
+MAGIC = b'FE'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<2sBBHH')
+
+DTYPE_CODES = {'float32': 1, 'float16': 2}
+CODE_DTYPES = {code: np.dtype(name).newbyteorder('<') for name, code in DTYPE_CODES.items()}
+
+
+# 判断二进制数据是否为当前版本的格式
+def is_current_format(blob):
+    if blob is None or len(blob) < HEADER.size:
+        return False
+    magic, version, dtype_code, dim, _ = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != FORMAT_VERSION or dtype_code not in CODE_DTYPES:
+        return False
+    # 校验负载长度，避免把恰好以魔数开头的旧格式数据误判为新格式
+    return len(blob) == HEADER.size + dim * CODE_DTYPES[dtype_code].itemsize
+
+
+class EncodingCodec:
+    """人脸特征的序列化与反序列化，兼容读取旧的 float64 格式"""
+
+    def __init__(self, dtype='float32', model_version=1):
+        self.dtype = dtype
+        self.model_version = model_version
+
+    def init_app(self, app):
+        self.dtype = app.config.get('FACE_ENCODING_DTYPE', self.dtype)
+        self.model_version = app.config.get('FACE_MODEL_VERSION', self.model_version)
+
+    def pack(self, encoding, dtype=None):
+        """将特征向量L2归一化后打包为带版本头部的二进制数据"""
+        dtype = dtype or self.dtype
+        if dtype not in DTYPE_CODES:
+            raise ValueError(f'不支持的特征数据类型: {dtype}')
+
+        vector = np.asarray(encoding, dtype=np.float64).ravel()
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, DTYPE_CODES[dtype], len(vector), self.model_version)
+        return header + vector.astype(CODE_DTYPES[DTYPE_CODES[dtype]]).tobytes()
+
+    def unpack(self, blob):
+        """将二进制数据解析为float32特征向量"""
+        if is_current_format(blob):
+            _, _, dtype_code, dim, _ = HEADER.unpack_from(blob)
+            return np.frombuffer(blob, dtype=CODE_DTYPES[dtype_code], count=dim, offset=HEADER.size).astype(np.float32)
+        # 旧格式：没有头部的 float64 数组
+        return np.frombuffer(blob, dtype=np.float64).astype(np.float32)
+
+    # 读取二进制数据中记录的模型版本（旧格式返回None）
+    def model_version_of(self, blob):
+        if not is_current_format(blob):
+            return None
+        return HEADER.unpack_from(blob)[4]
+
+
+# 创建一个全局实例
+encoding_codec = EncodingCodec()
@@ -0,0 +1,154 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from app.utils.encoding_cache import encoding_cache
+
+# 工作进程内的人脸识别实例，由 _init_worker 在进程启动时创建一次
+_worker_recognizer = None
+
+
+# 工作进程初始化：每个进程只加载一次模型
+def _init_worker(tolerance, seed=None):
+    global _worker_recognizer
+    from app.utils.face_recognition import FaceRecognition
+    _worker_recognizer = FaceRecognition(tolerance, seed)
+    # 预先加载人脸检测器
+    _worker_recognizer.face_detector
+
+
+# 在工作进程中执行 FaceRecognition 的特征提取方法
+def _run(method_name, *args):
+    return getattr(_worker_recognizer, method_name)(*args)
+
+
+class FaceExtractionPool:
+    """
+    人脸特征提取进程池
+
+    特征提取是CPU密集型操作，放在请求线程中执行会持有GIL并串行化同一工作进程内的所有签到请求。
+    这里把提取交给有界的 ProcessPoolExecutor 执行：排队任务数超过 max_queue 时立即拒绝，
+    单个任务超过 timeout 秒未完成时返回超时。max_workers 为 0 时在当前线程内直接执行。
+    进程池在首次使用时创建，此时签到队列、图片写入等后台线程已在运行，fork 出的子进程可能继承被其它线程持有的锁而死锁，
+    因此默认以 spawn 方式启动工作进程（子进程会重新导入主模块，启动脚本的运行代码需放在 if __name__ == '__main__' 下，app.py 已是如此）。
+    """
+
+    def __init__(self, max_workers=0, max_queue=64, timeout=10):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.tolerance = 0.6
+        self.seed = None
+        self.start_method = 'spawn'
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_workers = app.config.get('FACE_EXTRACTION_WORKERS', self.max_workers)
+        self.max_queue = app.config.get('FACE_EXTRACTION_QUEUE_SIZE', self.max_queue)
+        self.timeout = app.config.get('FACE_EXTRACTION_TIMEOUT', self.timeout)
+        self.tolerance = app.config.get('FACE_RECOGNITION_TOLERANCE', self.tolerance)
+        self.seed = app.config.get('FACE_RECOGNITION_SEED', self.seed)
+        self.start_method = app.config.get('FACE_EXTRACTION_START_METHOD', self.start_method)
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+
+    # 首次使用时创建进程池
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.tolerance, self.seed)
+                )
+            return self._executor
+
+    # 工作进程异常退出后丢弃进程池，下次使用时重建
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _call(self, failure, method_name, *args):
+        """
+        执行一次特征提取
+
+        Args:
+            failure: 失败时返回的占位结果（不含提示信息），如 (None,) 或 (None, None)
+            method_name: FaceRecognition 的方法名
+        """
+        if not self.max_workers:
+            from app.utils.face_recognition import face_recognizer
+            return getattr(face_recognizer, method_name)(*args)
+
+        # 排队任务已满时直接拒绝，避免请求无限堆积
+        if not self._slots.acquire(blocking=False):
+            return failure + ("服务繁忙，请稍后重试",)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run, method_name, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._slots.release()
+            self._reset_executor(executor)
+            return failure + (f"特征提取服务不可用: {str(e)}",)
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            return failure + ("人脸特征提取超时",)
+        except BrokenProcessPool as e:
+            self._reset_executor(executor)
+            return failure + (f"特征提取服务不可用: {str(e)}",)
+
+    # 从base64字符串中提取人脸特征，返回 (encoding, message)
+    def extract_from_base64(self, base64_string):
+        return self._call((None,), 'extract_face_encoding_from_base64', base64_string)
+
+    # 从字节流中提取人脸特征，返回 (encoding, message)
+    def extract_from_bytes(self, image_bytes):
+        return self._call((None,), 'extract_face_encoding_from_bytes', image_bytes)
+
+    # 从多人照片中提取全部人脸特征，返回 (boxes, encodings, message)
+    def extract_all_from_bytes(self, image_bytes):
+        return self._call((None, None), 'extract_all_face_encodings_from_bytes', image_bytes)
+
+    # 先按图片内容哈希和解码尺寸查找特征缓存，未命中时再提取，成功的结果写入缓存
+    def _call_cached(self, failure, method_name, face_image):
+        key = (method_name, face_image.fingerprint, face_image.max_side)
+        result = encoding_cache.get(key)
+        if result is None:
+            # validate 只读取图片头部，数据不完整（如截断的JPEG）的图片在解码像素时才会出错
+            try:
+                pixels = face_image.pixels
+            except (OSError, ValueError):
+                return failure + ('无法解析图片',)
+            result = self._call(failure, method_name, pixels)
+            if result[0] is not None:
+                encoding_cache.put(key, result)
+        return result
+
+    # 从已解码的图片（FaceImage）中提取人脸特征，只向工作进程传递缩小后的像素，返回 (encoding, message)
+    def extract_from_image(self, face_image):
+        return self._call_cached((None,), 'extract_face_encoding_from_image', face_image)
+
+    # 从已解码的多人照片（FaceImage）中提取全部人脸特征，返回 (boxes, encodings, message)
+    def extract_all_from_image(self, face_image):
+        return self._call_cached((None, None), 'extract_all_face_encodings', face_image)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# 创建一个全局实例
+face_extraction_pool = FaceExtractionPool()
+atexit.register(face_extraction_pool.shutdown)
@@ -0,0 +1,284 @@
+import threading
+import time
+import numpy as np
+from flask import current_app
+from app.utils.face_matcher import FaceMatcher, MatchResult, to_vector
+from app.utils.ann_index import IVFIndex
+from app.utils.shared_gallery import SharedFaceGallery
+
+
+class FaceGalleryCache:
+    """
+    进程级的课程人脸特征库缓存
+
+    以 course_id 为键缓存可直接用于匹配的 FaceMatcher（特征矩阵 + ID数组），
+    在学生上传人脸、选课、退课或被删除时失效。为避免多个工作进程之间的缓存长期不一致，
+    每个条目在 ttl 秒后也会自动过期。
+
+    配置了 FACE_GALLERY_SHARED_PATH 时改为从跨进程共享的内存映射文件读取（见 SharedFaceGallery）：
+    失效的课程标记为待更新并在后台延迟重建共享文件，重建完成前本进程对这些课程回退到数据库加载。
+    """
+
+    def __init__(self, tolerance=0.6, ttl=300):
+        self.tolerance = tolerance
+        self.ttl = ttl
+        self.shared = None
+        self.rebuild_delay = 1.0
+        self._app = None
+        self._entries = {}  # course_id -> (FaceMatcher, 加载时间)
+        self._generations = {}  # course_id -> 失效次数，加载期间发生失效时丢弃加载结果
+        self._cleared = 0  # clear() 的次数
+        self._dirty = set()  # 共享文件中已过时、等待重建的课程
+        self._all_dirty = False
+        self._rebuild_timer = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.tolerance = app.config.get('FACE_RECOGNITION_TOLERANCE', self.tolerance)
+        self.ttl = app.config.get('FACE_GALLERY_CACHE_TTL', self.ttl)
+        self.rebuild_delay = app.config.get('FACE_GALLERY_REBUILD_DELAY', self.rebuild_delay)
+        shared_path = app.config.get('FACE_GALLERY_SHARED_PATH')
+        if shared_path:
+            self.shared = SharedFaceGallery(shared_path, self.tolerance)
+
+    # 从数据库加载一门课程的人脸特征库（单次联表查询）
+    def _load(self, course_id):
+        from app import db
+        from app.models import Student, Enrollment
+
+        rows = db.session.query(Student.id, Student.face_encoding).join(
+            Enrollment, Enrollment.student_id == Student.id
+        ).filter(
+            Enrollment.course_id == course_id,
+            Student.face_encoding.isnot(None)
+        ).all()
+
+        if not rows:
+            return FaceMatcher(np.empty((0, 0), dtype=np.float32), [], self.tolerance)
+
+        matrix = np.vstack([to_vector(encoding) for _, encoding in rows])
+        ids = np.array([student_id for student_id, _ in rows], dtype=np.int64)
+        return FaceMatcher(matrix, ids, self.tolerance)
+
+    def get(self, course_id):
+        """获取课程的人脸匹配器，缓存未命中或已过期时从数据库加载"""
+        if self.shared is not None:
+            matcher = self._get_shared(course_id)
+            if matcher is not None:
+                return matcher
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(course_id)
+            generation = self._generation(course_id)
+        if entry and now - entry[1] < self.ttl:
+            return entry[0]
+
+        matcher = self._load(course_id)
+        with self._lock:
+            # 加载期间缓存被失效（如学生刚上传人脸）时，加载结果可能已过时，只用于本次匹配而不写入缓存
+            if self._generation(course_id) == generation:
+                self._entries[course_id] = (matcher, now)
+        return matcher
+
+    # 课程缓存的版本（调用方需持有锁）
+    def _generation(self, course_id):
+        return self._cleared, self._generations.get(course_id, 0)
+
+    # 从共享文件读取；共享文件尚不存在时同步构建，课程待重建时返回None以回退到数据库加载
+    def _get_shared(self, course_id):
+        with self._lock:
+            if self._all_dirty or course_id in self._dirty:
+                return None
+        matcher = self.shared.get(course_id)
+        if matcher is None:
+            self.shared.rebuild()
+            matcher = self.shared.get(course_id)
+        return matcher
+
+    # 延迟重建共享文件，合并短时间内的多次失效
+    def _schedule_rebuild(self):
+        if self._rebuild_timer is None:
+            self._rebuild_timer = threading.Timer(self.rebuild_delay, self._rebuild_shared)
+            self._rebuild_timer.daemon = True
+            self._rebuild_timer.start()
+
+    def _rebuild_shared(self):
+        with self._lock:
+            self._rebuild_timer = None
+            rebuilt = set(self._dirty)
+            rebuilt_all = self._all_dirty
+        with self._app.app_context():
+            try:
+                self.shared.rebuild()
+            except Exception as e:
+                current_app.logger.warning(f'重建共享人脸特征库失败: {str(e)}')
+                return
+        with self._lock:
+            # 重建期间再次失效的课程仍保持待更新状态
+            self._dirty -= rebuilt
+            for course_id in rebuilt:
+                self._entries.pop(course_id, None)
+            if rebuilt_all:
+                self._all_dirty = False
+
+    def _invalidate_courses(self, course_ids):
+        with self._lock:
+            for course_id in course_ids:
+                self._entries.pop(course_id, None)
+                self._generations[course_id] = self._generations.get(course_id, 0) + 1
+            if self.shared is not None and course_ids:
+                self._dirty.update(course_ids)
+                self._schedule_rebuild()
+
+    # 课程名单变化（选课、退课）时使缓存失效
+    def invalidate(self, course_id):
+        self._invalidate_courses({course_id})
+
+    # 学生人脸数据变化或学生被删除时，使所有包含该学生的课程缓存失效
+    def invalidate_student(self, student_id, course_ids=None):
+        """
+        Args:
+            student_id: 学生ID
+            course_ids: 学生所选课程ID列表；为空时从选课记录中查询
+                （首次上传人脸的学生尚不在任何缓存的特征库中，只能通过选课记录定位）
+        """
+        if course_ids is None:
+            from app.models import Enrollment
+            course_ids = [
+                course_id for (course_id,) in Enrollment.query.with_entities(
+                    Enrollment.course_id
+                ).filter_by(student_id=student_id).all()
+            ]
+
+        with self._lock:
+            # 同时清理缓存中仍包含该学生的课程（例如选课记录已被删除）
+            stale = [
+                course_id for course_id, (matcher, _) in self._entries.items()
+                if np.any(matcher.ids == student_id)
+            ]
+        self._invalidate_courses(set(course_ids) | set(stale))
+
+    # 批量导入人脸后，一次查询定位所有相关课程并使其缓存失效
+    def invalidate_students(self, student_ids):
+        from app import db
+        from app.models import Enrollment
+
+        student_ids = list(student_ids)
+        course_ids = set()
+        for start in range(0, len(student_ids), 1000):
+            course_ids.update(
+                course_id for (course_id,) in db.session.query(Enrollment.course_id).filter(
+                    Enrollment.student_id.in_(student_ids[start:start + 1000])
+                ).distinct().all()
+            )
+        self._invalidate_courses(course_ids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cleared += 1
+            if self.shared is not None:
+                self._all_dirty = True
+                self._schedule_rebuild()
+
+
+class CampusFaceIndex:
+    """
+    全校范围的人脸 1:N 识别索引
+
+    对所有已上传人脸的学生建立 IVF 近似最近邻索引，供不知道课程的场景（如公共教学楼的
+    考勤终端）直接识别学生。首次使用时从数据库构建，学生上传人脸或被删除时增量更新；
+    其它工作进程中的增量更新不可见，因此索引会在 ttl 秒后整体重建。
+    """
+
+    def __init__(self, tolerance=0.6, nprobe=8, ttl=3600):
+        self.tolerance = tolerance
+        self.nprobe = nprobe
+        self.ttl = ttl
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.tolerance = app.config.get('FACE_RECOGNITION_TOLERANCE', self.tolerance)
+        self.nprobe = app.config.get('FACE_CAMPUS_INDEX_NPROBE', self.nprobe)
+        self.ttl = app.config.get('FACE_CAMPUS_INDEX_TTL', self.ttl)
+
+    @property
+    def threshold(self):
+        return 1.0 - self.tolerance ** 2 / 2.0
+
+    # 从数据库读取全部学生人脸特征并重建索引
+    def rebuild(self):
+        from app import db
+        from app.models import Student
+
+        rows = db.session.query(Student.id, Student.face_encoding).filter(
+            Student.face_encoding.isnot(None)
+        ).all()
+
+        index = IVFIndex(nprobe=self.nprobe)
+        if rows:
+            vectors = np.vstack([to_vector(encoding) for _, encoding in rows])
+            index = IVFIndex(dim=vectors.shape[1], nprobe=self.nprobe)
+            index.build([student_id for student_id, _ in rows], vectors)
+
+        with self._lock:
+            self._index = index
+            self._built_at = time.monotonic()
+        return index
+
+    def _get_index(self):
+        with self._lock:
+            index = self._index
+            expired = time.monotonic() - self._built_at >= self.ttl
+        if index is None or expired:
+            index = self.rebuild()
+        return index
+
+    def identify(self, unknown_encoding, top_k=5):
+        """
+        在全校范围内识别人脸
+
+        Returns:
+            MatchResult(是否匹配成功, 匹配的学生ID, 最大相似度分数, 前k个候选 [(id, score), ...])
+        """
+        candidates = self._get_index().search(to_vector(unknown_encoding), k=top_k)
+        if not candidates:
+            return MatchResult(False, None, 0.0, [])
+        best_id, score = candidates[0]
+        is_match = score >= self.threshold
+        return MatchResult(is_match, best_id if is_match else None, score, candidates)
+
+    # 学生上传（或更新）人脸后增量加入索引
+    def add(self, student_id, encoding):
+        with self._lock:
+            index = self._index
+        if index is not None:
+            index.add(student_id, to_vector(encoding))
+
+    # 批量导入人脸后一次性加入索引
+    def add_many(self, student_ids, encodings):
+        with self._lock:
+            index = self._index
+        if index is None or not len(student_ids):
+            return
+        if index.is_trained:
+            index.add_many(student_ids, np.vstack([to_vector(encoding) for encoding in encodings]))
+        else:
+            for student_id, encoding in zip(student_ids, encodings):
+                index.add(student_id, to_vector(encoding))
+
+    # 学生被删除后从索引中移除
+    def remove(self, student_id):
+        with self._lock:
+            index = self._index
+        if index is not None:
+            index.remove(student_id)
+
+
+# 创建全局实例
+face_gallery = FaceGalleryCache()
+campus_index = CampusFaceIndex()
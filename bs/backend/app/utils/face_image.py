@@ -0,0 +1,147 @@
+import base64
+import binascii
+import hashlib
+import os
+import shutil
+import numpy as np
+from io import BytesIO
+from PIL import Image
+
+# 支持的图片格式及保存时使用的扩展名
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'BMP': 'bmp', 'WEBP': 'webp'}
+
+
+class FaceImage:
+    """
+    一次解码、多处复用的人脸图片
+
+    base64 只解码一次得到原始字节；像素只解码一次，并在解码时直接缩小到特征提取所需的分辨率
+    （JPEG 使用 PIL 的 draft 模式按 1/2、1/4、1/8 比例解码，无需先解出完整大图）。
+    特征提取、校验和保存都使用同一个对象：保存时直接写入原始字节，不再重新解析和编码。
+    原始数据也可以是一个文件对象（如上传时落盘的临时文件），此时不会整体读入内存。
+    """
+
+    def __init__(self, raw_bytes=None, max_side=640, file=None):
+        self._raw_bytes = raw_bytes
+        self._file = file
+        self.max_side = max_side
+        self.format = None
+        self.size = None  # 原图尺寸 (宽, 高)
+        self._pixels = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_base64(cls, base64_string, max_side=640):
+        # 移除base64前缀（如果有）
+        if 'base64,' in base64_string:
+            base64_string = base64_string.split('base64,')[1]
+        return cls(base64.b64decode(base64_string), max_side)
+
+    @classmethod
+    def from_bytes(cls, image_bytes, max_side=640):
+        return cls(image_bytes, max_side)
+
+    @classmethod
+    def from_file(cls, file, max_side=640):
+        return cls(max_side=max_side, file=file)
+
+    # 打开原始数据的可读流（文件对象会回到开头）
+    def open_stream(self):
+        if self._raw_bytes is None:
+            self._file.seek(0)
+            return self._file
+        return BytesIO(self._raw_bytes)
+
+    # 将基于文件的原始数据读入内存，使对象在请求结束（临时文件关闭）后仍可使用
+    def detach(self):
+        self.raw_bytes
+        self._file = None
+        return self
+
+    @property
+    def raw_bytes(self):
+        """原始图片字节；基于文件时会读入整个文件，尽量使用 open_stream"""
+        if self._raw_bytes is None:
+            self._raw_bytes = self.open_stream().read()
+        return self._raw_bytes
+
+    @property
+    def fingerprint(self):
+        """原始字节的快速哈希（BLAKE2b，128位），用作特征缓存的键"""
+        if self._fingerprint is None:
+            blake2b = hashlib.blake2b(digest_size=16)
+            stream = self.open_stream()
+            for chunk in iter(lambda: stream.read(64 * 1024), b''):
+                blake2b.update(chunk)
+            self._fingerprint = blake2b.hexdigest()
+        return self._fingerprint
+
+    @property
+    def extension(self):
+        self._open()
+        return FORMAT_EXTENSIONS.get(self.format, 'jpg')
+
+    # 读取图片头部信息（格式和尺寸），不解码像素
+    def _open(self):
+        if self.format is None:
+            image = Image.open(self.open_stream())
+            self.format = image.format
+            self.size = image.size
+            return image
+        return None
+
+    @property
+    def pixels(self):
+        """缩小到 max_side 以内的RGB像素数组 (高, 宽, 3)，首次访问时解码"""
+        if self._pixels is None:
+            image = self._open() or Image.open(self.open_stream())
+            # JPEG 按缩小比例直接解码
+            image.draft('RGB', (self.max_side, self.max_side))
+            image = image.convert('RGB')
+            if max(image.size) > self.max_side:
+                image.thumbnail((self.max_side, self.max_side))
+            self._pixels = np.asarray(image)
+        return self._pixels
+
+    def validate(self, allowed_formats=None, min_side=64):
+        """
+        校验图片是否可用于人脸识别
+
+        Returns:
+            (是否有效, 提示信息)
+        """
+        try:
+            self._open()
+        except Exception as e:
+            return False, f"无法解析图片: {str(e)}"
+        if allowed_formats and FORMAT_EXTENSIONS.get(self.format) not in allowed_formats:
+            return False, f"不支持的图片格式: {self.format}"
+        if min(self.size) < min_side:
+            return False, "图片分辨率过低"
+        return True, "图片有效"
+
+    def save(self, save_path):
+        """保存原始字节（不重新编码）"""
+        try:
+            # 确保目录存在
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            with open(save_path, 'wb') as f:
+                shutil.copyfileobj(self.open_stream(), f)
+            return True, "图片保存成功"
+        except Exception as e:
+            return False, f"图片保存失败: {str(e)}"
+
+
+# 从base64字符串创建并校验 FaceImage，失败时返回 (None, 提示信息)
+def load_face_image(base64_string, max_side=None):
+    from flask import current_app
+    max_side = max_side or current_app.config.get('FACE_IMAGE_MAX_SIDE', 640)
+    try:
+        image = FaceImage.from_base64(base64_string, max_side)
+    except (binascii.Error, ValueError) as e:
+        return None, f"处理base64图片失败: {str(e)}"
+
+    valid, message = image.validate(current_app.config.get('ALLOWED_EXTENSIONS'))
+    if not valid:
+        return None, message
+    return image, "图片解码成功"
@@ -0,0 +1,108 @@
+import numpy as np
+from collections import namedtuple
+from app.utils.encoding_format import encoding_codec
+
+# 单次匹配结果：是否匹配成功、最佳匹配ID、最佳相似度、前k个候选 [(id, score), ...]
+MatchResult = namedtuple('MatchResult', ['is_match', 'best_id', 'score', 'candidates'])
+
+
+# 将存储的人脸特征（二进制或数组）转换为float32向量
+def to_vector(encoding):
+    if isinstance(encoding, (bytes, bytearray, memoryview)):
+        # 数据库中存储的二进制特征（带版本头部的新格式或旧的 float64 格式）
+        return encoding_codec.unpack(bytes(encoding))
+    return np.asarray(encoding, dtype=np.float32).ravel()
+
+
+# 对矩阵按行做L2归一化（零向量保持为零）
+def l2_normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FaceMatcher:
+    """
+    向量化的人脸匹配器
+
+    将一门课程所有已知人脸特征堆叠为一个连续的float32矩阵（每行已L2归一化），
+    对未知人脸只需一次矩阵-向量乘法即可得到与全部已知人脸的余弦相似度。
+    """
+
+    def __init__(self, matrix, ids, tolerance=0.6, normalized=False):
+        """
+        Args:
+            matrix: 已知人脸特征矩阵，形状为 (n, dim)
+            ids: 与矩阵行对应的ID数组，长度为 n
+            tolerance: 欧氏距离阈值，与 face_recognition 库的 tolerance 含义一致
+            normalized: 矩阵是否已是按行L2归一化的连续float32矩阵；为True时直接使用，不复制
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if not normalized and len(matrix):
+            matrix = np.ascontiguousarray(l2_normalize(matrix))
+        self.matrix = matrix
+        self.ids = np.asarray(ids)
+        self.tolerance = tolerance
+        # 单位向量下 |a-b|^2 = 2 - 2cos，故 距离<=tolerance 等价于 cos >= 1 - tolerance^2/2
+        self.threshold = 1.0 - tolerance ** 2 / 2.0
+
+    @classmethod
+    def from_pairs(cls, known_encodings_with_ids, tolerance=0.6):
+        """由 [(encoding1, id1), (encoding2, id2), ...] 构建匹配器"""
+        if not known_encodings_with_ids:
+            return cls(np.empty((0, 0), dtype=np.float32), [], tolerance)
+        vectors = [to_vector(encoding) for encoding, _ in known_encodings_with_ids]
+        ids = [i for _, i in known_encodings_with_ids]
+        return cls(np.vstack(vectors), ids, tolerance)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # 计算一个或多个未知人脸与全部已知人脸的相似度矩阵
+    def scores(self, unknown_encodings):
+        probes = np.asarray(unknown_encodings, dtype=np.float32)
+        if probes.ndim == 1:
+            probes = probes.reshape(1, -1)
+        return l2_normalize(probes) @ self.matrix.T
+
+    # 第i行对应的ID（numpy 数组中的数值转换为Python数值，其他类型的ID如 None 原样返回）
+    def _id(self, i):
+        value = self.ids[i]
+        return value.item() if isinstance(value, np.generic) else value
+
+    # 从一行相似度中取出前k个候选（argpartition 避免全量排序）
+    def _top_k(self, row, top_k):
+        k = min(top_k, len(row))
+        if k < len(row):
+            idx = np.argpartition(-row, k - 1)[:k]
+        else:
+            idx = np.arange(len(row))
+        idx = idx[np.argsort(-row[idx])]
+        return [(self._id(i), float(row[i])) for i in idx]
+
+    def _result(self, row, top_k):
+        best = int(np.argmax(row))
+        score = float(row[best])
+        candidates = self._top_k(row, top_k) if top_k > 1 else [(self._id(best), score)]
+        is_match = score >= self.threshold
+        return MatchResult(is_match, self._id(best) if is_match else None, score, candidates)
+
+    def match(self, unknown_encoding, top_k=1):
+        """
+        匹配单个未知人脸
+
+        Returns:
+            MatchResult(是否匹配成功, 匹配的ID, 最大相似度分数, 前k个候选)
+        """
+        if len(self) == 0:
+            return MatchResult(False, None, 0.0, [])
+        return self._result(self.scores(unknown_encoding)[0], top_k)
+
+    def match_many(self, unknown_encodings, top_k=1):
+        """批量匹配多个未知人脸，一次矩阵乘法完成全部打分"""
+        if len(self) == 0:
+            return [MatchResult(False, None, 0.0, []) for _ in unknown_encodings]
+        scores = self.scores(unknown_encodings)
+        return [self._result(row, top_k) for row in scores]
@@ -1,27 +1,60 @@
 import numpy as np
+import cv2
 import os
+import hashlib
 from PIL import Image
 from io import BytesIO
 import base64
-import random
+from app.utils.face_matcher import FaceMatcher
 
 class FaceRecognition:
-    def __init__(self, tolerance=0.6):
+    def __init__(self, tolerance=0.6, seed=None):
         self.tolerance = tolerance
+        # 设置种子后为确定性模式：模拟特征由种子和图片内容决定，结果可复现（用于基准测试和问题复现）
+        self.seed = seed
+        self._face_detector = None
+    
+    # 生成模拟的人脸特征：随机模式下为随机向量，确定性模式下相同的图片数据总是得到相同的特征
+    def _mock_encoding(self, data):
+        if self.seed is None:
+            return np.random.rand(128)
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).tobytes()
+        elif isinstance(data, str):
+            data = data.encode()
+        digest = hashlib.blake2b(data, digest_size=8, key=str(self.seed).encode()).digest()
+        return np.random.default_rng(int.from_bytes(digest, 'little')).random(128)
+    
+    # 人脸检测器（OpenCV Haar 级联分类器），首次使用时加载
+    @property
+    def face_detector(self):
+        if self._face_detector is None:
+            cascade_path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+            self._face_detector = cv2.CascadeClassifier(cascade_path)
+        return self._face_detector
+    
+    # 检测图片中的所有人脸，返回人脸框列表 [(x, y, w, h), ...]
+    def detect_faces(self, image, min_size=40):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        faces = self.face_detector.detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size)
+        )
+        return [tuple(int(v) for v in face) for face in faces]
     
     # 从图片文件中提取人脸特征（模拟）
     def extract_face_encoding(self, image_path):
         try:
-            # 模拟提取特征，返回随机向量
-            return np.random.rand(128), "人脸特征提取成功"
+            # 模拟提取特征
+            with open(image_path, 'rb') as f:
+                return self._mock_encoding(f.read()), "人脸特征提取成功"
         except Exception as e:
             return None, f"提取人脸特征失败: {str(e)}"
     
     # 从字节流中提取人脸特征（模拟）
     def extract_face_encoding_from_bytes(self, image_bytes):
         try:
-            # 模拟提取特征，返回随机向量
-            return np.random.rand(128), "人脸特征提取成功"
+            # 模拟提取特征
+            return self._mock_encoding(image_bytes), "人脸特征提取成功"
         except Exception as e:
             return None, f"提取人脸特征失败: {str(e)}"
     
@@ -35,30 +68,93 @@ class FaceRecognition:
             # 解码base64字符串为字节流
             image_bytes = base64.b64decode(base64_string)
             
-            # 模拟提取特征，返回随机向量
-            return np.random.rand(128), "人脸特征提取成功"
+            # 模拟提取特征
+            return self._mock_encoding(image_bytes), "人脸特征提取成功"
         except Exception as e:
             return None, f"处理base64图片失败: {str(e)}"
     
-    # 比较两个人脸特征是否匹配（模拟）
-    def compare_faces(self, known_encoding, unknown_encoding):
+    # 从已解码的RGB像素数组中提取人脸特征（模拟）
+    def extract_face_encoding_from_image(self, pixels):
         try:
-            # 模拟计算相似度分数
-            score = random.uniform(0.5, 1.0)
-            is_match = score > 0.7
+            # 模拟提取特征
+            return self._mock_encoding(pixels), "人脸特征提取成功"
+        except Exception as e:
+            return None, f"提取人脸特征失败: {str(e)}"
+    
+    # 批量提取多张人脸图像的特征（模拟），返回 (n, 128) 的特征矩阵
+    def extract_face_encodings_batch(self, face_images):
+        # 模拟提取特征，每张人脸返回一个向量
+        if self.seed is None:
+            return np.random.rand(len(face_images), 128)
+        return np.array([self._mock_encoding(face) for face in face_images]).reshape(len(face_images), 128)
+    
+    # 从一张包含多人的图片字节流中检测全部人脸并批量提取特征
+    def extract_all_face_encodings_from_bytes(self, image_bytes):
+        """
+        Returns:
+            (人脸框列表 [(x, y, w, h), ...], 特征矩阵 (n, 128), 提示信息)；失败时前两项为 None
+        """
+        try:
+            image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return None, None, "无法解析图片"
             
-            return is_match, score
+            return self.extract_all_face_encodings(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        except Exception as e:
+            return None, None, f"提取人脸特征失败: {str(e)}"
+    
+    # 从已解码的RGB像素数组中检测全部人脸并批量提取特征
+    def extract_all_face_encodings(self, pixels):
+        try:
+            boxes = self.detect_faces(cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY))
+            if not boxes:
+                return None, None, "未检测到人脸"
+            
+            crops = [pixels[y:y + h, x:x + w] for x, y, w, h in boxes]
+            encodings = self.extract_face_encodings_batch(crops)
+            return boxes, encodings, f"检测到{len(boxes)}张人脸"
+        except Exception as e:
+            return None, None, f"提取人脸特征失败: {str(e)}"
+    
+    # 比较两个人脸特征是否匹配
+    def compare_faces(self, known_encoding, unknown_encoding):
+        try:
+            matcher = FaceMatcher.from_pairs([(known_encoding, None)], self.tolerance)
+            result = matcher.match(unknown_encoding)
+            return result.is_match, result.score
         except Exception as e:
             return False, 0.0
     
-    # 批量识别人脸（模拟）
+    # 构建向量化匹配器
+    def build_matcher(self, known_encodings_with_ids):
+        return FaceMatcher.from_pairs(known_encodings_with_ids, self.tolerance)
+    
+    # 批量识别人脸，返回包含前k个候选的完整结果
+    def match_faces(self, unknown_encoding, known_encodings_with_ids, top_k=5):
+        """
+        Args:
+            unknown_encoding: 未知人脸的特征编码
+            known_encodings_with_ids: [(encoding1, id1), ...] 列表或已构建好的 FaceMatcher
+            top_k: 返回的候选数量
+        
+        Returns:
+            MatchResult(是否匹配成功, 匹配的ID, 最大相似度分数, 前k个候选 [(id, score), ...])
+        """
+        if isinstance(known_encodings_with_ids, FaceMatcher):
+            matcher = known_encodings_with_ids
+        else:
+            matcher = self.build_matcher(known_encodings_with_ids)
+        return matcher.match(unknown_encoding, top_k=top_k)
+    
+    # 批量识别人脸
     def recognize_faces(self, unknown_encoding, known_encodings_with_ids):
         """
-        批量识别未知人脸与已知人脸的匹配（模拟）
+        批量识别未知人脸与已知人脸的匹配
         
         Args:
             unknown_encoding: 未知人脸的特征编码
-            known_encodings_with_ids: 已知人脸的特征编码和对应的ID列表，格式为 [(encoding1, id1), (encoding2, id2), ...]
+            known_encodings_with_ids: 已知人脸的特征编码和对应的ID列表，格式为 [(encoding1, id1), (encoding2, id2), ...]，
+                也可以直接传入已构建好的 FaceMatcher
         
         Returns:
             (是否匹配成功, 匹配的ID, 最大相似度分数)
@@ -67,17 +163,8 @@ class FaceRecognition:
             if not known_encodings_with_ids:
                 return False, None, 0.0
             
-            # 分离已知的编码和ID
-            known_ids = [i for _, i in known_encodings_with_ids]
-            
-            # 模拟匹配过程，有80%的概率返回一个匹配结果
-            if random.random() < 0.8 and known_ids:
-                best_match_id = random.choice(known_ids)
-                best_match_score = random.uniform(0.7, 0.98)
-                return True, best_match_id, best_match_score
-            else:
-                # 未匹配成功，返回一个较低的相似度分数
-                return False, None, random.uniform(0.5, 0.7)
+            result = self.match_faces(unknown_encoding, known_encodings_with_ids, top_k=1)
+            return result.is_match, result.best_id, result.score
         except Exception as e:
             return False, None, 0.0
     
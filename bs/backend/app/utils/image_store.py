@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import os
+import re
+from collections import Counter
+from app.utils.image_writer import image_writer
+
+logger = logging.getLogger(__name__)
+
+# 图片标识：SHA-256摘要（十六进制）.扩展名
+KEY_PATTERN = re.compile(r'^([0-9a-f]{64})\.([a-z0-9]{1,10})$')
+
+
+class ImageStore:
+    """
+    内容寻址图片存储
+
+    图片按内容的SHA-256摘要命名，保存在 <root>/<摘要前2位>/<摘要3-4位>/ 下，相同内容的图片只保存一份。
+    StoredImage 表记录每张图片被多少条记录引用，引用数降为0时删除文件。
+    新图片由后台写入队列写盘，同时生成用于列表展示的缩略图（<root>/thumbnails/...）；
+    记录中的图片标识与引用数在同一事务中写入，不等待写盘完成，写完之前由图片接口从写入队列中读取。
+    记录中保存的是图片标识（摘要.扩展名），通过 /images/<标识> 访问，内容不变，可长期缓存。
+    """
+
+    def __init__(self, root=None, thumbnail_size=160):
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+
+    def init_app(self, app):
+        self.root = app.config.get('IMAGE_STORE_FOLDER') or os.path.join(app.config['UPLOAD_FOLDER'], 'store')
+        self.thumbnail_size = app.config.get('IMAGE_THUMBNAIL_SIZE', self.thumbnail_size)
+
+    # 解析图片标识，返回 (摘要, 扩展名)；不是图片标识（如旧的文件名）时返回None
+    @staticmethod
+    def parse_key(key):
+        match = KEY_PATTERN.match(key or '')
+        return match.groups() if match else None
+
+    def path_for(self, key):
+        digest, _ = self.parse_key(key)
+        return os.path.join(self.root, digest[:2], digest[2:4], key)
+
+    def thumbnail_path_for(self, key):
+        digest, _ = self.parse_key(key)
+        return os.path.join(self.root, 'thumbnails', digest[:2], digest[2:4], f'{digest}.jpg')
+
+    # 图片的访问地址（需在请求上下文中调用），不是图片标识（如旧的文件名）时地址为None
+    def urls(self, key):
+        from flask import url_for
+        if not self.parse_key(key):
+            return {'image_url': None, 'thumbnail_url': None}
+        return {
+            'image_url': url_for('images.get_image', key=key),
+            'thumbnail_url': url_for('images.get_thumbnail', key=key)
+        }
+
+    # 分块计算图片内容的摘要，不把基于文件的图片整体读入内存
+    @staticmethod
+    def _digest(face_image):
+        sha256 = hashlib.sha256()
+        size = 0
+        stream = face_image.open_stream()
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            sha256.update(chunk)
+            size += len(chunk)
+        return sha256.hexdigest(), size
+
+    def put(self, face_image, model, record_ids, column='image_path'):
+        """
+        保存图片并让记录引用它（记录需已提交）
+
+        相同内容的图片已存在时只增加引用数；否则交给后台写入队列写盘。两种情况下图片标识都和引用数在同一事务中写入记录，
+        记录原来引用的图片在该事务中读取，提交后释放（调用方无需再释放旧图片）。
+
+        Args:
+            face_image: FaceImage
+            model: 引用图片的模型类，如 Attendance、Student
+            record_ids: 引用图片的记录ID列表
+            column: 保存图片标识的字段名
+
+        Returns:
+            (图片标识, 提示信息)；失败时图片标识为None
+        """
+        return self.put_many([(face_image, record_ids)], model, column)[0]
+
+    def put_many(self, items, model, column='image_path', block=False):
+        """
+        批量保存图片（如批量导入人脸照片），引用数更新、记录原图片标识的读取和记录更新在同一个事务中完成，
+        提交后释放记录原来引用的图片
+
+        Args:
+            items: [(FaceImage, 引用该图片的记录ID列表), ...]
+            model: 引用图片的模型类
+            column: 保存图片标识的字段名
+            block: 写入队列已满时是否等待（而不是放弃保存）
+
+        Returns:
+            与 items 对应的 [(图片标识, 提示信息), ...]
+        """
+        from app import db
+        from app.models import StoredImage
+        from sqlalchemy.exc import IntegrityError
+
+        items = [(face_image, list(record_ids)) for face_image, record_ids in items]
+        if not items:
+            return []
+        digests = [self._digest(face_image) for face_image, _ in items]
+
+        # 同一批中内容相同的图片合并计数
+        references = Counter()
+        for (digest, _), (_, record_ids) in zip(digests, items):
+            references[digest] += len(record_ids)
+
+        # 原子地增加已有图片的引用数，插入新图片（并发插入同一图片时唯一约束冲突，重试即可）
+        for _ in range(3):
+            existing = dict(db.session.query(StoredImage.content_hash, StoredImage.extension).filter(
+                StoredImage.content_hash.in_(list(references))
+            ).all())
+            for digest, count in references.items():
+                if digest in existing:
+                    StoredImage.query.filter_by(content_hash=digest).update(
+                        {StoredImage.ref_count: StoredImage.ref_count + count},
+                        synchronize_session=False
+                    )
+            added = set()
+            for (digest, size), (face_image, _) in zip(digests, items):
+                if digest not in existing and digest not in added:
+                    added.add(digest)
+                    existing[digest] = face_image.extension
+                    db.session.add(StoredImage(
+                        content_hash=digest,
+                        extension=face_image.extension,
+                        size=size,
+                        ref_count=references[digest]
+                    ))
+            try:
+                db.session.flush()
+                break
+            except IntegrityError:
+                db.session.rollback()
+        else:
+            return [(None, "图片保存失败")] * len(items)
+
+        # 在同一事务中读取记录原来的图片标识（行锁；SQLite 在上面的写入后已持有写锁），
+        # 并发替换同一记录的图片时，每个旧标识只会被其中一个请求读到并释放
+        record_ids = [record_id for _, ids in items for record_id in ids]
+        replaced = [key for (key,) in db.session.query(getattr(model, column)).filter(
+            model.id.in_(record_ids)
+        ).with_for_update().all()]
+
+        # 图片标识与引用数在同一事务中写入记录，之后写入队列的完成顺序不会再改动记录
+        keys = [f'{digest}.{existing[digest]}' for digest, _ in digests]
+        db.session.bulk_update_mappings(model, [
+            {'id': record_id, column: key}
+            for key, (_, record_ids) in zip(keys, items)
+            for record_id in record_ids
+        ])
+        db.session.commit()
+        self.release(replaced)
+
+        # 磁盘上还没有的图片交给后台写入队列（同一批中相同内容只写一次；此前写入失败的图片也会再次写入）
+        results = {}
+        for key, (face_image, _) in zip(keys, items):
+            if key in results:
+                continue
+            path = self.path_for(key)
+            if os.path.exists(path) or image_writer.pending_data(path) is not None:
+                results[key] = (key, "图片已存在")
+                continue
+            thumbnail = (self.thumbnail_path_for(key), self.thumbnail_size)
+            saved, message = image_writer.submit(face_image, path, thumbnail=thumbnail, block=block)
+            if not saved:
+                # 队列已满时在当前线程写入，不让记录引用一张不存在的图片
+                saved, message = image_writer.write_now(face_image, path, thumbnail)
+                if not saved:
+                    logger.error('图片保存失败 %s: %s', path, message)
+            results[key] = (key, message)
+        return [results[key] for key in keys]
+
+    def release(self, keys):
+        """
+        释放记录对图片的引用（每个标识出现一次释放一个引用），引用数降为0的图片连同缩略图一起删除；
+        需在引用这些图片的记录删除或改指其它图片并提交之后调用
+        """
+        from app import db
+        from app.models import StoredImage
+
+        counts = Counter(key for key in keys if self.parse_key(key))
+        if not counts:
+            return
+
+        removed = []
+        for key, count in counts.items():
+            digest, _ = self.parse_key(key)
+            StoredImage.query.filter_by(content_hash=digest).update(
+                {StoredImage.ref_count: StoredImage.ref_count - count},
+                synchronize_session=False
+            )
+            # 条件删除，避免删掉刚被其它请求重新引用的图片
+            if StoredImage.query.filter(
+                StoredImage.content_hash == digest,
+                StoredImage.ref_count <= 0
+            ).delete(synchronize_session=False):
+                removed.append(key)
+        db.session.commit()
+
+        for key in removed:
+            for path in (self.path_for(key), self.thumbnail_path_for(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error('删除图片失败 %s: %s', path, str(e))
+
+
+# 创建一个全局实例
+image_store = ImageStore()
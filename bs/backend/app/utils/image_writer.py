@@ -0,0 +1,242 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from io import BytesIO
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 一个待写入的图片：目标路径、原始字节、可选的缩略图 (路径, 最大边长)，以及已尝试写入的次数
+WriteTask = namedtuple('WriteTask', ['path', 'data', 'thumbnail', 'attempts'])
+
+
+# 生成JPEG缩略图（JPEG 按缩小比例直接解码）
+def make_thumbnail(data, max_side):
+    image = Image.open(BytesIO(data))
+    image.draft('RGB', (max_side, max_side))
+    image = image.convert('RGB')
+    image.thumbnail((max_side, max_side))
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=80)
+    return output.getvalue()
+
+
+class ImageWriteQueue:
+    """
+    图片异步写入队列（write-behind）
+
+    请求只把图片字节放入内存队列后立即返回，由后台线程批量写盘（需要时同时生成缩略图）：一批文件全部写完后再逐个 fsync，
+    并对每个目录只 fsync 一次。队列只负责写文件，引用图片的记录由调用方在提交任务前写入，
+    写入完成的先后不会覆盖记录中更新的值；写完之前可通过 pending_data 读取队列中的图片。
+    上传目录所在磁盘变慢时只会让队列变长，不会拖慢签到请求。
+    队列中图片的总字节数超过 max_bytes 时拒绝新的写入，保证内存有界；写入失败的图片间隔 retry_delay 秒重试，
+    共尝试 max_attempts 次；进程退出时会先写完队列中剩余的图片。
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, batch_size=32, enabled=True, max_attempts=3, retry_delay=1.0):
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.app = None
+        self._queue = deque()
+        self._pending_bytes = 0
+        self._in_flight = 0
+        self._writing = []
+        self._stopping = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_bytes = app.config.get('IMAGE_WRITE_QUEUE_BYTES', self.max_bytes)
+        self.batch_size = app.config.get('IMAGE_WRITE_BATCH_SIZE', self.batch_size)
+        self.enabled = app.config.get('IMAGE_WRITE_BEHIND', self.enabled)
+        self.max_attempts = app.config.get('IMAGE_WRITE_ATTEMPTS', self.max_attempts)
+
+    def submit(self, face_image, path, thumbnail=None, block=False):
+        """
+        提交一个图片写入任务
+
+        Args:
+            face_image: FaceImage，写入其原始字节
+            path: 保存路径
+            thumbnail: (缩略图路径, 最大边长)，在后台写入时一并生成
+            block: 队列已满时是否等待（批量导入等后台任务使用），默认立即拒绝
+
+        Returns:
+            (是否已接受, 提示信息)
+        """
+        task = WriteTask(path, face_image.raw_bytes, thumbnail, 0)
+
+        # 未启用时在当前线程同步写入
+        if not self.enabled:
+            return self.write_now(face_image, path, thumbnail)
+
+        with self._cond:
+            if self._stopping:
+                return False, "图片写入队列已关闭"
+            while block and not self._stopping and self._queue and self._pending_bytes + len(task.data) > self.max_bytes:
+                self._cond.wait()
+            if self._queue and self._pending_bytes + len(task.data) > self.max_bytes:
+                logger.warning('图片写入队列已满，丢弃图片 %s', path)
+                return False, "图片写入队列已满"
+            self._queue.append(task)
+            self._pending_bytes += len(task.data)
+            self._ensure_thread()
+            self._cond.notify_all()
+        return True, "图片已加入写入队列"
+
+    # 首次提交时启动后台写入线程
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='image-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # 取出当前排队的任务（最多 batch_size 个）作为一批
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                self._writing = batch
+
+            try:
+                failed = self._write_batch(batch)
+            except Exception:
+                logger.exception('图片批量写入失败')
+                failed = batch
+
+            # 写入失败的图片稍后重试，多次失败后放弃（之后上传相同内容的图片时会再次写入）
+            retry = [task._replace(attempts=task.attempts + 1) for task in failed if task.attempts + 1 < self.max_attempts]
+            for task in failed:
+                if task.attempts + 1 >= self.max_attempts:
+                    logger.error('图片多次写入失败，已放弃 %s', task.path)
+            if retry and not self._stopping:
+                time.sleep(self.retry_delay)
+
+            with self._cond:
+                self._queue.extend(retry)
+                self._pending_bytes -= sum(len(task.data) for task in batch) - sum(len(task.data) for task in retry)
+                self._in_flight = 0
+                self._writing = []
+                self._cond.notify_all()
+
+    def write_now(self, face_image, path, thumbnail=None):
+        """
+        在当前线程中同步写入一张图片（未启用异步写入、或队列已满而图片必须保存时使用）
+
+        Returns:
+            (是否写入成功, 提示信息)
+        """
+        if self._write_batch([WriteTask(path, face_image.raw_bytes, thumbnail, 0)]):
+            return False, "图片写入失败"
+        return True, "图片保存成功"
+
+    def pending_data(self, path):
+        """队列中（或正在写入的一批中）尚未写完的图片字节，不在队列中时返回None"""
+        with self._cond:
+            for task in list(self._writing) + list(self._queue):
+                if task.path == path:
+                    return task.data
+        return None
+
+    def _write_batch(self, batch):
+        """写入一批图片，返回原图写入失败的任务列表"""
+        # 每个任务要写入的文件：原图，以及可选的缩略图（缩略图失败不影响原图）
+        outputs = []
+        for task in batch:
+            outputs.append((task, task.path, task.data))
+            if task.thumbnail:
+                thumbnail_path, max_side = task.thumbnail
+                try:
+                    outputs.append((None, thumbnail_path, make_thumbnail(task.data, max_side)))
+                except Exception as e:
+                    logger.error('缩略图生成失败 %s: %s', thumbnail_path, str(e))
+
+        written = []
+        files = []
+        directories = set()
+        try:
+            # 先写入全部临时文件，再统一 fsync，合并磁盘刷写
+            for task, path, data in outputs:
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    f = open(f'{path}.{os.getpid()}.tmp', 'wb')
+                except OSError as e:
+                    logger.error('图片写入失败 %s: %s', path, str(e))
+                    continue
+                files.append((task, path, f))
+                try:
+                    f.write(data)
+                except OSError as e:
+                    files.pop()
+                    f.close()
+                    logger.error('图片写入失败 %s: %s', path, str(e))
+
+            for task, path, f in files:
+                try:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    os.replace(f'{path}.{os.getpid()}.tmp', path)
+                    directories.add(os.path.dirname(path))
+                    if task is not None:
+                        written.append(task)
+                except OSError as e:
+                    logger.error('图片写入失败 %s: %s', path, str(e))
+        finally:
+            for _, _, f in files:
+                f.close()
+
+        # 每个目录只 fsync 一次，保证重命名后的目录项落盘
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+        written = {id(task) for task in written}
+        return [task for task in batch if id(task) not in written]
+
+    def pending_count(self):
+        """队列中尚未写完的图片数量"""
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def flush(self, timeout=None):
+        """等待队列中的图片全部写完，返回是否在超时前完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=30):
+        """停止接受新任务，并写完队列中剩余的图片"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+# 创建一个全局实例
+image_writer = ImageWriteQueue()
+atexit.register(image_writer.shutdown)
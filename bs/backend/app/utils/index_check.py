@@ -0,0 +1,44 @@
+from sqlalchemy import inspect
+
+
+def _covered(columns, existing):
+    """existing 中是否有以 columns 开头的索引（前缀相同的索引同样可以用于这些列上的查询）"""
+    return any(list(candidate[:len(columns)]) == list(columns) for candidate in existing)
+
+
+def find_missing_indexes(engine, metadata):
+    """
+    对比模型中声明的索引与数据库中实际存在的索引（含主键和唯一约束），
+    按列判断而不按名称，数据库中已有列相同（或以这些列开头）的其他索引时视为已存在。
+    数据库中还不存在的表跳过。
+
+    Returns:
+        [(表名, 索引名, [列名])]
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in tables or not table.indexes:
+            continue
+        existing = [index['column_names'] for index in inspector.get_indexes(table.name)]
+        existing += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table.name)]
+        existing.append(inspector.get_pk_constraint(table.name)['constrained_columns'])
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            columns = [column.name for column in index.columns]
+            if not _covered(columns, existing):
+                missing.append((table.name, index.name, columns))
+    return missing
+
+
+def check_indexes(app):
+    """启动时检查热点查询所需的索引，缺少时记录警告（在应用上下文中调用）"""
+    from app import db
+
+    try:
+        missing = find_missing_indexes(db.engine, db.metadata)
+    except Exception as e:
+        app.logger.warning(f'检查数据库索引失败: {str(e)}')
+        return
+    for table, name, columns in missing:
+        app.logger.warning(f'数据库缺少索引 {name}（{table}: {", ".join(columns)}），相关查询将扫描全表，请执行 flask db upgrade')
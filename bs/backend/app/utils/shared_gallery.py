@@ -0,0 +1,173 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+from app.utils.face_matcher import FaceMatcher, to_vector, l2_normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为不加跨进程锁
+    fcntl = None
+
+# 共享特征库文件格式（小端序）：
+#   64字节头部：魔数 b'FGAL' | 格式版本(uint32) | 维度(uint32) | 行数(uint64) | 课程数(uint64) | 生成版本(uint64)
+#   课程偏移表：每门课程 (course_id, 起始行, 行数)，均为 int64
+#   ID数组：每行对应的学生ID，int64
+#   特征矩阵：行数 x 维度 的 float32 矩阵（已L2归一化），按64字节对齐
+# 同一门课程的行连续存放，因此每门课程的特征矩阵都是整个矩阵的一个切片，无需复制
+MAGIC = b'FGAL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIIQQQ')
+HEADER_SIZE = 64
+COURSE_ENTRY = np.dtype([('course_id', '<i8'), ('start', '<i8'), ('count', '<i8')])
+
+
+def _align(offset, alignment=64):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class _Mapping:
+    """一个已映射到内存的特征库文件，所有数组都是对 mmap 的零拷贝视图"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, dim, n_rows, n_courses, generation = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('共享特征库文件格式不正确')
+        self.dim = dim
+        self.generation = generation
+
+        offset = HEADER_SIZE
+        courses = np.frombuffer(self.buffer, dtype=COURSE_ENTRY, count=n_courses, offset=offset)
+        offset += courses.nbytes
+        self.ids = np.frombuffer(self.buffer, dtype='<i8', count=n_rows, offset=offset)
+        offset = _align(offset + self.ids.nbytes)
+        self.matrix = np.frombuffer(self.buffer, dtype='<f4', count=n_rows * dim, offset=offset).reshape(n_rows, dim)
+        self.courses = {
+            int(entry['course_id']): (int(entry['start']), int(entry['count'])) for entry in courses
+        }
+
+
+class SharedFaceGallery:
+    """
+    跨工作进程共享的人脸特征库
+
+    全部课程的特征矩阵只在磁盘上的一个文件中保存一份，各工作进程通过 mmap 只读映射，
+    并用 np.frombuffer 得到零拷贝的矩阵视图，操作系统页缓存保证物理内存中只有一份数据。
+    重建时先写入临时文件再用 os.replace 原子替换，读取方发现文件变化后重新映射。
+    """
+
+    def __init__(self, path, tolerance=0.6, check_interval=1.0):
+        self.path = path
+        self.tolerance = tolerance
+        self.check_interval = check_interval
+        self._mapping = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # 文件被替换后重新映射（最多每 check_interval 秒检查一次）
+    def _current(self):
+        now = time.monotonic()
+        with self._lock:
+            mapping = self._mapping
+            if mapping is not None and now - self._checked_at < self.check_interval:
+                return mapping
+            self._checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        if mapping is None or (stat.st_ino, stat.st_mtime_ns) != (mapping.stat.st_ino, mapping.stat.st_mtime_ns):
+            # 旧的映射仍可能被正在使用的匹配器引用，由垃圾回收在无引用后释放
+            mapping = _Mapping(self.path)
+            with self._lock:
+                self._mapping = mapping
+        return mapping
+
+    @property
+    def generation(self):
+        mapping = self._current()
+        return mapping.generation if mapping else None
+
+    def get(self, course_id):
+        """
+        获取课程的人脸匹配器（零拷贝）
+
+        Returns:
+            FaceMatcher；共享文件不存在时返回None
+        """
+        mapping = self._current()
+        if mapping is None:
+            return None
+        start, count = mapping.courses.get(course_id, (0, 0))
+        return FaceMatcher(
+            mapping.matrix[start:start + count],
+            mapping.ids[start:start + count],
+            self.tolerance,
+            normalized=True
+        )
+
+    def rebuild(self):
+        """从数据库重建共享特征库文件（需在应用上下文中调用），返回写入的行数"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        # 跨进程串行化重建，保证后开始的重建读取到的数据更新、最后替换文件
+        with open(self.path + '.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                return self._write()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write(self):
+        from app import db
+        from app.models import Student, Enrollment
+
+        rows = db.session.query(Enrollment.course_id, Student.id, Student.face_encoding).join(
+            Student, Enrollment.student_id == Student.id
+        ).filter(
+            Student.face_encoding.isnot(None)
+        ).order_by(Enrollment.course_id, Student.id).all()
+
+        # 每个学生的特征只解析一次，选修多门课程时在各课程中重复存放
+        vectors = {}
+        for _, student_id, encoding in rows:
+            if student_id not in vectors:
+                vectors[student_id] = to_vector(encoding)
+        dim = len(next(iter(vectors.values()))) if vectors else 0
+
+        courses = []
+        for i, (course_id, _, _) in enumerate(rows):
+            if not courses or courses[-1][0] != course_id:
+                courses.append([course_id, i, 0])
+            courses[-1][2] += 1
+        course_table = np.array([tuple(c) for c in courses], dtype=COURSE_ENTRY)
+        ids = np.array([student_id for _, student_id, _ in rows], dtype='<i8')
+        matrix = np.empty((len(rows), dim), dtype='<f4')
+        for i, (_, student_id, _) in enumerate(rows):
+            matrix[i] = vectors[student_id]
+        if len(matrix):
+            matrix = l2_normalize(matrix).astype('<f4')
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, dim, len(rows), len(courses), time.time_ns())
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(course_table.tobytes())
+            f.write(ids.tobytes())
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            f.write(matrix.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return len(rows)
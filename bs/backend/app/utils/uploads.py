@@ -0,0 +1,164 @@
+import base64
+import binascii
+import shutil
+import tempfile
+from flask import current_app, request
+from app.utils.face_image import FaceImage, load_face_image
+from app.utils.video_checkin import iter_jpeg_frames
+
+# 读取原始请求体时每次读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+
+# 将原始请求体分块写入临时文件（超过 spool_size 后落盘），返回 (文件对象, 字节数)
+def _spool_request_body(spool_size, max_length):
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    total = 0
+    while True:
+        chunk = request.stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_length and total > max_length:
+            spool.close()
+            return None, total
+        spool.write(chunk)
+    return spool, total
+
+
+def load_face_image_from_request(field='image', max_side=None, missing_message='请上传人脸图片'):
+    """
+    从请求中读取人脸图片，支持三种上传方式：
+        1. application/json：字段 field 中的 base64 字符串
+        2. image/jpeg、image/png 等：请求体即图片的原始字节，分块写入临时文件
+        3. multipart/form-data：名为 field 的文件（由 Werkzeug 写入临时文件）
+    后两种方式不经过 base64，也不会把整个请求体读入内存。
+
+    Returns:
+        (FaceImage, 提示信息)；失败时为 (None, 提示信息)
+    """
+    max_side = max_side or current_app.config.get('FACE_IMAGE_MAX_SIDE', 640)
+    mimetype = request.mimetype or ''
+
+    if mimetype.startswith('image/'):
+        spool, total = _spool_request_body(
+            current_app.config.get('FACE_UPLOAD_SPOOL_SIZE', 1024 * 1024),
+            current_app.config.get('MAX_CONTENT_LENGTH')
+        )
+        if spool is None:
+            return None, '图片过大'
+        if total == 0:
+            return None, missing_message
+        image = FaceImage.from_file(spool, max_side)
+    elif mimetype == 'multipart/form-data':
+        file = request.files.get(field)
+        if not file:
+            return None, missing_message
+        image = FaceImage.from_file(file.stream, max_side)
+    else:
+        data = request.get_json(silent=True) or {}
+        base64_image = data.get(field)
+        if not base64_image:
+            return None, missing_message
+        return load_face_image(base64_image, max_side)
+
+    valid, message = image.validate(current_app.config.get('ALLOWED_EXTENSIONS'))
+    if not valid:
+        return None, message
+    return image, '图片读取成功'
+
+
+def iter_frames_from_request(field='frames'):
+    """
+    逐帧读取视频签到请求中的图片字节，支持：
+        1. multipart/x-mixed-replace（MJPEG）、application/octet-stream、image/jpeg 等：
+           请求体为连续的JPEG帧，可使用分块传输边拍边传，按帧标记切分，不缓存整个请求体
+        2. multipart/form-data：多个名为 field 的文件，每个文件一帧
+        3. application/json：字段 field 中的 base64 字符串列表
+    """
+    mimetype = request.mimetype or ''
+    if mimetype == 'multipart/form-data':
+        for file in request.files.getlist(field):
+            yield file.read()
+    elif request.is_json:
+        data = request.get_json(silent=True) or {}
+        for base64_frame in data.get(field) or []:
+            if not isinstance(base64_frame, str):
+                continue
+            if 'base64,' in base64_frame:
+                base64_frame = base64_frame.split('base64,')[1]
+            # 无法解码的帧直接跳过，不影响同一请求中的其它帧
+            try:
+                frame_bytes = base64.b64decode(base64_frame)
+            except (binascii.Error, ValueError):
+                continue
+            if frame_bytes:
+                yield frame_bytes
+    else:
+        yield from iter_jpeg_frames(request.stream, CHUNK_SIZE)
+
+
+def spool_upload_from_request(field='archive'):
+    """
+    将上传的文件（如照片压缩包）复制到独立的临时文件，请求结束后仍可在后台任务中读取，支持：
+        1. multipart/form-data：名为 field 的文件
+        2. application/zip、application/octet-stream 等：请求体即文件内容
+
+    Returns:
+        (临时文件对象, 提示信息)；失败时为 (None, 提示信息)
+    """
+    spool_size = current_app.config.get('FACE_UPLOAD_SPOOL_SIZE', 1024 * 1024)
+    mimetype = request.mimetype or ''
+    if mimetype == 'multipart/form-data':
+        file = request.files.get(field)
+        if not file:
+            return None, '请上传文件'
+        spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        shutil.copyfileobj(file.stream, spool, CHUNK_SIZE)
+    elif request.is_json:
+        return None, '请上传文件'
+    else:
+        spool, total = _spool_request_body(spool_size, current_app.config.get('MAX_CONTENT_LENGTH'))
+        if spool is None:
+            return None, '文件过大'
+        if total == 0:
+            spool.close()
+            return None, '请上传文件'
+    spool.seek(0)
+    return spool, '文件读取成功'
+
+
+def request_options():
+    """
+    获取与图片一同提交的其它参数：JSON 请求取请求体中的字段，multipart 请求取表单字段，
+    原始图片请求只能通过查询参数传递；查询参数对所有方式都有效
+    """
+    options = request.args.to_dict()
+    mimetype = request.mimetype or ''
+    if mimetype == 'multipart/form-data':
+        options.update(request.form.to_dict())
+    elif request.is_json:
+        data = request.get_json(silent=True) or {}
+        options.update({key: value for key, value in data.items() if key not in ('image', 'frames')})
+    return options
+
+
+def int_option(options, name, default, minimum=None, maximum=None):
+    """
+    读取整数参数（参数来自 request_options 或查询参数），超出范围时取边界值
+
+    Returns:
+        (整数, 错误信息)，参数不是整数时整数为None
+    """
+    value = options.get(name)
+    if value is None or value == '':
+        value = default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None, f'参数 {name} 必须是整数'
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value, '解析成功'
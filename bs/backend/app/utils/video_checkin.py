@@ -0,0 +1,272 @@
+import threading
+import time
+from collections import defaultdict
+
+# JPEG 起始和结束标记
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+# 扫描开始标记（SOS），其后为熵编码数据
+JPEG_SOS = 0xDA
+# 没有长度字段的标记：TEM、RST0~RST7
+JPEG_STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xD8)])
+
+
+def _scan_jpeg(buffer, pos, in_scan):
+    """
+    从 pos 开始按标记段长度向后解析一帧JPEG，直到 EOI
+
+    APP1（EXIF）等段内可能嵌有完整的缩略图JPEG，必须按段长度整体跳过，不能在其中查找 EOI；
+    SOS 之后的熵编码数据中 0xFF 后跟 0x00（字节填充）或 RSTn 属于数据本身，后跟其它字节时才是下一个标记。
+
+    Args:
+        buffer: 以当前帧 SOI 开头的缓冲区
+        pos: 继续解析的位置
+        in_scan: pos 是否位于熵编码数据中
+
+    Returns:
+        (状态, 位置, 是否位于熵编码数据中)；状态为 'end' 时位置为帧结束位置，
+        为 'more' 时位置为数据到达后继续解析的位置，为 'bad' 表示数据损坏
+    """
+    size = len(buffer)
+    while True:
+        if in_scan:
+            pos = buffer.find(b'\xff', pos)
+            if pos < 0:
+                return 'more', size, True
+            if pos + 1 >= size:
+                return 'more', pos, True
+            following = buffer[pos + 1]
+            if following == 0x00 or following in JPEG_STANDALONE_MARKERS:
+                pos += 2
+                continue
+            if following == 0xFF:
+                pos += 1
+                continue
+            in_scan = False
+            continue
+
+        if pos + 2 > size:
+            return 'more', pos, False
+        if buffer[pos] != 0xFF:
+            return 'bad', pos, False
+        marker = buffer[pos + 1]
+        if marker == 0xFF:
+            # 标记前的填充字节
+            pos += 1
+            continue
+        if marker == JPEG_EOI[1]:
+            return 'end', pos + 2, False
+        if marker in JPEG_STANDALONE_MARKERS:
+            pos += 2
+            continue
+        if marker in (0x00, JPEG_SOI[1]):
+            return 'bad', pos, False
+
+        if pos + 4 > size:
+            return 'more', pos, False
+        length = (buffer[pos + 2] << 8) | buffer[pos + 3]
+        if length < 2:
+            return 'bad', pos, False
+        if pos + 2 + length > size:
+            return 'more', pos, False
+        pos += 2 + length
+        in_scan = marker == JPEG_SOS
+
+
+def iter_jpeg_frames(stream, chunk_size=64 * 1024, max_frame_size=4 * 1024 * 1024):
+    """
+    从字节流中逐帧切分JPEG图片
+
+    适用于 MJPEG（multipart/x-mixed-replace）以及直接拼接的JPEG帧序列：找到 SOI 后按标记段长度解析到 EOI，
+    分隔符、部件头等帧之间的内容会被忽略。每次只缓存当前帧的数据，不会把整个流读入内存。
+    """
+    buffer = bytearray()
+    in_frame = False
+    pos = 0
+    in_scan = False
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        while True:
+            if not in_frame:
+                start = buffer.find(JPEG_SOI)
+                if start < 0:
+                    # 保留最后一个字节，防止标记被拆在两个数据块之间
+                    del buffer[:-1]
+                    break
+                del buffer[:start]
+                in_frame, pos, in_scan = True, 2, False
+
+            status, pos, in_scan = _scan_jpeg(buffer, pos, in_scan)
+            if status == 'end':
+                yield bytes(buffer[:pos])
+                del buffer[:pos]
+                in_frame = False
+                continue
+            if status == 'bad' or len(buffer) > max_frame_size:
+                # 数据损坏或帧过大，丢弃当前帧的 SOI 后继续寻找下一帧
+                del buffer[:2]
+                in_frame = False
+                continue
+            break
+
+
+# 计算两个人脸框 (x, y, w, h) 的交并比
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class _Track:
+    def __init__(self, track_id, box, frame_index):
+        self.id = track_id
+        self.box = box
+        self.last_frame = frame_index
+        self.frames = 0
+        self.votes = defaultdict(list)  # student_id -> [每帧相似度]
+        self.best = {}  # student_id -> (最高相似度, 对应帧)
+
+    def add(self, box, frame_index, result, frame):
+        self.box = box
+        self.last_frame = frame_index
+        self.frames += 1
+        if result.is_match:
+            self.votes[result.best_id].append(result.score)
+            if result.score > self.best.get(result.best_id, (0.0, None))[0]:
+                self.best[result.best_id] = (result.score, frame)
+
+    # 得票最多的学生及其票数
+    def leader(self):
+        if not self.votes:
+            return None, 0
+        student_id = max(self.votes, key=lambda i: len(self.votes[i]))
+        return student_id, len(self.votes[student_id])
+
+
+class FaceTracker:
+    """
+    跨帧人脸跟踪与投票
+
+    相邻采样帧中交并比足够大的人脸框视为同一个人（同一条轨迹），每帧的匹配结果作为一票。
+    某条轨迹中同一学生的票数达到 min_votes 且占该轨迹已处理帧数的多数时，才确认该学生，
+    避免单帧误识别直接写入考勤。
+    """
+
+    def __init__(self, min_votes=3, iou_threshold=0.3, max_gap=10):
+        self.min_votes = min_votes
+        self.iou_threshold = iou_threshold
+        self.max_gap = max_gap
+        self.tracks = []
+        self._next_id = 0
+
+    def update(self, frame_index, boxes, results, frame=None):
+        """
+        用一帧的检测和匹配结果更新轨迹
+
+        Args:
+            frame_index: 帧编号（会话内递增）
+            boxes: 人脸框列表 [(x, y, w, h), ...]
+            results: 与 boxes 对应的 MatchResult 列表
+            frame: 帧数据（如 FaceImage），作为签到图片候选保存在得分最高的轨迹中
+        """
+        # 丢弃长时间未出现的轨迹（调用方应在每帧之后取走已确认的学生）
+        self.tracks = [t for t in self.tracks if frame_index - t.last_frame <= self.max_gap]
+        used = set()
+        for box, result in zip(boxes, results):
+            best_track = None
+            best_iou = self.iou_threshold
+            for track in self.tracks:
+                if track.id in used:
+                    continue
+                iou = box_iou(track.box, box)
+                if iou >= best_iou:
+                    best_track, best_iou = track, iou
+            if best_track is None:
+                best_track = _Track(self._next_id, box, frame_index)
+                self._next_id += 1
+                self.tracks.append(best_track)
+            used.add(best_track.id)
+            best_track.add(box, frame_index, result, frame)
+
+    def _confirmed(self, track):
+        student_id, votes = track.leader()
+        if student_id is not None and votes >= self.min_votes and votes * 2 > track.frames:
+            return student_id, votes
+        return None, votes
+
+    def confirmed(self):
+        """
+        已确认的学生
+
+        Returns:
+            {student_id: (平均相似度, 相似度最高的帧)}
+        """
+        result = {}
+        for track in self.tracks:
+            student_id, _ = self._confirmed(track)
+            if student_id is None:
+                continue
+            scores = track.votes[student_id]
+            mean_score = sum(scores) / len(scores)
+            if student_id not in result or mean_score > result[student_id][0]:
+                result[student_id] = (mean_score, track.best[student_id][1])
+        return result
+
+    def pending(self):
+        """尚未确认的轨迹数量"""
+        return sum(1 for track in self.tracks if self._confirmed(track)[0] is None)
+
+
+class VideoCheckinSession:
+    """一个视频签到会话：跨请求保留的帧计数、人脸轨迹和已签到学生"""
+
+    def __init__(self, min_votes=3):
+        self.tracker = FaceTracker(min_votes=min_votes)
+        self.frame_count = 0
+        self.checked_in = set()
+        self.last_seen = time.monotonic()
+        # 同一会话的请求串行处理，保证帧序和投票一致
+        self.lock = threading.Lock()
+
+
+class VideoCheckinSessions:
+    """
+    视频签到会话存储
+
+    终端可以在一个请求中持续上传帧，也可以分多个请求上传同一会话的帧。会话内已签到的学生
+    只写入一次考勤，之后的帧不再为其查询数据库。会话在 ttl 秒无活动后过期。
+    """
+
+    def __init__(self, ttl=3600, min_votes=3):
+        self.ttl = ttl
+        self.min_votes = min_votes
+        self._sessions = {}  # (course_id, session_id) -> VideoCheckinSession
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('VIDEO_CHECKIN_SESSION_TTL', self.ttl)
+        self.min_votes = app.config.get('VIDEO_CHECKIN_MIN_VOTES', self.min_votes)
+
+    def get(self, course_id, session_id):
+        """获取会话，不存在时创建，同时清理过期会话"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, session in self._sessions.items() if now - session.last_seen > self.ttl]
+            for key in expired:
+                del self._sessions[key]
+            session = self._sessions.get((course_id, session_id))
+            if session is None:
+                session = self._sessions[(course_id, session_id)] = VideoCheckinSession(self.min_votes)
+            session.last_seen = now
+            return session
+
+
+# 创建一个全局实例
+video_sessions = VideoCheckinSessions()
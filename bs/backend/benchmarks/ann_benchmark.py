@@ -0,0 +1,87 @@
+"""
+全校人脸识别索引基准测试：对比 IVF 近似最近邻索引与暴力搜索的召回率和延迟
+
+用法：
+    python benchmarks/ann_benchmark.py --sizes 10000 50000 --nprobe 4 8 16
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# 添加项目根目录到系统路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.ann_index import IVFIndex
+from app.utils.face_matcher import FaceMatcher
+
+
+# 生成模拟的人脸特征：每个学生一个特征中心，查询为带噪声的同一学生特征
+def make_dataset(size, queries, dim, noise, rng):
+    gallery = rng.standard_normal((size, dim)).astype(np.float32)
+    targets = rng.integers(0, size, queries)
+    probes = gallery[targets] + noise * rng.standard_normal((queries, dim)).astype(np.float32)
+    return gallery, probes, targets
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def run(size, queries, dim, noise, nprobes, seed):
+    rng = np.random.default_rng(seed)
+    gallery, probes, targets = make_dataset(size, queries, dim, noise, rng)
+    ids = np.arange(size)
+
+    # 暴力搜索基线
+    matcher = FaceMatcher(gallery, ids)
+    brute_latency = []
+    brute_ids = []
+    for probe in probes:
+        start = time.perf_counter()
+        result = matcher.match(probe)
+        brute_latency.append(time.perf_counter() - start)
+        brute_ids.append(result.candidates[0][0])
+    brute_ids = np.array(brute_ids)
+
+    print(f'\n库大小 {size}，查询 {queries} 次')
+    print(f'  暴力搜索    p50 {percentile_ms(brute_latency, 50):.3f} ms  '
+          f'p99 {percentile_ms(brute_latency, 99):.3f} ms  '
+          f'top1准确率 {np.mean(brute_ids == targets):.4f}')
+
+    start = time.perf_counter()
+    index = IVFIndex(dim=dim, seed=seed)
+    index.build(ids, gallery)
+    print(f'  IVF 构建耗时 {time.perf_counter() - start:.2f} s（{len(index.centroids)} 个聚类）')
+
+    for nprobe in nprobes:
+        latency = []
+        found = []
+        for probe in probes:
+            start = time.perf_counter()
+            candidates = index.search(probe, k=1, nprobe=nprobe)
+            latency.append(time.perf_counter() - start)
+            found.append(candidates[0][0] if candidates else -1)
+        # 召回率：IVF 结果与暴力搜索结果一致的比例
+        recall = np.mean(np.array(found) == brute_ids)
+        print(f'  IVF nprobe={nprobe:<3d} p50 {percentile_ms(latency, 50):.3f} ms  '
+              f'p99 {percentile_ms(latency, 99):.3f} ms  召回率 {recall:.4f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IVF 索引与暴力搜索对比')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--noise', type=float, default=0.3)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.dim, args.noise, args.nprobe, args.seed)
+
+
+if __name__ == '__main__':
+    main()
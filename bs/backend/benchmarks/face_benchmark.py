@@ -0,0 +1,286 @@
+"""
+人脸识别链路基准测试：特征匹配（recognize_faces / compare_faces）和特征提取的延迟与吞吐量
+
+使用确定性模式的 FaceRecognition（固定种子），相同参数下每次运行的输入和识别结果完全一致，
+结果写入JSON文件，可用 --baseline 与之前版本的结果对比。
+
+用法：
+    python benchmarks/face_benchmark.py --output results.json
+    python benchmarks/face_benchmark.py --sizes 100 1000 --baseline results.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到系统路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.face_recognition import FaceRecognition
+from app.utils.face_matcher import FaceMatcher
+from app.utils.face_image import FaceImage
+from app.utils.encoding_format import EncodingCodec
+from app.utils.extraction_pool import FaceExtractionPool
+from app.utils.encoding_cache import encoding_cache
+
+DIM = 128
+
+
+def summarize(samples, **info):
+    """由每次调用的耗时（秒）计算延迟分位数和吞吐量"""
+    samples = np.asarray(samples)
+    return dict(
+        info,
+        calls=len(samples),
+        p50_ms=float(np.percentile(samples, 50) * 1000),
+        p99_ms=float(np.percentile(samples, 99) * 1000),
+        mean_ms=float(samples.mean() * 1000),
+        throughput_per_s=float(len(samples) / samples.sum()) if samples.sum() else None
+    )
+
+
+def timed(func, inputs, budget):
+    """逐个输入调用 func 并计时；累计耗时超过 budget 秒后提前结束（至少调用5次）"""
+    samples = []
+    results = []
+    total = 0.0
+    for item in inputs:
+        start = time.perf_counter()
+        results.append(func(item))
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+        if total > budget and len(samples) >= 5:
+            break
+    return samples, results
+
+
+def print_row(row):
+    name = ' '.join(f'{key}={row[key]}' for key in ('benchmark', 'layout', 'gallery_size', 'workers') if key in row)
+    print(f'  {name:<60s} p50 {row["p50_ms"]:9.3f} ms  p99 {row["p99_ms"]:9.3f} ms  '
+          f'{row["throughput_per_s"]:10.1f} 次/秒')
+
+
+# 生成模拟的课程特征库：每个学生一个特征，查询为带噪声的同一学生特征
+def make_gallery(size, queries, noise, rng):
+    gallery = rng.random((size, DIM))
+    targets = rng.integers(0, size, queries)
+    probes = gallery[targets] + noise * rng.standard_normal((queries, DIM))
+    return gallery, probes, targets
+
+
+def bench_matching(recognizer, sizes, queries, noise, seed, budget):
+    """
+    各特征库规模和存储布局下 recognize_faces 的延迟：
+        float64_pairs：[(float64 数组, id), ...]，每次调用都重新构建匹配器
+        float64_blobs：[(旧的 float64 二进制, id), ...]，每次调用都解析二进制并构建匹配器
+        float32_blobs：[(带版本头部的 float32 二进制, id), ...]，同上
+        float32_matcher：预先构建的 FaceMatcher（特征库缓存命中时的路径）
+    """
+    codec = EncodingCodec('float32')
+    rows = []
+    for size in sizes:
+        rng = np.random.default_rng(seed)
+        gallery, probes, targets = make_gallery(size, queries, noise, rng)
+        ids = list(range(size))
+        layouts = {
+            'float64_pairs': list(zip(gallery, ids)),
+            'float64_blobs': [(vector.astype(np.float64).tobytes(), i) for vector, i in zip(gallery, ids)],
+            'float32_blobs': [(codec.pack(vector), i) for vector, i in zip(gallery, ids)],
+            'float32_matcher': FaceMatcher(gallery, ids, recognizer.tolerance)
+        }
+        for layout, known in layouts.items():
+            samples, results = timed(lambda probe: recognizer.recognize_faces(probe, known), probes, budget)
+            accuracy = float(np.mean([result[1] == target for result, target in zip(results, targets)]))
+            row = summarize(samples, benchmark='recognize_faces', layout=layout, gallery_size=size, accuracy=accuracy)
+            rows.append(row)
+            print_row(row)
+    return rows
+
+
+def bench_compare(recognizer, queries, noise, seed, budget):
+    """
+    一对一比较 compare_faces 的延迟（float64 数组与 float32 二进制两种输入）。
+    同时检查准确率：带噪声的同一特征应判定为匹配，完全相同的特征必须匹配且相似度为1
+    """
+    codec = EncodingCodec('float32')
+    rng = np.random.default_rng(seed)
+    known = rng.random((queries, DIM))
+    unknown = known + noise * rng.standard_normal((queries, DIM))
+    rows = []
+    for layout, pairs in (
+        ('float64', list(zip(known, unknown))),
+        ('float32_blob', [(codec.pack(k), u) for k, u in zip(known, unknown)])
+    ):
+        samples, results = timed(lambda pair: recognizer.compare_faces(*pair), pairs, budget)
+        accuracy = float(np.mean([is_match for is_match, _ in results]))
+        identical = [recognizer.compare_faces(known_encoding, known[i]) for i, (known_encoding, _) in enumerate(pairs[:5])]
+        identical_ok = all(is_match and abs(score - 1.0) < 1e-5 for is_match, score in identical)
+        row = summarize(samples, benchmark='compare_faces', layout=layout, accuracy=accuracy, identical_ok=identical_ok)
+        rows.append(row)
+        print_row(row)
+        if not identical_ok:
+            print('  警告：完全相同的特征未判定为匹配，compare_faces 结果有误')
+    return rows
+
+
+# 生成模拟的JPEG图片（确定性）
+def make_jpeg(width, height, seed):
+    pixels = (np.random.default_rng(seed).random((height, width, 3)) * 255).astype(np.uint8)
+    output = BytesIO()
+    Image.fromarray(pixels).save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+def bench_extraction(recognizer, seed, count, workers, photo, budget):
+    """
+    特征提取的延迟和吞吐量：
+        extract_from_image：单人照片（1280x960 JPEG）解码缩小到640后提取特征
+        extract_all_from_image：课堂合照（默认 1920x1080 合成图，可用 --photo 指定真实照片）人脸检测加批量提取
+        pool_extract_from_image：解码后通过提取进程池并发提交，测量多进程吞吐量（关闭特征缓存）
+    """
+    rows = []
+    images = [make_jpeg(1280, 960, seed + i) for i in range(count)]
+
+    def extract_one(data):
+        return recognizer.extract_face_encoding_from_image(FaceImage.from_bytes(data, 640).pixels)
+
+    samples, results = timed(extract_one, images, budget)
+    # 确定性模式下的特征摘要，用于确认两次运行的结果一致
+    digest = hashlib.sha256(b''.join(np.asarray(encoding).tobytes() for encoding, _ in results)).hexdigest()[:16]
+    row = summarize(samples, benchmark='extract_from_image', encodings_digest=digest)
+    rows.append(row)
+    print_row(row)
+
+    if photo:
+        with open(photo, 'rb') as f:
+            photos = [f.read()] * count
+    else:
+        photos = [make_jpeg(1920, 1080, seed)] * count
+
+    def extract_all(data):
+        return recognizer.extract_all_face_encodings(FaceImage.from_bytes(data, 2048).pixels)
+
+    samples, results = timed(extract_all, photos, budget)
+    row = summarize(samples, benchmark='extract_all_from_image',
+                    faces_detected=len(results[0][0]) if results[0][0] else 0)
+    rows.append(row)
+    print_row(row)
+
+    encoding_cache.max_entries = 0
+    for worker_count in workers:
+        pool = FaceExtractionPool(max_workers=worker_count, max_queue=max(count, 1), timeout=60)
+        pool.seed = recognizer.seed
+        # 预热：启动工作进程
+        pool.extract_from_image(FaceImage.from_bytes(images[0], 640))
+        concurrency = max(worker_count, 1) * 2
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(lambda data: pool.extract_from_image(FaceImage.from_bytes(data, 640)), images))
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+        row = {
+            'benchmark': 'pool_extract_from_image',
+            'workers': worker_count,
+            'calls': len(images),
+            'throughput_per_s': len(images) / elapsed,
+            'p50_ms': None,
+            'p99_ms': None
+        }
+        rows.append(row)
+        print(f'  benchmark=pool_extract_from_image workers={worker_count:<34d} '
+              f'{row["throughput_per_s"]:10.1f} 次/秒')
+    return rows
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def row_key(row):
+    return tuple(row.get(key) for key in ('benchmark', 'layout', 'gallery_size', 'workers'))
+
+
+# 与基线结果对比，打印 p50 延迟（或吞吐量）的变化
+def compare_with_baseline(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    baseline_rows = {row_key(row): row for row in baseline.get('results', [])}
+    print(f'\n与基线对比（{baseline_path}，提交 {baseline.get("environment", {}).get("git_commit")}）：')
+    for row in results:
+        old = baseline_rows.get(row_key(row))
+        if not old:
+            continue
+        name = ' '.join(str(value) for value in row_key(row) if value is not None)
+        if row.get('p50_ms') and old.get('p50_ms'):
+            ratio = row['p50_ms'] / old['p50_ms']
+            print(f'  {name:<60s} p50 {old["p50_ms"]:9.3f} -> {row["p50_ms"]:9.3f} ms  ({ratio:.2f}x)')
+        elif row.get('throughput_per_s') and old.get('throughput_per_s'):
+            ratio = row['throughput_per_s'] / old['throughput_per_s']
+            print(f'  {name:<60s} 吞吐量 {old["throughput_per_s"]:9.1f} -> {row["throughput_per_s"]:9.1f} 次/秒  ({ratio:.2f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人脸识别链路基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200, help='每种情况的查询次数')
+    parser.add_argument('--noise', type=float, default=0.05, help='查询特征相对库中特征的噪声幅度')
+    parser.add_argument('--images', type=int, default=50, help='特征提取测试的图片数')
+    parser.add_argument('--workers', type=int, nargs='*', default=[os.cpu_count() or 1],
+                        help='提取进程池的进程数，可指定多个；不指定值时跳过进程池测试')
+    parser.add_argument('--photo', help='用于合照检测测试的图片路径')
+    parser.add_argument('--budget', type=float, default=10.0, help='每种情况的最长计时（秒），超过后提前结束')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip', nargs='*', default=[], choices=['matching', 'compare', 'extraction'])
+    parser.add_argument('--output', help='结果JSON文件路径')
+    parser.add_argument('--baseline', help='用于对比的基线结果JSON文件')
+    args = parser.parse_args()
+
+    recognizer = FaceRecognition(seed=args.seed)
+    results = []
+    if 'matching' not in args.skip:
+        print('recognize_faces：')
+        results += bench_matching(recognizer, args.sizes, args.queries, args.noise, args.seed, args.budget)
+    if 'compare' not in args.skip:
+        print('compare_faces：')
+        results += bench_compare(recognizer, args.queries, args.noise, args.seed, args.budget)
+    if 'extraction' not in args.skip:
+        print('特征提取：')
+        results += bench_extraction(recognizer, args.seed, args.images, args.workers, args.photo, args.budget)
+
+    report = {
+        'environment': environment(),
+        'parameters': vars(args),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\n结果已写入 {args.output}')
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
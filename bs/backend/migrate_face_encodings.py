@@ -0,0 +1,72 @@
+"""
+将 Student.face_encoding 中旧的 float64 格式人脸特征改写为带版本头部的紧凑格式
+
+用法：
+    python migrate_face_encodings.py [--dtype float32|float16] [--batch-size 500] [--dry-run] [--config production]
+"""
+import argparse
+from app import create_app, db
+from app.models import Student
+from app.utils import encoding_codec
+from app.utils.encoding_format import is_current_format, HEADER, DTYPE_CODES
+
+
+def migrate(dtype, batch_size, dry_run):
+    last_id = 0
+    converted = 0
+    skipped = 0
+    failed = 0
+
+    while True:
+        # 按主键分批读取，避免一次加载全部学生的二进制特征
+        rows = db.session.query(Student.id, Student.face_encoding).filter(
+            Student.id > last_id,
+            Student.face_encoding.isnot(None)
+        ).order_by(Student.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        updates = []
+        for student_id, blob in rows:
+            # 已是目标格式和数据类型的记录无需改写
+            if is_current_format(blob) and HEADER.unpack_from(blob)[2] == DTYPE_CODES[dtype]:
+                skipped += 1
+                continue
+            try:
+                updates.append({'id': student_id, 'face_encoding': encoding_codec.pack(encoding_codec.unpack(blob), dtype)})
+            except Exception as e:
+                failed += 1
+                print(f'学生ID {student_id} 的人脸特征无法解析: {str(e)}')
+
+        if updates and not dry_run:
+            db.session.bulk_update_mappings(Student, updates)
+            db.session.commit()
+
+        converted += len(updates)
+        last_id = rows[-1][0]
+        print(f'已处理至学生ID {last_id}，累计转换 {converted} 条')
+
+    return converted, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='迁移人脸特征存储格式')
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default=None,
+                        help='目标数据类型，默认使用配置项 FACE_ENCODING_DTYPE')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写入数据库')
+    parser.add_argument('--config', default='development', help='使用的配置名')
+    args = parser.parse_args()
+
+    app = create_app(config_name=args.config)
+    with app.app_context():
+        dtype = args.dtype or encoding_codec.dtype
+        converted, skipped, failed = migrate(dtype, args.batch_size, args.dry_run)
+        print(f'迁移完成：转换 {converted} 条，已是目标格式 {skipped} 条，失败 {failed} 条')
+        if args.dry_run:
+            print('（dry-run 模式，未写入数据库）')
+
+
+if __name__ == '__main__':
+    main()
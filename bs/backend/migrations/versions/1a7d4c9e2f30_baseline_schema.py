@@ -0,0 +1,207 @@
+"""baseline schema
+
+创建应用的全部数据表（与引入迁移之前由 db.create_all() 创建的结构相同，不含热点查询索引，索引由下一个版本补建）。
+此前由 db.create_all() 创建的已有数据库执行 flask db upgrade 时，已存在的表跳过，只补建缺少的表
+（如 stored_images、attendance_rollups、course_daily_snapshots），因此在空数据库和已有数据库上都可以执行。
+
+Revision ID: 1a7d4c9e2f30
+Revises:
+Create Date: 2026-10-18 20:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a7d4c9e2f30'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# 按外键依赖顺序排列的表名（降级时逆序删除）
+TABLES = [
+    'admins', 'course_categories', 'stored_images', 'students', 'teachers', 'courses',
+    'attendance_rollups', 'attendances', 'course_daily_snapshots', 'enrollments',
+]
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'admins' not in tables:
+        op.create_table('admins',
+            sa.Column('admin_id', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('admin_id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'course_categories' not in tables:
+        op.create_table('course_categories',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+
+    if 'stored_images' not in tables:
+        op.create_table('stored_images',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('extension', sa.String(length=10), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('content_hash')
+        )
+
+    if 'students' not in tables:
+        op.create_table('students',
+            sa.Column('student_id', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('gender', sa.String(length=10), nullable=True),
+            sa.Column('age', sa.Integer(), nullable=True),
+            sa.Column('major', sa.String(length=100), nullable=True),
+            sa.Column('class_name', sa.String(length=50), nullable=True),
+            sa.Column('face_image_path', sa.String(length=255), nullable=True),
+            sa.Column('face_encoding', sa.LargeBinary(), nullable=True),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('student_id'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'teachers' not in tables:
+        op.create_table('teachers',
+            sa.Column('teacher_id', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('gender', sa.String(length=10), nullable=True),
+            sa.Column('age', sa.Integer(), nullable=True),
+            sa.Column('title', sa.String(length=50), nullable=True),
+            sa.Column('department', sa.String(length=100), nullable=True),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('teacher_id'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'courses' not in tables:
+        op.create_table('courses',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('course_code', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('credits', sa.Float(), nullable=True),
+            sa.Column('semester', sa.String(length=20), nullable=True),
+            sa.Column('year', sa.Integer(), nullable=True),
+            sa.Column('start_time', sa.Time(), nullable=True),
+            sa.Column('end_time', sa.Time(), nullable=True),
+            sa.Column('day_of_week', sa.String(length=20), nullable=True),
+            sa.Column('location', sa.String(length=100), nullable=True),
+            sa.Column('teacher_id', sa.Integer(), nullable=False),
+            sa.Column('category_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['category_id'], ['course_categories.id'], ),
+            sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('course_code')
+        )
+
+    if 'attendance_rollups' not in tables:
+        op.create_table('attendance_rollups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('course_id', sa.Integer(), nullable=False),
+            sa.Column('semester', sa.String(length=20), nullable=True),
+            sa.Column('year', sa.Integer(), nullable=True),
+            sa.Column('total', sa.Integer(), nullable=False),
+            sa.Column('present', sa.Integer(), nullable=False),
+            sa.Column('late', sa.Integer(), nullable=False),
+            sa.Column('absent', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+            sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('student_id', 'course_id', name='_rollup_student_course_uc')
+        )
+
+    if 'attendances' not in tables:
+        op.create_table('attendances',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('course_id', sa.Integer(), nullable=False),
+            sa.Column('attendance_date', sa.Date(), nullable=False),
+            sa.Column('check_in_time', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('face_match_score', sa.Float(), nullable=True),
+            sa.Column('image_path', sa.String(length=255), nullable=True),
+            sa.Column('remarks', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+            sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('student_id', 'course_id', 'attendance_date', name='_student_course_date_uc')
+        )
+
+    if 'course_daily_snapshots' not in tables:
+        op.create_table('course_daily_snapshots',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('course_id', sa.Integer(), nullable=False),
+            sa.Column('snapshot_date', sa.Date(), nullable=False),
+            sa.Column('enrolled_count', sa.Integer(), nullable=False),
+            sa.Column('present', sa.Integer(), nullable=False),
+            sa.Column('late', sa.Integer(), nullable=False),
+            sa.Column('absent', sa.Integer(), nullable=False),
+            sa.Column('no_record', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('course_id', 'snapshot_date', name='_snapshot_course_date_uc')
+        )
+
+    if 'enrollments' not in tables:
+        op.create_table('enrollments',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('course_id', sa.Integer(), nullable=False),
+            sa.Column('enrollment_date', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+            sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('student_id', 'course_id', name='_student_course_uc')
+        )
+
+
+def downgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for table in reversed(TABLES):
+        if table in tables:
+            op.drop_table(table)
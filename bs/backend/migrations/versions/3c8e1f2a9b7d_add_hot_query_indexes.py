@@ -0,0 +1,70 @@
+"""add indexes for hot attendance and enrollment queries
+
+在基线版本（1a7d4c9e2f30，创建全部数据表）之上补建热点查询所需的索引：
+    - attendances (course_id, attendance_date)：课程考勤列表、导出、按日期范围统计、当天已签到检查、导入
+    - attendances (student_id, attendance_date)：学生考勤记录（按日期范围、倒序）
+    - attendances (attendance_date)：首页今日/本月考勤数、按日期范围计算每日快照
+    - enrollments (course_id, student_id)：选课名单、课程人脸特征库、选课人数（唯一约束以 student_id 开头，不能用于按课程查询）
+    - courses (teacher_id)：教师的课程列表
+    - students (name)：以姓名登录
+    - attendance_rollups (course_id)、course_daily_snapshots (snapshot_date)：按课程的汇总统计、全部课程的考勤趋势
+按列检查已有索引（inspector），已存在列相同或以这些列开头的索引时跳过，
+此前由 db.create_all() 创建（可能已带有这些索引）的数据库也可以执行。
+
+Revision ID: 3c8e1f2a9b7d
+Revises: 1a7d4c9e2f30
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e1f2a9b7d'
+down_revision = '1a7d4c9e2f30'
+branch_labels = None
+depends_on = None
+
+# (表名, 索引名, 列)
+INDEXES = [
+    ('attendances', 'ix_attendances_course_date', ['course_id', 'attendance_date']),
+    ('attendances', 'ix_attendances_student_date', ['student_id', 'attendance_date']),
+    ('attendances', 'ix_attendances_attendance_date', ['attendance_date']),
+    ('enrollments', 'ix_enrollments_course_student', ['course_id', 'student_id']),
+    ('courses', 'ix_courses_teacher_id', ['teacher_id']),
+    ('students', 'ix_students_name', ['name']),
+    ('attendance_rollups', 'ix_attendance_rollups_course_id', ['course_id']),
+    ('course_daily_snapshots', 'ix_course_daily_snapshots_snapshot_date', ['snapshot_date']),
+]
+
+
+# 表上已有的索引、唯一约束和主键：{索引名: [列名]}
+def existing_indexes(inspector, table):
+    existing = {index['name']: index['column_names'] for index in inspector.get_indexes(table)}
+    existing.update(
+        (constraint['name'], constraint['column_names']) for constraint in inspector.get_unique_constraints(table)
+    )
+    pk = inspector.get_pk_constraint(table)
+    existing[pk.get('name') or 'PRIMARY'] = pk['constrained_columns']
+    return existing
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table, name, columns in INDEXES:
+        if table not in tables:
+            continue
+        existing = existing_indexes(inspector, table)
+        if name in existing or any(list(found[:len(columns)]) == columns for found in existing.values()):
+            continue
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table, name, columns in reversed(INDEXES):
+        if table in tables and name in {index['name'] for index in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""
+从考勤记录重新计算考勤汇总表（AttendanceRollup）
+
+汇总数据与考勤记录不一致（如直接修改过数据库）时运行；汇总表为空时应用启动会自动回填（ATTENDANCE_ROLLUP_BACKFILL）。
+
+用法：
+    python rebuild_attendance_rollups.py [--course-id 12] [--config production]
+"""
+import argparse
+from app import create_app
+from app.utils import attendance_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建考勤汇总表')
+    parser.add_argument('--course-id', type=int, default=None, help='只重建指定课程，默认重建全部课程')
+    parser.add_argument('--config', default='development', help='使用的配置名')
+    args = parser.parse_args()
+
+    app = create_app(config_name=args.config)
+    with app.app_context():
+        count = attendance_rollups.rebuild(args.course_id)
+        scope = f'课程 {args.course_id}' if args.course_id else '全部课程'
+        print(f'重建完成（{scope}）：写入 {count} 条汇总记录')
+
+
+if __name__ == '__main__':
+    main()
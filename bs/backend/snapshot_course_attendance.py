@@ -0,0 +1,42 @@
+"""
+从考勤记录计算课程每日考勤快照（CourseDailySnapshot）
+
+每晚运行一次（如 crontab：10 0 * * * cd /path/to/backend && python snapshot_course_attendance.py），
+默认重新计算前一天的快照，使当天增量更新的计数与考勤记录保持一致；
+首次部署或需要补算历史数据时用 --start/--end 指定日期范围。
+
+用法：
+    python snapshot_course_attendance.py [--start 2024-02-26 --end 2024-07-05] [--course-id 12] [--config production]
+"""
+import argparse
+from datetime import datetime, timedelta
+from app import create_app
+from app.utils import course_snapshots
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='计算课程每日考勤快照')
+    parser.add_argument('--start', type=parse_date, default=None, help='开始日期（YYYY-MM-DD），默认为昨天')
+    parser.add_argument('--end', type=parse_date, default=None, help='结束日期（YYYY-MM-DD），默认与开始日期相同')
+    parser.add_argument('--course-id', type=int, default=None, help='只计算指定课程，默认计算全部课程')
+    parser.add_argument('--config', default='development', help='使用的配置名')
+    args = parser.parse_args()
+
+    start = args.start or datetime.now().date() - timedelta(days=1)
+    end = args.end or start
+    if start > end:
+        parser.error('开始日期不能晚于结束日期')
+
+    app = create_app(config_name=args.config)
+    with app.app_context():
+        count = course_snapshots.rebuild(start, end, args.course_id)
+        scope = f'课程 {args.course_id}' if args.course_id else '全部课程'
+        print(f'快照计算完成（{scope}，{start} 至 {end}）：写入 {count} 条快照')
+
+
+if __name__ == '__main__':
+    main()